@@ -6,6 +6,8 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 
+from util_catalog import Catalog
+
 DATABASES_FOLDER = "_DATABASES"
 COMPOSER_DB_FILENAME = "composer_database.json"
 
@@ -14,6 +16,7 @@ class AddComposerDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Добавить нового композитора")
         self.setModal(True)
+        self.full_key, self.composer = "", {}       # заполняются при OK
 
         layout = QVBoxLayout(self)
         self.setLayout(layout)
@@ -134,5 +137,8 @@ class AddComposerDialog(QDialog):
         # Сохраняем обратно
         with open(db_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
+        Catalog().upsert_writer(full_key, composers_db[full_key], replace=False)
 
+        # итог для вызывающего окна — ему не нужно перечитывать JSON
+        self.full_key, self.composer = full_key, composers_db[full_key]
         self.accept()
@@ -0,0 +1,223 @@
+# batch_page.py
+"""
+Экран «ПАКЕТНАЯ ОБРАБОТКА»: несколько альбомов из _НЕГОТОВЫЕ за один
+запуск (core_batch) и таблица их состояния.  Шаги, требующие ручного
+ввода (композиторы, метаданные), затем продолжаются в обычном режиме —
+кнопкой «Продолжить» сессия альбома становится текущей session.json.
+"""
+import importlib
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
+    QListWidget, QAbstractItemView, QTableWidget, QTableWidgetItem,
+    QHeaderView, QTextEdit, QCheckBox, QMessageBox
+)
+from PyQt6.QtCore import Qt, QTimer
+
+from util_json import load_json_safe
+from util_path import rsrc
+from util_session import SessionStore, session_store
+from core_structure import list_albums
+from core_pipeline import STEPS, parse_steps
+from core_batch import STATUS_LABELS, new_job, run_batch, saved_sessions
+from task_panel import TaskPanel
+
+CONFIG_FILE  = "config.json"
+
+BTN_STYLE = "QPushButton{padding:6px 12px;font-size:12pt;}"
+
+# шаги без ручного ввода: композиторы (3), описание и поля метаданных (5)
+# и тексты соцсетей (7) проходятся по одному кнопкой «Продолжить»
+AUTO_STEPS = (1, 2, 4, 6)
+# флажок «перезаписывать» отвечает только на эти вопросы — не на замену
+# METADATA.xlsx и тем более не на дозапись в TOTAL METADATA
+OVERWRITE_ANSWERS = {"overwrite_album": True, "overwrite_harvest": True}
+
+# следующий шаг → (модуль, класс страницы)
+NEXT_PAGES = {
+    2: ("step2_process_stems",   "Step2ProcessStems"),
+    3: ("step3_composer_match",  "Step3ComposerMatch"),
+    4: ("step4_add_cover",       "Step4AddCover"),
+    5: ("step_prepare_step5",    "StepPrepareStep5"),
+    6: ("step_prepare_step6",    "StepPrepareStep6"),
+    7: ("step_prepare_step7",    "StepPrepareStep7"),
+}
+
+
+class BatchPage(QWidget):
+    """Очередь альбомов + панель их состояния."""
+
+    COLS = ["Альбом", "Статус", "Шаг", "Прогресс", "Сообщение"]
+
+    def __init__(self, main_app):
+        super().__init__()
+        self.main_app = main_app
+        self.jobs: list[dict] = []
+        self._build_ui()
+
+        self.timer = QTimer(self, interval=500, timeout=self._refresh_table)
+        self.reload()
+
+    # ────────────────────────── UI ──────────────────────────
+    def _build_ui(self):
+        root = QVBoxLayout(self)
+        root.setContentsMargins(0, 0, 0, 0)
+        root.setSpacing(8)
+
+        title = QLabel("ПАКЕТНАЯ ОБРАБОТКА", alignment=Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size:22pt;font-weight:600;margin-bottom:8px;")
+        root.addWidget(title)
+
+        # ── выбор альбомов ──
+        root.addWidget(QLabel("📂 Альбомы из _НЕГОТОВЫЕ (можно выбрать несколько):"))
+        self.album_list = QListWidget()
+        self.album_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.album_list.setMaximumHeight(140)
+        root.addWidget(self.album_list)
+
+        opts = QHBoxLayout()
+        opts.addWidget(QLabel("Шаги:"))
+        self.steps_edit = QLineEdit("1-2")
+        self.steps_edit.setToolTip(", ".join(f"{n} — {t}" for n, (t, _) in STEPS.items()
+                                             if n in AUTO_STEPS))
+        self.steps_edit.setMaximumWidth(90)
+        opts.addWidget(self.steps_edit)
+        self.yes_box = QCheckBox("Перезаписывать существующие папки альбома и Harvest без вопросов")
+        opts.addWidget(self.yes_box)
+        opts.addStretch(1)
+        root.addLayout(opts)
+
+        self.run_btn = QPushButton("▶ Запустить очередь", clicked=self.start_batch)
+        self.run_btn.setMinimumHeight(32)
+        root.addWidget(self.run_btn)
+
+        # ── состояние альбомов ──
+        self.table = QTableWidget(columnCount=len(self.COLS))
+        self.table.setHorizontalHeaderLabels(self.COLS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        hdr = self.table.horizontalHeader()
+        hdr.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        hdr.setStretchLastSection(True)
+        root.addWidget(self.table)
+
+        # ── лог + фоновая задача ──
+        self.log_out = QTextEdit(readOnly=True)
+        self.log_out.setMaximumHeight(140)
+        root.addWidget(self.log_out)
+
+        ops = QHBoxLayout()
+        self.refresh_btn  = QPushButton("🔄 Обновить", clicked=self.reload)
+        self.continue_btn = QPushButton("➡ Продолжить выбранный альбом",
+                                        clicked=self.continue_selected)
+        for b in (self.refresh_btn, self.continue_btn):
+            b.setStyleSheet(BTN_STYLE); ops.addWidget(b)
+        ops.addStretch(1)
+        root.addLayout(ops)
+
+        desc = QLabel(
+            "Описание: выбранные альбомы проходят указанные шаги одновременно, у каждого "
+            "своя сессия в _SESSIONS. Конвертации всех альбомов делят общий лимит потоков "
+            "из настроек. Шаги с ручным вводом (3, 5 и 7) проходятся затем по одному: "
+            "выберите альбом в таблице и нажмите «Продолжить».",
+            wordWrap=True
+        )
+        desc.setStyleSheet("margin-top:8px;")
+        root.addWidget(desc)
+
+        nav = QHBoxLayout()
+        self.back_btn = QPushButton("⬅ Назад", clicked=lambda:
+                                    self.main_app.pages.home())
+        nav.addWidget(self.back_btn)
+        root.addLayout(nav)
+
+        self.task = TaskPanel(self.log, [self.run_btn, self.refresh_btn,
+                                         self.continue_btn, self.back_btn])
+        root.insertWidget(root.indexOf(self.log_out) + 1, self.task)
+
+    def log(self, msg: str):
+        self.log_out.append(msg)
+
+    # ────────────────────────── данные ──────────────────────────
+    def reload(self):
+        """Перечитывает config, список альбомов и сохранённые сессии."""
+        self.cfg = load_json_safe(rsrc(CONFIG_FILE), {})
+        self.album_list.clear()
+        self.album_list.addItems(sorted(list_albums(self.cfg)))
+
+        # задания текущего запуска + альбомы, уже обработанные раньше
+        known = {j["album"] for j in self.jobs}
+        for album, ses in saved_sessions().items():
+            if album not in known:
+                job = new_job(album, [])
+                done = ses.get("steps_done", [])
+                job.update(status="done" if done else "queued",
+                           step=max(done) if done else None,
+                           message=f"Выполнены шаги: {', '.join(map(str, done))}" if done else "")
+                self.jobs.append(job)
+        self._refresh_table()
+
+    def _refresh_table(self):
+        self.table.setRowCount(len(self.jobs))
+        for r, j in enumerate(self.jobs):
+            prog = f"{j['done']}/{j['total']}" if j["total"] else ""
+            step = f"{j['step']} — {STEPS[j['step']][0]}" if j["step"] else ""
+            for c, val in enumerate((j["album"], STATUS_LABELS[j["status"]], step,
+                                     prog, j["message"])):
+                self.table.setItem(r, c, QTableWidgetItem(val))
+
+    # ────────────────────────── запуск ──────────────────────────
+    def start_batch(self):
+        albums = [i.text() for i in self.album_list.selectedItems()]
+        if not albums:
+            QMessageBox.warning(self, "Внимание", "Выберите хотя бы один альбом."); return
+        try:
+            steps = parse_steps(self.steps_edit.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Внимание", str(e)); return
+        if manual := [n for n in steps if n not in AUTO_STEPS]:
+            QMessageBox.warning(
+                self, "Внимание",
+                f"Шаги {', '.join(map(str, manual))} требуют ручного ввода — в пакете "
+                f"доступны только {', '.join(map(str, AUTO_STEPS))}.\n"
+                "Остальные пройдите по одному кнопкой «Продолжить».")
+            return
+
+        run_jobs = [new_job(a, steps) for a in albums]
+        self.jobs = run_jobs + [j for j in self.jobs if j["album"] not in albums]
+        self._refresh_table()
+        self.log_out.clear()
+        self.timer.start()
+        answers = OVERWRITE_ANSWERS if self.yes_box.isChecked() else {}
+        self.task.start(run_batch, self.cfg, run_jobs, answers, False,
+                        on_done=self._on_finished, on_fail=lambda _msg: self._on_finished())
+
+    def _on_finished(self, _=None):
+        self.timer.stop()
+        for j in self.jobs:                         # снятые до старта
+            if j["status"] in ("queued", "running") and j["steps"]:
+                j["status"] = "cancelled"
+        self._refresh_table()
+
+    # ────────────────────────── продолжение ──────────────────────────
+    def continue_selected(self):
+        row = self.table.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, "Внимание", "Выберите альбом в таблице."); return
+        job = self.jobs[row]
+        album = SessionStore(job["session"])
+        if not album.exists:
+            QMessageBox.warning(self, "Внимание", "У этого альбома ещё нет сессии."); return
+
+        nxt = max(album.steps_done, default=0) + 1
+        if nxt not in NEXT_PAGES:
+            QMessageBox.information(self, "Информация", "Все шаги этого альбома уже выполнены."); return
+
+        current = session_store()
+        current.replace(album.data)
+        if not current.flush():
+            QMessageBox.warning(self, "Внимание", f"Не удалось сохранить {current.path}"); return
+        self.log(f"📌 Текущий альбом: {job['album']} → Шаг {nxt}")
+        mod, cls = NEXT_PAGES[nxt]
+        w = getattr(importlib.import_module(mod), cls)(self.main_app)
+        self.main_app.pages.show(w)
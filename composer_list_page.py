@@ -1,14 +1,16 @@
 # composer_list_page.py
-import os, json
+import os
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QAbstractItemView, QMessageBox,
-    QHeaderView
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
+    QTableView, QAbstractItemView, QMessageBox, QHeaderView
+)
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
 )
-from PyQt6.QtCore import Qt
 from add_composer_dialog import AddComposerDialog
 
 from util_json import load_json_safe, dump_json_safe
+from util_catalog import Catalog
 
 DATABASES_FOLDER     = "_DATABASES"
 COMPOSER_DB_FILENAME = "composer_database.json"
@@ -17,6 +19,108 @@ BTN_STYLE = "QPushButton{padding:6px 12px;font-size:12pt;}"
 BTN_GREEN = ("QPushButton{background:#388E3C;color:white;font-weight:bold;"
              "padding:6px 12px;font-size:12pt;}")
 
+HEADERS = ["First Name", "Middle Name", "Last Name", "Society", "IPI", "Publisher"]
+
+
+# ────────────────────────── модель ──────────────────────────
+class ComposerTableModel(QAbstractTableModel):
+    """
+    Композиторы из composer_database.json, уже загруженного в память.
+    Строка — (полное имя, значения колонок); полное имя отдаётся в UserRole.
+    Добавление и удаление меняют модель точечно, без перестройки таблицы.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: list[tuple[str, list[str]]] = []
+        self._search: list[str] = []                # строка поиска на строку таблицы
+        self.publishers: dict[str, dict] = {}
+
+    # ───── данные ─────
+    def _values(self, info: dict) -> list[str]:
+        pub = self.publishers.get(info.get("publisher_key", ""), {})
+        pub_disp = pub.get("publisher_name", "")
+        if pub_disp and pub.get("publisher_society"):
+            pub_disp += f" ({pub['publisher_society']})"
+        return [info.get("first_name", ""), info.get("middle_name", ""),
+                info.get("last_name", ""), info.get("society", ""),
+                info.get("ipi", ""), pub_disp]
+
+    def set_db(self, composers: dict[str, dict], publishers: dict[str, dict]):
+        self.beginResetModel()
+        self.publishers = publishers
+        self._rows   = [(full, self._values(info)) for full, info in sorted(composers.items())]
+        self._search = [" ".join([full, *vals]).lower() for full, vals in self._rows]
+        self.endResetModel()
+
+    def add(self, full: str, info: dict):
+        """Новый композитор (или обновлённые данные прежнего)."""
+        vals = self._values(info)
+        row  = self.row_of(full)
+        if row is not None:
+            self._rows[row] = (full, vals)
+            self._search[row] = " ".join([full, *vals]).lower()
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+            return
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.append((full, vals))
+        self._search.append(" ".join([full, *vals]).lower())
+        self.endInsertRows()
+
+    def remove(self, full: str):
+        row = self.row_of(full)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row], self._search[row]
+        self.endRemoveRows()
+
+    def row_of(self, full: str) -> int | None:
+        return next((r for r, (k, _) in enumerate(self._rows) if k == full), None)
+
+    def matches(self, row: int, needle: str) -> bool:
+        return needle in self._search[row]
+
+    # ───── Qt ─────
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        full, vals = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return vals[index.column()]
+        if role == Qt.ItemDataRole.UserRole:
+            return full
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+
+class ComposerFilter(QSortFilterProxyModel):
+    """Сортировка по колонкам + поиск подстроки по всем полям строки сразу."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._needle = ""
+        self.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    def set_search(self, text: str):
+        self._needle = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        return not self._needle or self.sourceModel().matches(row, self._needle)
+
+
 class ComposerListPage(QWidget):
     """Экран «КОМПОЗИТОРЫ» (работа с composer_database.json)."""
 
@@ -24,6 +128,9 @@ class ComposerListPage(QWidget):
     def __init__(self, main_app):
         super().__init__()
         self.main_app = main_app
+        self.db_path  = os.path.join(DATABASES_FOLDER, COMPOSER_DB_FILENAME)
+        self.data: dict = {}
+        self._stamp = None                          # (mtime_ns, size) прочитанного файла
         self._build_ui()
         self.load_composers()                       # заполняем таблицу
 
@@ -37,17 +144,30 @@ class ComposerListPage(QWidget):
         title.setStyleSheet("font-size:22pt;font-weight:600;margin-bottom:8px;")
         root.addWidget(title)
 
-        # ── таблица ──
-        self.table = QTableWidget(columnCount=6)
-        self.table.setHorizontalHeaderLabels([
-            "First Name", "Middle Name", "Last Name",
-            "Society", "IPI", "Publisher"
-        ])
+        # ── поиск ──
+        self.search_edit = QLineEdit(placeholderText="🔍 Поиск: имя, общество, IPI, издатель…",
+                                     clearButtonEnabled=True)
+        root.addWidget(self.search_edit)
+
+        # ── таблица: модель → фильтр/сортировка → вид ──
+        self.model = ComposerTableModel(self)
+        self.proxy = ComposerFilter(self)
+        self.proxy.setSourceModel(self.model)
+        self.search_edit.textChanged.connect(self.proxy.set_search)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setSortingEnabled(True)
-        self.table.horizontalHeader().setSectionResizeMode(
-            QHeaderView.ResizeMode.ResizeToContents)
-        self.table.itemSelectionChanged.connect(self._toggle_remove_btn)
+        self.table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.table.verticalHeader().hide()
+        # ResizeToContents меряет каждую строку — на большой базе это дорого
+        hdr = self.table.horizontalHeader()
+        hdr.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        hdr.setStretchLastSection(True)
+        self.table.selectionModel().selectionChanged.connect(self._toggle_remove_btn)
         root.addWidget(self.table)
 
         # ── кнопки операций ──
@@ -62,12 +182,19 @@ class ComposerListPage(QWidget):
         self.remove_btn.setEnabled(False)
         self.remove_btn.setStyleSheet(BTN_STYLE)
 
+        self.count_lbl = QLabel()
+
         ops.addWidget(self.refresh_btn)
         ops.addWidget(self.add_btn)
         ops.addWidget(self.remove_btn)
         ops.addStretch(1)                           # сдвигаем кнопки влево
+        ops.addWidget(self.count_lbl)
         root.addLayout(ops)
 
+        for sig in (self.proxy.rowsInserted, self.proxy.rowsRemoved,
+                    self.proxy.modelReset, self.proxy.layoutChanged):
+            sig.connect(self._update_count)
+
         # ── подсказка ──
         hint = QLabel(
             "⚠ Чтобы изменить существующие данные, перезалейте **TOTAL METADATA** "
@@ -88,52 +215,54 @@ class ComposerListPage(QWidget):
         root.addLayout(nav)
 
     # ────────────────────── загрузка / отображение ──────────────────────
-    def load_composers(self):
-        self.table.setRowCount(0)
-        db_path = os.path.join(DATABASES_FOLDER, COMPOSER_DB_FILENAME)
-        data = load_json_safe(db_path, {"composers": {}, "publishers": {}})
-        composers   = data.get("composers", {})
-        publishers  = data.get("publishers", {})
-
-        for row, (full, info) in enumerate(sorted(composers.items())):
-            self.table.insertRow(row)
-
-            pub_key = info.get("publisher_key", "")
-            pub = publishers.get(pub_key, {})
-            pub_disp = pub.get("publisher_name", "")
-            if pub_disp and pub.get("publisher_society"):
-                pub_disp += f" ({pub['publisher_society']})"
-
-            # первый item хранит полное имя в UserRole (нужно для удаления)
-            item_first = QTableWidgetItem(info.get("first_name", ""))
-            item_first.setData(Qt.ItemDataRole.UserRole, full)
-            self.table.setItem(row, 0, item_first)
-            self.table.setItem(row, 1, QTableWidgetItem(info.get("middle_name", "")))
-            self.table.setItem(row, 2, QTableWidgetItem(info.get("last_name", "")))
-            self.table.setItem(row, 3, QTableWidgetItem(info.get("society", "")))
-            self.table.setItem(row, 4, QTableWidgetItem(info.get("ipi", "")))
-            self.table.setItem(row, 5, QTableWidgetItem(pub_disp))
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
+    def load_composers(self):
+        """Читает composer_database.json целиком и пересобирает модель."""
+        self._stamp = self._file_stamp()
+        self.data = load_json_safe(self.db_path, {"composers": {}, "publishers": {}})
+        self.data.setdefault("composers", {})
+        self.data.setdefault("publishers", {})
+        self.model.set_db(self.data["composers"], self.data["publishers"])
         self.remove_btn.setEnabled(False)           # после перезагрузки — неактивна
 
+    def showEvent(self, event):
+        # базу могли поменять Шаг 3 или импорт TOTAL METADATA — тогда перечитываем
+        if self._file_stamp() != self._stamp:
+            self.load_composers()
+        super().showEvent(event)
+
+    def _update_count(self, *_):
+        shown, total = self.proxy.rowCount(), self.model.rowCount()
+        self.count_lbl.setText(f"{shown} из {total}" if shown != total else f"Всего: {total}")
+
+    def _selected_key(self) -> str | None:
+        rows = self.table.selectionModel().selectedRows()
+        return self.proxy.data(rows[0], Qt.ItemDataRole.UserRole) if rows else None
+
     # ────────────────────── действия пользователя ───────────────────────
-    def _toggle_remove_btn(self):
-        self.remove_btn.setEnabled(bool(self.table.selectedItems()))
+    def _toggle_remove_btn(self, *_):
+        self.remove_btn.setEnabled(self._selected_key() is not None)
 
     def add_new_composer(self):
         dlg = AddComposerDialog(self)
         if dlg.exec():
-            full = f"{dlg.first_name_edit.text().strip()} {dlg.last_name_edit.text().strip()}"
+            # диалог сам записал JSON — в модель добавляем только новую строку
+            self.data["composers"][dlg.full_key] = dlg.composer
+            self.model.add(dlg.full_key, dlg.composer)
+            self._stamp = self._file_stamp()
             QMessageBox.information(self, "Добавлено",
-                                    f"Композитор «{full}» успешно добавлен!")
-            self.load_composers()
+                                    f"Композитор «{dlg.full_key}» успешно добавлен!")
 
     def remove_composer(self):
-        sel_items = self.table.selectedItems()
-        if not sel_items:
+        full = self._selected_key()
+        if not full:
             return
-        row = sel_items[0].row()
-        full = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
 
         if QMessageBox.question(
             self, "Удалить?", f"Удалить «{full}» из базы?",
@@ -141,18 +270,19 @@ class ComposerListPage(QWidget):
             QMessageBox.StandardButton.No) == QMessageBox.StandardButton.No:
             return
 
-        # правим JSON
-        db_path = os.path.join(DATABASES_FOLDER, COMPOSER_DB_FILENAME)
-        with open(db_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if full in data.get("composers", {}):
-            del data["composers"][full]
-            with open(db_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+        # правим JSON из памяти — без повторного чтения файла
+        if self.data["composers"].pop(full, None) is not None:
+            if not dump_json_safe(self.data, self.db_path):
+                QMessageBox.critical(self, "Ошибка",
+                                     f"Не удалось сохранить {COMPOSER_DB_FILENAME}.")
+                self.load_composers()
+                return
+            self._stamp = self._file_stamp()
+        Catalog().remove_writer(full)
+        self.model.remove(full)
         QMessageBox.information(self, "Удалено",
                                 f"Композитор «{full}» удалён.")
-        self.load_composers()
 
     # ─────────────────────────── навигация ────────────────────────────
     def go_back(self):
-        self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
+        self.main_app.pages.home()
@@ -0,0 +1,117 @@
+# core_batch.py
+"""
+Пакетная очередь альбомов.
+
+У каждого альбома своя сессия в _SESSIONS/<папка альбома>.json, альбомы
+обрабатываются параллельно, а тяжёлые конвертации (стемы на Шаге 2,
+WAV для Harvest на Шаге 6) делят общий лимит util_convert — сколько бы
+альбомов ни шло одновременно, ffmpeg/перепаковок не больше `workers`.
+
+Задание (job) — обычный словарь; его поля status/step/done/total/message
+обновляются по ходу работы, так что панель может просто перечитывать их.
+"""
+import os, time, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from util_json import load_json_safe
+from util_convert import set_global_workers, workers_from_config
+from util_task import TaskError, TaskCancelled
+from core_pipeline import Answers, options, run_steps
+
+SESSIONS_FOLDER = "_SESSIONS"
+
+STATUS_LABELS = {
+    "queued":    "⏳ В очереди",
+    "running":   "🔄 В работе",
+    "done":      "✅ Готово",
+    "failed":    "❌ Ошибка",
+    "cancelled": "⛔ Остановлено",
+}
+
+
+def session_path_for(album: str) -> str:
+    """Файл сессии альбома в пакетном режиме."""
+    return os.path.join(SESSIONS_FOLDER, f"{album}.json")
+
+
+def new_job(album: str, steps: list[int]) -> dict:
+    return {"album": album, "steps": list(steps), "session": session_path_for(album),
+            "status": "queued", "step": None, "done": 0, "total": 0,
+            "message": "", "started": None, "finished": None}
+
+
+def saved_sessions() -> dict[str, dict]:
+    """{папка альбома: сессия} для всех файлов в _SESSIONS."""
+    out = {}
+    if os.path.isdir(SESSIONS_FOLDER):
+        for fn in sorted(os.listdir(SESSIONS_FOLDER)):
+            if fn.endswith(".json"):
+                out[fn[:-5]] = load_json_safe(os.path.join(SESSIONS_FOLDER, fn), {})
+    return out
+
+
+# ──────────────────────────── запуск ────────────────────────────
+def run_batch(ctx, cfg: dict, jobs: list[dict], answers: dict | None = None,
+              yes: bool = False, workers: int | None = None) -> list[dict]:
+    """
+    Выполняет задания параллельно.  workers — общий лимит конвертаций
+    (по умолчанию из config.json).  Ошибка одного альбома не останавливает
+    остальные; «Отмена» (ctx) снимает все.
+    """
+    workers = workers or workers_from_config(cfg)
+    os.makedirs(SESSIONS_FOLDER, exist_ok=True)
+    ctx.log(f"📦 Альбомов: {len(jobs)}, потоков конвертации: {workers}")
+
+    finished, lock = 0, threading.Lock()
+    ctx.progress(0, len(jobs))
+
+    def _one(job: dict):
+        nonlocal finished
+        _run_job(ctx, cfg, job, answers or {}, yes, workers)
+        with lock:
+            finished += 1; ctx.progress(finished, len(jobs))
+
+    set_global_workers(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), workers))) as pool:
+            list(pool.map(_one, jobs))
+    finally:
+        set_global_workers(None)
+
+    ok = sum(j["status"] == "done" for j in jobs)
+    ctx.log(f"\n📦 Готово: {ok} из {len(jobs)}")
+    return jobs
+
+
+def _run_job(ctx, cfg: dict, job: dict, answers: dict, yes: bool, workers: int):
+    if ctx.cancelled:
+        job["status"] = "cancelled"; return
+    tag = job["album"].split()[0]
+
+    def _log(msg: str):
+        if msg.strip():
+            job["message"] = msg.strip().splitlines()[-1]
+        ctx.log("\n".join(f"[{tag}] {line}" if line else "" for line in msg.splitlines()))
+
+    def _progress(done: int, total: int):
+        job["done"], job["total"] = done, total
+
+    sub  = ctx.child(_log, _progress)
+    ans  = Answers(sub, answers, yes, album=job["album"])
+    opts = options(album=job["album"], workers=workers)
+    job.update(status="running", started=time.time())
+    try:
+        for n in job["steps"]:
+            job.update(step=n, done=0, total=0)
+            run_steps(sub, cfg, [n], job["session"], ans, opts)
+        job.update(status="done", message="Все шаги выполнены")
+    except TaskCancelled:
+        job.update(status="cancelled", message="Остановлено пользователем")
+    except TaskError as e:
+        _log(f"❌ {e}"); job.update(status="failed", message=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        msg = f"{type(e).__name__}: {e}"
+        _log(f"❌ {msg}"); job.update(status="failed", message=msg)
+    finally:
+        job["finished"] = time.time()
@@ -0,0 +1,246 @@
+# core_catalog.py
+"""
+Импорт _IMAGINE MUSIC TOTAL METADATA.xlsx за один проход.
+
+Каждый лист читается один раз и только нужными столбцами (usecols);
+очистка (NaN, 'nan', пробелы) — векторными операциями pandas, без
+iterrows.  Из одного и того же DataFrame получаются обе базы:
+composer_database.json (авторы + издатели) и каталог util_catalog
+(альбомы, треки, ISRC).  Результат — отчёт со скоростью в строках/с.
+
+Обычно импорт инкрементальный: для каждого листа в каталоге хранится
+отпечаток — число строк и хэш последних FINGERPRINT_ROWS строк.  Если
+отпечаток сошёлся, читаются (util_xlsx.SheetReader) только строки,
+добавленные после него; лист, изменённый в середине, перечитывается
+целиком — и тогда импорт становится полным, чтобы исправленный в
+середине листа IPI дошёл до баз.  Правило для повторов одно в обоих
+режимах: главнее первое упоминание автора/издателя.  Дописанные строки
+идут после прежних, поэтому уже известные ключи из них пропускаются.
+"""
+import os, json, time, hashlib
+import pandas as pd
+
+from util_json import load_json_safe, write_json_atomic
+from util_task import TaskError
+from util_catalog import Catalog, DATABASES_FOLDER
+from util_xlsx import SheetReader, XlsxLayoutError, sheet_names
+
+COMPOSER_DB_PATH = os.path.join(DATABASES_FOLDER, "composer_database.json")
+
+ALBUM_COLUMNS  = ["LIBRARY: Name", "ALBUM: Code", "ALBUM: Title", "ALBUM: Release Date",
+                  "ALBUM: Styles", "TRACK: Title", "TRACK: Number", "TRACK: Duration",
+                  "TRACK: BPM", "TRACK: Composer(s)", "TRACK: Audio Filename"]
+WRITER_FIELDS  = {"First Name": "first_name", "Middle Name": "middle_name",
+                  "Last Name": "last_name", "Society": "society", "IPI": "ipi",
+                  "Original Publisher": "publisher_key"}
+WRITER_COLUMNS = [f"WRITER:{i}: {f}" for i in (1, 2, 3) for f in WRITER_FIELDS]
+PUBLISHER_COLUMNS = ["PUBLISHER:1: Name", "PUBLISHER:1: Society", "PUBLISHER:1: IPI"]
+IMPORT_COLUMNS = ALBUM_COLUMNS + WRITER_COLUMNS + PUBLISHER_COLUMNS + ["CODE: ISRC"]
+
+FINGERPRINT_ROWS = 20
+STATE_KEY        = "total_import"            # отпечатки в Catalog.meta
+
+
+# ───────────────────── чтение и очистка ─────────────────────
+def read_sheet(xls: pd.ExcelFile, sheet: str) -> pd.DataFrame:
+    """Лист → DataFrame строк (все IMPORT_COLUMNS есть, пусто = "")."""
+    wanted = set(IMPORT_COLUMNS)
+    return clean_frame(pd.read_excel(xls, sheet_name=sheet, dtype=str,
+                                     usecols=lambda c: c in wanted))
+
+
+def rows_frame(header: list[str], rows: dict[int, list[str]]) -> pd.DataFrame:
+    """Строки SheetReader → DataFrame как у read_sheet (повтор заголовка — первый)."""
+    pos = {}
+    for i, name in enumerate(header):
+        pos.setdefault(str(name).strip() if name else name, i)
+    data = {c: [r[pos[c]] if c in pos and pos[c] < len(r) else "" for r in rows.values()]
+            for c in IMPORT_COLUMNS}
+    return clean_frame(pd.DataFrame(data, columns=IMPORT_COLUMNS, dtype=str))
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.reindex(columns=IMPORT_COLUMNS).fillna("")
+    df = df.apply(lambda col: col.astype(str).str.strip())
+    return df.mask(df.apply(lambda col: col.str.lower()) == "nan", "")
+
+
+def read_empty() -> pd.DataFrame:
+    return pd.DataFrame(columns=IMPORT_COLUMNS, dtype=str)
+
+
+def _join_names(*cols: pd.Series) -> pd.Series:
+    """First + Middle + Last без пустых частей (как " ".join(p for p in … if p))."""
+    out = cols[0]
+    for c in cols[1:]:
+        out = out.where(c == "", out + " " + c)
+    return out.str.strip()
+
+
+# ───────────────────── базы из DataFrame ─────────────────────
+def writers_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Все авторы строк: столбцы key, first_name … publisher_key и _order.
+    _order повторяет старый обход «строка за строкой, WRITER 1→3» —
+    при повторах остаётся первая запись, как с setdefault.
+    """
+    parts = []
+    for i in (1, 2, 3):
+        w = df[[f"WRITER:{i}: {f}" for f in WRITER_FIELDS]]
+        w.columns = list(WRITER_FIELDS.values())
+        w = w[(w["first_name"] != "") | (w["last_name"] != "")].copy()
+        w["key"]    = _join_names(w["first_name"], w["middle_name"], w["last_name"])
+        w["_order"] = w.index * 3 + i
+        parts.append(w)
+    return pd.concat(parts)
+
+
+def _tuples(df: pd.DataFrame, cols: list) -> list[tuple]:
+    return list(df[cols].itertuples(index=False, name=None))
+
+
+def catalog_records(df: pd.DataFrame, w: pd.DataFrame) -> dict[str, list[tuple]]:
+    """Кортежи для Catalog.bulk_import из очищенных строк и авторов."""
+    has_code = df["ALBUM: Code"] != ""
+    albums = df[has_code].drop_duplicates("ALBUM: Code", keep="last")
+    tracks = df[has_code & (df["TRACK: Number"] != "")] \
+               .drop_duplicates(["ALBUM: Code", "TRACK: Number"], keep="last")
+
+    isrc = df[df["CODE: ISRC"].str[-5:].str.isdigit()].drop_duplicates("CODE: ISRC")
+    isrc = isrc.assign(_prefix=isrc["CODE: ISRC"].str[:-5],
+                       _serial=isrc["CODE: ISRC"].str[-5:].astype(int).astype(object))
+
+    pubs = df[df["PUBLISHER:1: Name"] != ""].drop_duplicates("PUBLISHER:1: Name")
+    return {
+        "albums":  _tuples(albums, ["ALBUM: Code", "ALBUM: Title", "LIBRARY: Name",
+                                    "ALBUM: Release Date", "ALBUM: Styles"]),
+        "tracks":  _tuples(tracks, ["ALBUM: Code", "TRACK: Number", "TRACK: Title",
+                                    "TRACK: Duration", "TRACK: BPM", "TRACK: Composer(s)",
+                                    "TRACK: Audio Filename", "CODE: ISRC"]),
+        "writers": _tuples(w.assign(capacity=""), ["key", "first_name", "middle_name",
+                                                   "last_name", "capacity", "society",
+                                                   "ipi", "publisher_key"]),
+        "publishers": _tuples(pubs, PUBLISHER_COLUMNS),
+        "isrcs":   _tuples(isrc, ["CODE: ISRC", "_prefix", "_serial", "ALBUM: Code",
+                                  "ALBUM: Title", "TRACK: Title"]),
+    }
+
+
+def tail_hash(reader: SheetReader, upto: int) -> str:
+    """Хэш значений последних FINGERPRINT_ROWS строк до upto включительно."""
+    rows = reader.rows(max(2, upto - FINGERPRINT_ROWS + 1), upto)
+    return hashlib.blake2b(json.dumps(sorted(rows.items()), ensure_ascii=False).encode(),
+                           digest_size=16).hexdigest()
+
+
+def _source(xlsx: str) -> dict:
+    st = os.stat(xlsx)
+    return {"path": os.path.abspath(xlsx), "size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def _changed_rows(xlsx: str, sheet: str, fp: dict | None, full: bool,
+                  xls_cache: list) -> tuple[pd.DataFrame | None, dict | None, str]:
+    """
+    (новые строки листа, новый отпечаток, как прочитано).  None вместо
+    DataFrame — лист не менялся; None вместо отпечатка — лист нельзя
+    читать выборочно (такой лист всегда читается целиком).
+    """
+    try:
+        reader = SheetReader(xlsx, sheet)
+    except XlsxLayoutError:
+        reader = None
+
+    if reader and fp and not full and reader.last >= fp["rows"] \
+            and tail_hash(reader, fp["rows"]) == fp["tail"]:
+        new_fp = {"rows": reader.last, "tail": tail_hash(reader, reader.last)}
+        if reader.last == fp["rows"]:
+            return None, new_fp, "без изменений"
+        header = reader.rows(1, 1).get(1, [])
+        rows   = reader.rows(fp["rows"] + 1)             # пустые строки-разделители пропущены
+        return rows_frame(header, rows), new_fp, f"строки {min(rows)}–{reader.last}"
+
+    if not xls_cache:                                  # полный разбор — только если нужен
+        xls_cache.append(pd.ExcelFile(xlsx))
+    new_fp = {"rows": reader.last, "tail": tail_hash(reader, reader.last)} if reader else None
+    return read_sheet(xls_cache[0], sheet), new_fp, "целиком"
+
+
+def import_total(ctx, xlsx: str, composer_db: str, catalog: Catalog | None = None,
+                 full: bool = False) -> dict:
+    """
+    TOTAL METADATA → composer_db (JSON) + каталог.  full=True — прежняя
+    полная пересборка: все листы целиком, composer_db перезаписывается.
+    Иначе читаются только дописанные строки, и из них добавляются новые
+    авторы/издатели; лист, изменённый в середине, переводит импорт в
+    полный.  Возвращает отчёт {rows, seconds,
+    rows_per_sec, sheets, composers, publishers, isrcs}.
+    """
+    if not os.path.exists(xlsx):
+        raise TaskError(f"Не найден файл:\n{xlsx}")
+    catalog = catalog or Catalog()
+    t0 = time.perf_counter()
+
+    state = catalog.get_meta(STATE_KEY, {})
+    full  = full or not os.path.exists(composer_db) or \
+            state.get("source", {}).get("path") != os.path.abspath(xlsx)
+    if not full and state.get("source") == _source(xlsx):
+        ctx.log("✅ TOTAL METADATA не менялся с прошлого импорта.")
+        return {"rows": 0, "seconds": time.perf_counter() - t0, "rows_per_sec": 0.0,
+                "sheets": {}, "composers": 0, "publishers": 0, "isrcs": 0}
+
+    names = sheet_names(xlsx)
+    frames, sheets, prints, total, xls_cache = [], {}, {}, 0, []
+    for n, sheet in enumerate(names):
+        ctx.check(); ctx.progress(n, len(names))
+        t  = time.perf_counter()
+        fp = state.get("sheets", {}).get(sheet)
+        df, prints[sheet], how = _changed_rows(xlsx, sheet, fp, full, xls_cache)
+        if fp and not full and how == "целиком":
+            # правка в середине листа: перечитанное должно вытеснить прежние
+            # записи, а это честно только при полной пересборке
+            ctx.log(f"📄 {sheet}: изменён не в конце — импорт будет полным")
+            return import_total(ctx, xlsx, composer_db, catalog, full=True)
+        if df is None:
+            ctx.log(f"📄 {sheet}: без изменений"); continue
+        df.index = pd.RangeIndex(total, total + len(df))   # сквозной порядок строк
+        frames.append(df)
+        total += len(df)
+        sheets[sheet] = {"rows": len(df), "seconds": time.perf_counter() - t}
+        ctx.log(f"📄 {sheet}: {how}, {len(df)} строк за {sheets[sheet]['seconds']:.2f} с")
+    ctx.progress(len(names), len(names))
+
+    df = pd.concat(frames) if frames else read_empty()
+    w  = writers_frame(df).sort_values("_order", kind="stable").drop_duplicates("key")
+    recs = catalog_records(df, w)
+
+    # composer_database.json — тот же формат, что и раньше
+    res = {"composers": {}, "publishers": {}} if full else \
+          load_json_safe(composer_db, {"composers": {}, "publishers": {}})
+    res.setdefault("composers", {}); res.setdefault("publishers", {})
+    old    = json.dumps(res, sort_keys=True)
+    before = (len(res["composers"]), len(res["publishers"]))
+    if not full:                                     # первое упоминание — из прежних строк
+        recs["writers"]    = [r for r in recs["writers"] if r[0] not in res["composers"]]
+        recs["publishers"] = [p for p in recs["publishers"] if p[0] not in res["publishers"]]
+    for r in recs["writers"]:
+        res["composers"][r[0]] = dict(zip(("first_name", "middle_name", "last_name"), r[1:4]),
+                                      society=r[5], ipi=r[6], publisher_key=r[7])
+    for name, soc, ipi in recs["publishers"]:
+        res["publishers"][name] = {"publisher_name": name, "publisher_society": soc,
+                                   "publisher_ipi": ipi}
+    if full or json.dumps(res, sort_keys=True) != old:
+        os.makedirs(os.path.dirname(composer_db) or ".", exist_ok=True)
+        write_json_atomic(res, composer_db, indent=4)   # отмена посреди записи не обрежет базу
+    catalog.bulk_import(**recs, full=full)
+    catalog.set_meta(STATE_KEY, {"source": _source(xlsx),
+                                 "sheets": {k: v for k, v in prints.items() if v}})
+
+    secs   = time.perf_counter() - t0
+    report = {"rows": total, "seconds": secs, "rows_per_sec": total / secs if secs else 0.0,
+              "sheets": sheets, "composers": len(res["composers"]) - (0 if full else before[0]),
+              "publishers": len(res["publishers"]) - (0 if full else before[1]),
+              "isrcs": len(recs["isrcs"])}
+    ctx.log(f"⏱ {total} строк за {secs:.2f} с — {report['rows_per_sec']:.0f} строк/с")
+    ctx.log(f"✅ {'Композиторов' if full else 'Новых композиторов'}: {report['composers']}, "
+            f"издателей: {report['publishers']}, ISRC: {report['isrcs']}")
+    return report
@@ -0,0 +1,166 @@
+# core_composers.py
+"""
+Шаг 3 без GUI: сопоставление композиторов треков с composer_database.json.
+
+Имена, которых нет в базе, решает колбэк resolve(имя, база, подсказки) →
+ключ базы или "" (окно выбора в GUI, ответы из файла в CLI); подсказки —
+похожие ключи из ComposerIndex.suggest().
+"""
+import os, re, json, unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Callable
+
+DATABASES_FOLDER     = "_DATABASES"
+COMPOSER_DB_FILENAME = "composer_database.json"
+COMPOSER_DB_PATH     = os.path.join(DATABASES_FOLDER, COMPOSER_DB_FILENAME)
+
+
+# ───────────────────── индекс имён ─────────────────────
+# транслитерация кириллицы и выравнивание латинских вариантов:
+# Denys/Denis, Kaydalov/Kaidalov, Kharkov/Harkov, Alexey/Aleksei → одно и то же
+_CYR = dict(zip("абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+                ["a","b","v","g","d","e","e","zh","z","i","i","k","l","m","n","o",
+                 "p","r","s","t","u","f","h","ts","ch","sh","sch","","i","","e","iu","ia"]))
+_FOLD = (("kh", "h"), ("ph", "f"), ("ck", "k"), ("x", "ks"), ("w", "v"),
+         ("y", "i"), ("j", "i"))
+
+
+def _tokens(name: str) -> list[str]:
+    """Имя → слова в нижнем регистре без диакритики."""
+    s = unicodedata.normalize("NFKD", name.lower())
+    s = "".join(_CYR.get(c, c) for c in s if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", s).split()
+
+
+def _plain(name: str) -> list[str]:
+    """Слова имени без учёта регистра, пробелов и диакритики — и только."""
+    s = unicodedata.normalize("NFKD", name.lower())
+    return "".join(c for c in s if not unicodedata.combining(c)).split()
+
+
+def _fold(token: str) -> str:
+    for a, b in _FOLD:
+        token = token.replace(a, b)
+    return re.sub(r"(.)\1+", r"\1", token)          # удвоенные буквы
+
+
+def _grams(folded: str) -> set[str]:
+    s = f"  {folded} "
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+
+class ComposerIndex:
+    """
+    Индекс ключей базы композиторов, строится один раз на прогон.
+
+    lookup()  — совпадение без участия пользователя: точное или с точностью
+                до регистра, пробелов и диакритики, плюс прежнее правило
+                First + Last.  Варианты транслитерации (Jan/Ian, Petrov/
+                Petrow) — разные люди могут так совпасть, поэтому они
+                только в suggest(): похожие ключи по триграммам, лучшие
+                первыми, — и выбор подтверждает пользователь.
+                Просматриваются только ключи с общими триграммами.
+    """
+
+    def __init__(self, db: dict[str, dict]):
+        self.db = db
+        self.keys:   list[str] = []
+        self.folded: list[str] = []
+        self._known: set[str] = set()
+        self._exact: dict[str, str] = {}                    # «john smith» → ключ
+        self._names: dict[tuple[str, str], str] = {}        # (first, last) → ключ
+        self._grams: dict[str, list[int]] = {}              # триграмма → ids
+        for key in db:
+            self.add(key)
+
+    def add(self, key: str):
+        """Добавляет ключ (например, только что внесённого композитора)."""
+        if key in self._known:
+            return
+        self._known.add(key)
+        i, toks = len(self.keys), _tokens(key)
+        folded = [_fold(t) for t in toks]
+        self.keys.append(key)
+        self.folded.append(" ".join(folded))
+        plain = _plain(key)
+        self._exact.setdefault(" ".join(plain), key)
+        if len(plain) >= 2:                                 # первый по порядку базы
+            self._names.setdefault((plain[0], plain[-1]), key)
+        for g in _grams(self.folded[i]):
+            self._grams.setdefault(g, []).append(i)
+
+    def lookup(self, name: str) -> str | None:
+        """Ключ базы для того же написания имени, иначе None."""
+        norm = " ".join(name.split()).strip()
+        if norm in self.db:
+            return norm
+        toks = _plain(norm)
+        if key := self._exact.get(" ".join(toks)):
+            return key
+        if len(toks) < 2:
+            return None
+        # First + Last (Middle — опц.)
+        return self._names.get((toks[0], toks[-1]))
+
+    def suggest(self, name: str, limit: int = 5, cutoff: float = 0.5) -> list[str]:
+        """До limit ключей, похожих на name, — лучшие первыми."""
+        q = " ".join(_fold(t) for t in _tokens(name))
+        if not q:
+            return []
+        qg = _grams(q)
+        shared = Counter(i for g in qg for i in self._grams.get(g, ()))
+        # грубый отбор по коэффициенту Дайса, затем уточнение по SequenceMatcher
+        rough = sorted(shared, key=lambda i: -2 * shared[i] /
+                       (len(qg) + len(_grams(self.folded[i]))))[:limit * 4]
+        scored = []
+        for i in rough:
+            dice  = 2 * shared[i] / (len(qg) + len(_grams(self.folded[i])))
+            ratio = SequenceMatcher(None, q, self.folded[i]).ratio()
+            score = max(ratio, (dice + ratio) / 2)
+            if score >= cutoff:
+                scored.append((score, self.keys[i]))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [k for _, k in scored[:limit]]
+
+
+def smart_lookup(name: str, db: dict[str, dict]) -> str | None:
+    """Разовый поиск; для многих имён подряд — ComposerIndex."""
+    return ComposerIndex(db).lookup(name)
+
+
+def load_composer_db(path: str = COMPOSER_DB_PATH) -> dict[str, dict] | None:
+    """Раздел «composers» базы или None, если файла нет."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("composers", {})
+
+
+def match_composers(session: dict, db: dict[str, dict],
+                    resolve: Callable[[str, dict, list[str]], str]) -> list[str]:
+    """
+    Заполняет tr["matched_composers"] у всех треков session.
+    Возвращает имена, которые так и не удалось сопоставить.
+    Каждое неизвестное имя решается один раз за прогон.
+    """
+    index = ComposerIndex(db)
+    decided: dict[str, str] = {}
+    unresolved = []
+    tracks = session.get("tracks", [])
+    for tr in tracks:
+        matched = []
+        for name in tr.get("composers", []):
+            key = index.lookup(name)
+            if not key:
+                if name not in decided:
+                    decided[name] = resolve(name, db, index.suggest(name))
+                    if decided[name] in db:            # новый композитор из окна
+                        index.add(decided[name])
+                    elif not decided[name]:
+                        unresolved.append(name)
+                key = decided[name]
+            matched.append(key)
+        tr["matched_composers"] = matched
+    session["tracks"] = tracks
+    return unresolved
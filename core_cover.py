@@ -0,0 +1,26 @@
+# core_cover.py
+"""Шаг 4 без GUI: обложка «8 MB» из _ALL ALBUMS COVERS → папка альбома."""
+import os, re, shutil
+
+from util_task import TaskError
+
+
+def copy_cover(ctx, covers_root: str, code: str, name: str, aiff: str) -> str:
+    """Находит файл с «8 MB» и копирует его в альбом.  Возвращает путь копии."""
+    album_dir = os.path.join(covers_root, f"{code} {name}")
+    if not os.path.isdir(album_dir):
+        raise TaskError(f"Нет папки: {album_dir}")
+    cover = next((f for f in os.listdir(album_dir)
+                  if re.search(r"8[\s_]?mb", f, re.I)), None)
+    if not cover:
+        raise TaskError("Не найден файл с «8 MB».")
+    ctx.log(f"✅ Найден файл: {cover}")
+
+    ext = os.path.splitext(cover)[1]
+    dst = os.path.join(aiff, f"{code} {name}{ext}")
+    try:
+        shutil.copy2(os.path.join(album_dir, cover), dst)
+        ctx.log(f"✅ Скопировано → {os.path.basename(dst)}")
+    except Exception as e:
+        raise TaskError(f"Ошибка копирования: {e}")
+    return dst
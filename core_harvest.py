@@ -0,0 +1,238 @@
+# core_harvest.py
+"""
+Шаг 6 без GUI: проверка финальных AIFF/MP3 и сборка папки альбома
+в Harvest Albums (обложка, WAV 24/48, METADATA.xlsx и .txt).
+
+Папка не пересоздаётся с нуля: готовые файлы записаны в манифест шага
+(util_manifest), и повторный запуск делает только недостающие или
+устаревшие, а лишнее из папки убирает.
+"""
+import os, shutil, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from util_audio import is_pcm_24_48_be, aiff_to_wav, read_wav_header
+from util_cache import audio_cache
+from util_convert import ffmpeg_convert, conversion_slot, run_parallel, workers_from_config
+from util_convcache import cached_convert
+from util_task import TaskError
+from util_manifest import Manifest, manifest_path
+from util_verify import verify_album, format_report
+from util_scratch import Scratch
+from core_metadata import metadata_path, write_metadata_txt
+
+
+# ---------- verify ----------
+def verify_all_tracks(ctx, session: dict, cfg: dict, workers: int | None = None) -> list[dict]:
+    """
+    Финальные AIFF/MP3 на месте и целы (util_verify).  Возвращает отчёт
+    по файлам; если хоть один не прошёл проверку — TaskError.
+    """
+    p_aiff = cfg.get("_ALL ALBUMS AIFF","")
+    p_mp3  = cfg.get("_ALL ALBUMS MP3","")
+    if not os.path.isdir(p_aiff) or not os.path.isdir(p_mp3):
+        raise TaskError("Папки AIFF / MP3 не найдены в config.json")
+
+    f_aiff_folder = session.get("album_path_aiff","")
+    f_mp3_folder  = session.get("album_path_mp3","")
+    if not os.path.isdir(f_aiff_folder) or not os.path.isdir(f_mp3_folder):
+        raise TaskError("Альбом не найден в AIFF или MP3")
+
+    ctx.log("🔎 Проверяю финальные AIFF и MP3…")
+    report = verify_album(session, workers or workers_from_config(cfg))
+    ctx.check()
+    ctx.log(format_report(report))
+    bad = [r for r in report if not r["ok"]]
+    if bad:
+        raise TaskError(f"Не прошли проверку файлов: {len(bad)} из {len(report)}\n" +
+                        "\n".join(f"• {r['kind']} {r['file'] or r['track']}: {r['message']}"
+                                   for r in bad))
+    ctx.log("✅ Все треки найдены и целы.")
+    return report
+
+
+# ---------- prepare ----------
+def harvest_album_path(session: dict, cfg: dict) -> str:
+    """Папка альбома в Harvest Albums (сама папка Harvest должна существовать)."""
+    hv_root = cfg.get("_ALL ALBUMS HARVEST","")
+    if not os.path.isdir(hv_root):
+        raise TaskError("Папка Harvest Albums не найдена!")
+    code = session.get("album_code","IMG000")
+    name = session.get("album_name","Unknown")
+    return os.path.join(hv_root, f"{code} {name}")
+
+
+def build_harvest(ctx, session: dict, cfg: dict, hv_album: str, workers: int | None = None):
+    """
+    Папка Harvest: обложка, WAV 24/48, .xlsx и .txt.
+    WAV конвертируются пулом из workers потоков (по умолчанию из config.json),
+    а копирование остальных файлов и .txt идут параллельно с ними; в конце —
+    одна общая проверка результата.
+    """
+    code = session.get("album_code","IMG000")
+    name = session.get("album_name","Unknown")
+    cover= session.get("cover_file","")
+    meta_root = cfg.get("_ALL ALBUMS METADATA","")
+
+    # план: (что делать, исходник, результат)
+    plan: list[tuple[str, str, str]] = []
+    if cover and os.path.exists(cover):
+        plan.append(("copy", cover, os.path.join(hv_album, os.path.basename(cover))))
+
+    aiff_folder = session["album_path_aiff"]
+    for fname in sorted(os.listdir(aiff_folder)):
+        fpath = os.path.join(aiff_folder, fname)
+        if os.path.isdir(fpath) or fpath == cover:   # Stems не нужны, обложка уже в плане
+            continue
+        if fname.lower().endswith((".aif", ".aiff")):
+            plan.append(("wav", fpath, os.path.join(hv_album, os.path.splitext(fname)[0] + ".wav")))
+        else:                                   # копируем «как есть»
+            plan.append(("copy", fpath, os.path.join(hv_album, fname)))
+
+    meta_xlsx = metadata_path(meta_root, code, name)
+    if os.path.exists(meta_xlsx):
+        dst_xlsx = os.path.join(hv_album, os.path.basename(meta_xlsx))
+        plan.append(("copy", meta_xlsx, dst_xlsx))
+        plan.append(("txt",  meta_xlsx, dst_xlsx.replace(".xlsx", ".txt")))
+    else:
+        ctx.log("❌ Файл METADATA.xlsx не найден — пропускаем.")
+
+    # папка: создаём или убираем из неё всё, чего нет в плане
+    try:
+        os.makedirs(hv_album, exist_ok=True)
+        expected = {os.path.basename(dst) for _, _, dst in plan}
+        for fname in os.listdir(hv_album):
+            if fname in expected:
+                continue
+            p = os.path.join(hv_album, fname)
+            if os.path.isdir(p): shutil.rmtree(p)
+            else:                os.remove(p)
+            ctx.log(f"🗑 Удалён лишний файл: {fname}")
+    except OSError as e:
+        raise TaskError(f"Не удалось подготовить папку {hv_album}: {e}")
+
+    manifest = Manifest(manifest_path(session, 6))
+    manifest.forget({dst for _, _, dst in plan})
+    todo     = [(k, s, d) for k, s, d in plan if not manifest.is_done(d, s)]
+    skipped  = len(plan) - len(todo)
+    wav_jobs = [(dst, src) for kind, src, dst in todo if kind == "wav"]
+    workers  = workers or workers_from_config(cfg)
+    finished, failed, lock = 0, [], threading.Lock()
+    ctx.progress(0, len(todo))
+
+    def _tick():
+        nonlocal finished
+        with lock:
+            finished += 1; ctx.progress(finished, len(todo))
+
+    def _done(_i, job, ok):
+        dst, src = job
+        if ok:
+            manifest.done(dst, src); ctx.log(f"✅ {os.path.basename(src)} → WAV")
+        else:
+            manifest.failed(dst)
+            with lock: failed.append(os.path.basename(src))
+        _tick()
+
+    def _side():
+        """Обложка, прочие файлы, .xlsx и .txt — пока идут конвертации."""
+        for kind, src, dst in todo:
+            if kind == "wav":
+                continue
+            ctx.check()
+            manifest.start(dst, src)
+            if kind == "txt":
+                if err := generate_tab_delimited(src, dst):
+                    manifest.failed(dst, err)
+                    ctx.log(f"❌ Не удалось сохранить TXT: {err}")
+                else:
+                    manifest.done(dst, src)
+                    ctx.log("✅ Метаданные и TXT скопированы.")
+            else:
+                shutil.copy2(src, dst)
+                manifest.done(dst, src)
+                if src == cover:
+                    ctx.log("✅ Обложка скопирована.")
+            _tick()
+
+    ctx.log(f"🔄 WAV: {len(wav_jobs)} (потоков: {workers}), прочих файлов: {len(todo) - len(wav_jobs)}")
+    try:
+        with ThreadPoolExecutor(max_workers=1) as side_pool:
+            side = side_pool.submit(_side)
+            # AIFF → WAV; в режиме staging — через локальную черновую папку
+            scratch = Scratch.from_config(cfg)
+            convert = lambda dst, src, origin=None: convert_to_wav_24_48(src, dst, origin)
+            if scratch:
+                scratch.run(ctx, wav_jobs, convert, workers, _done, lambda: ctx.cancelled)
+            else:
+                run_parallel(wav_jobs, convert, workers, _done, lambda: ctx.cancelled)
+            side.result()                       # ошибки копирования — сюда
+        ctx.check()
+        if failed:
+            raise TaskError(f"Не удалось конвертировать: {', '.join(sorted(failed))}")
+
+        # одна проверка всего результата
+        if problems := verify_outputs(plan):
+            for dst, why in problems:
+                manifest.failed(dst, why)
+            raise TaskError("Проверка папки Harvest не пройдена:\n" +
+                            "\n".join(f"• {os.path.basename(d)}: {why}" for d, why in problems))
+        ctx.log(f"🔎 Проверено файлов: {len(plan)}")
+    finally:
+        manifest.save()
+        audio_cache().save()
+
+    if skipped:
+        ctx.log(f"↩ Готово с прошлого запуска: {skipped} из {len(plan)} — пропущено")
+    ctx.log(f"✅ Папка для Harvest подготовлена: {hv_album}")
+
+
+def verify_outputs(plan: list[tuple[str, str, str]]) -> list[tuple[str, str]]:
+    """
+    Итоговая проверка плана: копии совпадают по размеру с исходником,
+    WAV — 24 bit / 48 kHz с тем же числом фреймов, что и AIFF, .txt не пуст.
+    Возвращает [(файл, что не так)].
+    """
+    problems = []
+    for kind, src, dst in plan:
+        if not os.path.isfile(dst):
+            problems.append((dst, "файла нет")); continue
+        if kind == "copy":
+            if os.path.getsize(dst) != os.path.getsize(src):
+                problems.append((dst, "размер не совпадает с исходником"))
+        elif kind == "txt":
+            if os.path.getsize(dst) == 0:
+                problems.append((dst, "пустой файл"))
+        else:
+            wav, aiff = read_wav_header(dst), audio_cache().probe(src) or {}
+            if not wav or wav.get("bit_depth") != 24 or int(wav.get("sample_rate", 0)) != 48000:
+                problems.append((dst, "не WAV 24 bit / 48 kHz"))
+            elif aiff.get("frames") and aiff.get("sample_rate") == 48000 \
+                    and wav.get("frames") != aiff["frames"]:
+                problems.append((dst, f"{wav.get('frames')} фреймов вместо {aiff['frames']}"))
+    return problems
+
+
+# ---------- converters ----------
+WAV_FORMAT = "wav pcm_s24le 48000"                  # ключ формата в кэше конвертаций
+
+def convert_to_wav_24_48(src, dst, origin=None) -> bool:
+    # AIFF 24/48 → WAV: только заголовок + разворот байт, без ffmpeg;
+    # остальное — ffmpeg через общий кэш конвертаций.  origin — исходный
+    # AIFF, если src — его копия в черновой папке (по нему ключ и probe)
+    origin = origin or src
+    with conversion_slot():
+        info = audio_cache().probe(origin)
+        if is_pcm_24_48_be(info) and aiff_to_wav(src, dst, info):
+            return True
+        return bool(cached_convert(src, dst, WAV_FORMAT,
+                                   lambda s, d: ffmpeg_convert(s, d, "pcm_s24le", 48000),
+                                   key_src=origin))
+
+
+def generate_tab_delimited(xlsx_path, txt_path) -> str | None:
+    """xlsx → таб-разделённый .txt.  None при успехе, иначе текст ошибки."""
+    try:
+        write_metadata_txt(xlsx_path, txt_path)
+    except Exception as e:
+        return str(e)
+    return None
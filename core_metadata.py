@@ -0,0 +1,392 @@
+# core_metadata.py
+"""
+Шаг 5 без GUI: строки METADATA.xlsx альбома, ISRC-коды и синхронизация
+с _IMAGINE MUSIC TOTAL METADATA.xlsx.
+
+Ручные поля треков (manual_description / manual_instrumentation /
+manual_keywords) заполняет вызывающий код — из таблицы окна или из
+файла ответов CLI.
+"""
+import os, csv, shutil, zipfile
+import xml.etree.ElementTree as ET
+# pandas и openpyxl импортируются внутри функций: модуль грузится вместе с
+# окном приложения (через core_pipeline), а нужны они только на Шагах 5–6.
+
+from collections.abc import Mapping
+
+from util_task import TaskError
+from util_catalog import Catalog
+from util_xlsx import append_rows, XlsxLayoutError
+from util_manifest import fingerprint
+
+TOTAL_METADATA_FILE = "_IMAGINE MUSIC TOTAL METADATA.xlsx"
+TOTAL_BACKUP_FILE   = "_IMAGINE MUSIC TOTAL METADATA (backup).xlsx"
+
+COLUMNS = [
+    "LIBRARY: Name","ALBUM: Code","ALBUM: Identity","ALBUM: Title","ALBUM: Display Title",
+    "ALBUM: Description","ALBUM: Keywords","ALBUM: Tags","ALBUM: Styles","ALBUM: Release Date",
+    "ALBUM: Artwork Filename",
+    "TRACK: Title","TRACK: Display Title","TRACK: Alternate Title","TRACK: Description",
+    "TRACK: Number","TRACK: Is Main","TRACK: Main Track Number","TRACK: Version","TRACK: Duration",
+    "TRACK: BPM","TRACK: Tempo","TRACK: Genre","TRACK: Mixout","TRACK: Instrumentation",
+    "TRACK: Keywords","TRACK: Lyrics","TRACK: Identity","TRACK: Category Codes",
+    "TRACK: Composer(s)","TRACK: Publisher(s)","TRACK: Artist(s)","TRACK: Audio Filename",
+    "ARTIST:1: First Name","ARTIST:1: Middle Name","ARTIST:1: Last Name",
+    "ARTIST:1: Society","ARTIST:1: IPI",
+    "WRITER:1: First Name","WRITER:1: Middle Name","WRITER:1: Last Name",
+    "WRITER:1: Capacity","WRITER:1: Society","WRITER:1: IPI","WRITER:1: Territory",
+    "WRITER:1: Owner Performance Share %","WRITER:1: Owner Mechanical Share %","WRITER:1: Original Publisher",
+    "WRITER:2: First Name","WRITER:2: Middle Name","WRITER:2: Last Name",
+    "WRITER:2: Capacity","WRITER:2: Society","WRITER:2: IPI","WRITER:2: Territory",
+    "WRITER:2: Owner Performance Share %","WRITER:2: Owner Mechanical Share %","WRITER:2: Original Publisher",
+    "WRITER:3: First Name","WRITER:3: Middle Name","WRITER:3: Last Name",
+    "WRITER:3: Capacity","WRITER:3: Society","WRITER:3: IPI","WRITER:3: Territory",
+    "WRITER:3: Owner Performance Share %","WRITER:3: Owner Mechanical Share %","WRITER:3: Original Publisher",
+    "PUBLISHER:1: Name","PUBLISHER:1: Capacity","PUBLISHER:1: Society","PUBLISHER:1: IPI",
+    "PUBLISHER:1: Territory","PUBLISHER:1: Owner Performance Share %","PUBLISHER:1: Owner Mechanical Share %",
+    "PUBLISHER:2: Name","PUBLISHER:2: Capacity","PUBLISHER:2: Society","PUBLISHER:2: IPI",
+    "PUBLISHER:2: Territory","PUBLISHER:2: Owner Performance Share %","PUBLISHER:2: Owner Mechanical Share %",
+    "CODE: ISWC","CODE: ISRC"
+]
+
+
+# ────────────────────── базы ──────────────────────
+def load_databases() -> tuple[Mapping, Mapping, Catalog]:
+    """
+    (composers, publishers, catalog).  composers/publishers — словари-
+    представления каталога: запись читается запросом при обращении.
+    """
+    catalog = Catalog()
+    return catalog.composers(), catalog.publishers(), catalog
+
+
+def metadata_path(meta_dir: str, code: str, name: str) -> str:
+    """Путь METADATA.xlsx альбома в _ALL ALBUMS METADATA."""
+    return os.path.join(meta_dir, f"{code.upper()} {name.upper()} METADATA.xlsx")
+
+
+# ────────────────────── ISRC ──────────────────────
+def reserve_isrc(catalog: Catalog, ses: dict) -> list[str]:
+    """Коды для треков альбома — резервируются в каталоге сразу."""
+    return catalog.reserve_isrc(ses.get("album_code",""),
+                                [t.get("track_name","") for t in ses.get("tracks",[])],
+                                ses.get("album_name",""))
+
+
+# ────────────────────── util helpers ──────────────────────
+def lib_name(code: str) -> str:
+    return "Imagine Music Tools" if code.startswith("IMT") else "Imagine Music"
+
+def dur_mmss(sec: float) -> str:
+    m, s = divmod(int(sec or 0), 60)
+    return f"{m}.{s:02d}"
+
+def tempo(bpm) -> str:
+    try: bpm = int(bpm)
+    except: bpm = 0
+    if bpm <= 70:  return "Slow"
+    if bpm <= 90:  return "Downtempo"
+    if bpm <= 115: return "Midtempo"
+    if bpm <= 140: return "Uptempo"
+    return "Fast"
+
+
+# ────────────────────── writer / publisher helpers ──────────────────────
+def full_name(w):                      # first + middle + last
+    return " ".join(p for p in (w["first_name"], w["middle_name"], w["last_name"]) if p).strip()
+
+def even_shares(n):
+    base, rem = divmod(100, n)
+    return [base + (1 if i < rem else 0) for i in range(n)]
+
+def build_wp(names, composers: dict, publishers: dict):
+    n = len(names)
+    if n == 0: return [], []
+    shares = ([100] if n == 1 else
+              [50, 50][:n] if n == 2 else
+              [34, 33, 33][:n] if n == 3 else
+              even_shares(n))
+
+    writers, pubs = [], {}
+    for share, nm in zip(shares, names):
+        c = composers.get(nm, {})
+        pub_key = c.get("publisher_key", "")
+        p_info  = publishers.get(pub_key, {}) if pub_key else {}
+        w = dict(
+            first_name=c.get("first_name", ""), middle_name=c.get("middle_name", ""),
+            last_name=c.get("last_name", ""),  capacity=c.get("capacity", "Composer/Author"),
+            society=c.get("society", ""), ipi=c.get("ipi", ""),
+            publisher_name = p_info.get("publisher_name", pub_key),
+            owner_perf_share=str(share), owner_mech_share=str(share)
+        )
+        writers.append(w)
+
+        if w["publisher_name"]:
+            pubs.setdefault(w["publisher_name"], dict(
+                publisher_name = w["publisher_name"],
+                publisher_society = p_info.get("publisher_society", ""),
+                publisher_ipi = p_info.get("publisher_ipi", ""),
+                owner_perf_share = w["owner_perf_share"],
+                owner_mech_share = w["owner_mech_share"]
+            ))
+    return writers, list(pubs.values())
+
+def fill_writer(rd, slots, idx):
+    p = f"WRITER:{idx}"
+    w = slots[idx-1]
+    if not w:
+        return                          # пустые ячейки дают rd.get(col, "")
+    rd[f"{p}: First Name"] = w["first_name"]
+    rd[f"{p}: Middle Name"] = w["middle_name"]
+    rd[f"{p}: Last Name"] = w["last_name"]
+    rd[f"{p}: Capacity"] = w["capacity"]
+    rd[f"{p}: Society"] = w["society"]
+    rd[f"{p}: IPI"] = w["ipi"]
+    rd[f"{p}: Territory"] = "WORLD"
+    rd[f"{p}: Owner Performance Share %"] = w["owner_perf_share"]
+    rd[f"{p}: Owner Mechanical Share %"] = w["owner_mech_share"]
+    rd[f"{p}: Original Publisher"] = w["publisher_name"]
+
+def fill_publisher(rd, pubs, idx):
+    p = f"PUBLISHER:{idx}"
+    if idx > len(pubs):
+        return
+    pb = pubs[idx-1]
+    rd[f"{p}: Name"]       = pb["publisher_name"]
+    rd[f"{p}: Capacity"]   = "Original Publisher"
+    rd[f"{p}: Society"]    = pb["publisher_society"]
+    rd[f"{p}: IPI"]        = pb["publisher_ipi"]
+    rd[f"{p}: Territory"]  = "WORLD"
+    rd[f"{p}: Owner Performance Share %"] = pb["owner_perf_share"]
+    rd[f"{p}: Owner Mechanical Share %"]  = pb["owner_mech_share"]
+
+
+# ────────────────────── строки METADATA ──────────────────────
+def build_rows(ses: dict, composers: Mapping, publishers: Mapping, new_isrc: list[str],
+               day: str, desc: str, style: str) -> list[list[str]]:
+    """
+    Строки METADATA.xlsx (в порядке COLUMNS).  new_isrc — коды треков
+    по порядку (reserve_isrc).
+    """
+    code, name, cover = (ses.get(k, "") for k in ("album_code", "album_name", "cover_file"))
+    tracks = ses.get("tracks", [])
+
+    # общий набор ключевых слов альбома
+    album_kw = sorted({kw.strip()
+                       for t in tracks
+                       for kw in t.get("manual_keywords","").split(",")
+                       if kw.strip()})
+    album_kw_str = ", ".join(album_kw)
+
+    rows = []
+
+    for i,trk in enumerate(tracks):
+        rd = {}
+        # --- ALBUM ---
+        rd.update({
+            "LIBRARY: Name"        : lib_name(code),
+            "ALBUM: Code"          : code,
+            "ALBUM: Identity"      : "",
+            "ALBUM: Title"         : name,
+            "ALBUM: Display Title" : f"{code} {name}",
+            "ALBUM: Description"   : desc,
+            "ALBUM: Keywords"      : album_kw_str,
+            "ALBUM: Tags"          : "",
+            "ALBUM: Styles"        : style,
+            "ALBUM: Release Date"  : day,
+            "ALBUM: Artwork Filename": os.path.basename(cover)
+        })
+        # --- TRACK ---
+        rd["TRACK: Title"]         = trk.get("track_name","")
+        rd["TRACK: Display Title"] = trk.get("track_name","")
+        rd["TRACK: Alternate Title"]= ""
+        rd["TRACK: Description"]   = trk.get("manual_description","")
+        rd["TRACK: Number"]        = str(i+1)              # 1,2,3…
+        rd["TRACK: Is Main"]       = "Y"
+        rd["TRACK: Main Track Number"]= ""
+        rd["TRACK: Version"]       = "Main"
+        rd["TRACK: Duration"]      = dur_mmss(trk.get("duration",0.0))
+        rd["TRACK: BPM"]           = str(trk.get("track_bpm",""))
+        rd["TRACK: Tempo"]         = tempo(trk.get("track_bpm",0))
+        rd["TRACK: Genre"]         = "Trailer"
+        rd["TRACK: Mixout"]        = ""
+        rd["TRACK: Instrumentation"]= trk.get("manual_instrumentation","")
+        rd["TRACK: Keywords"]      = trk.get("manual_keywords","")
+        rd["TRACK: Lyrics"]        = ""
+        rd["TRACK: Identity"]      = trk.get("track_name","")
+        rd["TRACK: Category Codes"]= ""
+
+        # writers / publishers
+        writers,pubs = build_wp(trk.get("matched_composers",[]), composers, publishers)
+        rd["TRACK: Composer(s)"]  = " and ".join(full_name(w) for w in writers)
+        rd["TRACK: Publisher(s)"] = " and ".join(sorted({w["publisher_name"]
+                                                         for w in writers if w["publisher_name"]}))
+        rd["TRACK: Artist(s)"]    = rd["TRACK: Composer(s)"]
+
+        # --- Audio Filename (без расширения) ---
+        audio_path   = trk.get("mastered_file","")          # полный путь
+        base_name    = os.path.basename(audio_path)         # IMG001 - Album - 01 Track.aif
+        audio_no_ext = os.path.splitext(base_name)[0]       # IMG001 - Album - 01 Track
+        rd["TRACK: Audio Filename"] = audio_no_ext
+
+        for n in (1,2,3): fill_writer(rd,writers[:3]+[None]*3,n)
+        for n in (1,2):   fill_publisher(rd,pubs[:2],n)
+
+        rd["CODE: ISWC"] = ""
+        rd["CODE: ISRC"] = new_isrc[i]
+
+        rows.append([rd.get(c,"") for c in COLUMNS])
+    return rows
+
+
+def write_outputs(ctx, rows: list, out: str, catalog: Catalog):
+    """Альбом и его ISRC → каталог, затем METADATA.xlsx альбома."""
+    ctx.log("💾 Записываю альбом в каталог…")
+    catalog.add_rows(dict(zip(COLUMNS,r)) for r in rows)
+
+    ctx.log("📄 Формирую METADATA.xlsx…")
+    import pandas as pd
+    pd.DataFrame(rows,columns=COLUMNS).fillna("").to_excel(out,index=False)
+    if not write_rows_sidecar(out, rows):
+        ctx.log("⚠️ Не удалось сохранить строки в TSV — Шаг 6 прочитает xlsx.")
+
+
+# ────────────────────── строки рядом с xlsx ──────────────────────
+# Шаг 5 сохраняет те же строки в TSV рядом с METADATA.xlsx: Шагу 6 и
+# синхронизации TOTAL не нужно читать xlsx обратно через openpyxl.
+# Первая строка — отпечаток xlsx; если файл после этого правили руками,
+# TSV считается устаревшим и читается сам xlsx.
+SIDECAR_MARK = "#xlsx"
+
+def rows_sidecar(xlsx: str) -> str:
+    """Скрытый TSV рядом с xlsx: .IMG123 ALBUM METADATA.tsv"""
+    folder, base = os.path.split(xlsx)
+    return os.path.join(folder, f".{os.path.splitext(base)[0]}.tsv")
+
+
+def _cell(v) -> str:
+    """Значение → строка так же, как после to_excel + read_excel(dtype=str)."""
+    if v is None:
+        return ""
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else str(v)
+    return str(v)
+
+
+def write_rows_sidecar(xlsx: str, rows: list) -> bool:
+    fp  = fingerprint(xlsx)
+    dst = rows_sidecar(xlsx)
+    if fp is None:
+        return False
+    tmp = dst + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(f"{SIDECAR_MARK}\t{fp[0]}\t{fp[1]}\n")
+            w = csv.writer(f, delimiter="\t", lineterminator=os.linesep)
+            w.writerow(COLUMNS)
+            w.writerows([_cell(v) for v in r] for r in rows)
+        os.replace(tmp, dst)
+        return True
+    except OSError:
+        if os.path.exists(tmp): os.remove(tmp)
+        return False
+
+
+def _fresh_sidecar(xlsx: str):
+    """Открытый TSV (после строки-отпечатка) или None, если его нет / устарел."""
+    try:
+        f = open(rows_sidecar(xlsx), "r", encoding="utf-8", newline="")
+    except OSError:
+        return None
+    mark, *fp = f.readline().rstrip("\r\n").split("\t")
+    if mark != SIDECAR_MARK or fp != [str(x) for x in (fingerprint(xlsx) or ())]:
+        f.close(); return None
+    return f
+
+
+def read_metadata_rows(xlsx: str) -> list[list[str]]:
+    """Строки METADATA.xlsx без заголовка: из TSV, иначе из самого xlsx."""
+    if f := _fresh_sidecar(xlsx):
+        with f:
+            rows = list(csv.reader(f, delimiter="\t"))
+        return rows[1:]
+    import pandas as pd
+    return pd.read_excel(xlsx, dtype=str).fillna("").values.tolist()
+
+
+def write_metadata_txt(xlsx: str, txt: str):
+    """
+    Таб-разделённый .txt для Harvest.  Свежий TSV копируется потоком как
+    есть; без него — прежний путь через pandas.read_excel.
+    """
+    if f := _fresh_sidecar(xlsx):
+        with f, open(txt, "w", encoding="utf-8", newline="") as out:
+            shutil.copyfileobj(f, out)
+        return
+    import pandas as pd
+    pd.read_excel(xlsx, dtype=str).fillna("").to_csv(txt, sep="\t", index=False)
+
+
+# ────────────────────── TOTAL METADATA ──────────────────────
+def last_real_row(ws):
+    for row in range(ws.max_row, 0, -1):
+        if any((cell.value not in ("", None)) for cell in ws[row]):
+            return row
+    return 1
+
+def sync_total(ctx, meta_dir: str, meta_xlsx: str, album_code: str):
+    """
+    Дописывает строки альбома в TOTAL METADATA.  Книга не загружается
+    целиком: меняется только XML листа (util_xlsx), прежний файл
+    становится резервной копией простым переименованием.
+    """
+    sheet = "IMT" if album_code.startswith("IMT") else "IMG"
+    total = os.path.join(meta_dir,TOTAL_METADATA_FILE)
+    backup= os.path.join(meta_dir,TOTAL_BACKUP_FILE)
+    if not os.path.exists(total):
+        raise TaskError(f"Не найден {TOTAL_METADATA_FILE}")
+
+    data = read_metadata_rows(meta_xlsx)
+
+    ctx.log("📖 Дописываю TOTAL METADATA…")
+    tmp = total + ".tmp"
+    try:
+        start = append_rows(total, sheet, data, tmp)   # ровно ОДНА пустая строка
+    except KeyError:
+        raise TaskError(f"В таблице нет листа {sheet}")
+    except (XlsxLayoutError, zipfile.BadZipFile, ET.ParseError) as e:
+        if os.path.exists(tmp): os.remove(tmp)
+        ctx.log(f"⚠️ Потоковая запись недоступна ({e}) — сохраняю через openpyxl…")
+        return _sync_total_openpyxl(ctx, total, backup, sheet, data)
+
+    ctx.log("💾 Сохраняю TOTAL METADATA…")
+    try:
+        os.replace(total, backup)                      # старая версия → резервная копия
+        os.replace(tmp, total)
+    except OSError as e:
+        if not os.path.exists(total) and os.path.exists(backup):
+            os.replace(backup, total)
+        if os.path.exists(tmp): os.remove(tmp)
+        raise TaskError(f"Не удалось сохранить TOTAL METADATA (файл открыт?): {e}")
+    ctx.log(f"✅ Строки {start}–{start+len(data)-1} добавлены в лист {sheet}.")
+
+
+def _sync_total_openpyxl(ctx, total: str, backup: str, sheet: str, data: list):
+    """Прежний путь: полная загрузка и сохранение книги."""
+    ctx.log("🗂 Резервная копия TOTAL METADATA…")
+    shutil.copy2(total,backup)
+
+    ctx.log("📖 Открываю TOTAL METADATA…")
+    import openpyxl
+    wb = openpyxl.load_workbook(total)
+    if sheet not in wb.sheetnames:
+        raise TaskError(f"В таблице нет листа {sheet}")
+    ws = wb[sheet]
+
+    start = last_real_row(ws)+2      # ровно ОДНА пустая строка
+    for r,row in enumerate(data,start):
+        for c,val in enumerate(row,1):
+            ws.cell(row=r,column=c,value=str(val))
+
+    ctx.log("💾 Сохраняю TOTAL METADATA…")
+    wb.save(total)
@@ -0,0 +1,303 @@
+# core_pipeline.py
+"""
+Прогон шагов выпуска без GUI — общая часть CLI и пакетной очереди.
+
+Вопросы, которые в приложении задаются окнами, берутся из опций
+(options()) или файла ответов (YAML при установленном PyYAML, иначе JSON):
+
+  overwrite_album: true              # Шаг 1: каталоги в _ALL ALBUMS уже есть
+  stems:                             # Шаг 2: правка списка стемов
+    "01 Track Name": {rename: {"OLD": "NEW"}, delete: ["EXTRA"]}
+  composers: {"Имя из папки": "Ключ базы"}    # Шаг 3: не найденные в базе
+  release_date: "2025-06-01"         # Шаг 5
+  description: "…"
+  styles: "…"
+  tracks: {"01": {description: "…", instrumentation: "…", keywords: "…"}}
+  overwrite_metadata: true
+  sync_total: true
+  overwrite_harvest: true            # Шаг 6
+  disco: "…"                         # Шаг 7
+  youtube: "…"
+  description_ru: "…"
+  albums: {"IMG123 Album": {…}}      # те же ключи — только для этого альбома
+
+На вопрос без ответа действует yes («да»), иначе «нет» — как кнопка
+по умолчанию в окнах.  PyQt6 здесь не импортируется.
+"""
+import os, json, datetime, threading
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+try:
+    import yaml                                     # pip install pyyaml
+except Exception:
+    yaml = None
+
+from util_session import session_store
+from util_convert import workers_from_config
+from util_convcache import conversion_cache
+from util_scratch import Scratch
+from util_task import TaskContext, TaskError
+from core_structure import analyze_album, new_session, album_folders_exist, build_structure
+from core_stems import collect_stems, drop_stem, finalize_stems
+from core_composers import load_composer_db, match_composers
+from core_cover import copy_cover
+from core_metadata import (load_databases, metadata_path, reserve_isrc, build_rows,
+                           write_outputs, sync_total)
+from core_harvest import verify_all_tracks, harvest_album_path, build_harvest
+from core_social import translate_ru, build_posts
+
+# шаги, которые трогают общие файлы (IMG PART, ISRC, TOTAL METADATA) —
+# при пакетной обработке выполняются по одному альбому за раз
+EXCLUSIVE_STEPS = {1, 5}
+_exclusive      = threading.Lock()
+
+OPTION_DEFAULTS = dict(album=None, workers=None, release_date=None, description=None,
+                       styles=None, disco=None, youtube=None)
+
+
+def options(**kw) -> SimpleNamespace:
+    """Опции шагов (то же, что флаги CLI) с умолчаниями."""
+    return SimpleNamespace(**{**OPTION_DEFAULTS, **kw})
+
+
+# ──────────────────────────── ответы ────────────────────────────
+def load_answers(path: str | None) -> dict:
+    """Файл ответов: .yaml/.yml (нужен PyYAML) или .json."""
+    if not path:
+        return {}
+    if not os.path.exists(path):
+        raise TaskError(f"Файл ответов не найден: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise TaskError("Для YAML-ответов нужен PyYAML (pip install pyyaml) — "
+                                "или передайте тот же файл в формате JSON.")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise TaskError(f"Файл ответов должен содержать словарь: {path}")
+    return data
+
+
+class Answers:
+    """
+    Ответы на вопросы шагов: файл → yes → «нет».
+    Раздел albums: {"IMG123 …": {…}} дополняет общие ответы для своего альбома.
+    """
+
+    def __init__(self, ctx: TaskContext, data: dict, yes: bool = False,
+                 album: str | None = None):
+        per_album = (data.get("albums") or {}).get(album) or {} if album else {}
+        self.ctx, self.yes = ctx, yes
+        self.data = {**{k: v for k, v in data.items() if k != "albums"}, **per_album}
+
+    def get(self, key: str, default=None):
+        val = self.data.get(key)
+        return default if val is None else val
+
+    def confirm(self, key: str, question: str) -> bool:
+        val = self.data.get(key)
+        ok  = self.yes if val is None else bool(val)
+        self.ctx.log(f"❓ {question} → {'да' if ok else 'нет'} ({key})")
+        return ok
+
+
+# ──────────────────────────── шаги ────────────────────────────
+def step1(ctx, cfg: dict, ses: dict | None, ans: Answers, opts) -> dict:
+    if not opts.album:
+        raise TaskError("Для Шага 1 нужен --album (папка в _НЕГОТОВЫЕ).")
+    album_path = os.path.join(cfg.get("_НЕГОТОВЫЕ", ""), opts.album)
+    if not os.path.isdir(album_path):
+        raise TaskError(f"Альбом не найден: {album_path}")
+
+    ctx.log(f"🔹 Выбран альбом: {opts.album}")
+    session = new_session(cfg, album_path, analyze_album(ctx, album_path))
+    if album_folders_exist(session) and not ans.confirm(
+            "overwrite_album", "Каталоги альбома уже есть в _ALL ALBUMS. Перезаписать?"):
+        raise TaskError("Создание отменено: каталоги альбома уже существуют.")
+    build_structure(ctx, session)
+    return session
+
+
+def step2(ctx, cfg: dict, ses: dict, ans: Answers, opts) -> dict:
+    album_path = ses.get("album_path_negotovoe", "")
+    if not os.path.isdir(album_path):
+        raise TaskError(f"Не найдена папка альбома:\n{album_path}")
+
+    ctx.log(f"🎵 {ses.get('album_code', 'IMG000')} – {ses.get('album_name', 'Unknown')}")
+    stems_map = collect_stems(ctx, ses, opts.workers or workers_from_config(cfg),
+                              Scratch.from_config(cfg))
+
+    # правка списка вместо окна проверки
+    edits, updated = ans.get("stems", {}), {}
+    for track_key, lst in stems_map.items():
+        if not lst:
+            raise TaskError(f"Нет стемов для «{track_key}».")
+        e = edits.get(track_key) or {}
+        rename, delete = e.get("rename") or {}, set(e.get("delete") or [])
+        updated[track_key] = []
+        for st in lst:
+            if st["stem"] in delete:
+                drop_stem(st); ctx.log(f"🗑 {track_key}: {st['stem']}"); continue
+            st["stem"] = str(rename.get(st["stem"], st["stem"])).strip()
+            updated[track_key].append(st)
+        ctx.log(f"🎚 {track_key}: {', '.join(s['stem'] for s in updated[track_key])}")
+
+    finalize_stems(ctx, ses, updated)
+    return ses
+
+
+def step3(ctx, cfg: dict, ses: dict, ans: Answers, opts) -> dict:
+    db = load_composer_db()
+    if db is None:
+        raise TaskError("Не найдена composer_database.json.")
+
+    chosen = ans.get("composers", {})
+    hints: dict[str, list[str]] = {}
+    def resolve(name: str, db: dict, suggestions: list[str]) -> str:
+        key = str(chosen.get(name) or "")
+        if key and key not in db:
+            ctx.log(f"⚠️ «{key}» нет в базе композиторов — записываю как есть.")
+        if not key:
+            hints[name] = suggestions
+        return key
+
+    # пустой автор дал бы в METADATA слот WRITER без имени, но с долей —
+    # без окна сопоставления шаг останавливается до Шага 5
+    if unresolved := match_composers(ses, db, resolve):
+        lines = [f"  «{n}»" + (f" — похожие: {', '.join(hints[n])}" if hints.get(n) else "")
+                 for n in unresolved]
+        raise TaskError("Композиторы не сопоставлены (добавьте их в composers "
+                        "файла ответов):\n" + "\n".join(lines))
+    ctx.log("✅ Композиторы сопоставлены.")
+    return ses
+
+
+def step4(ctx, cfg: dict, ses: dict, ans: Answers, opts) -> dict:
+    code, name, aiff = (ses.get(k, "") for k in ("album_code", "album_name", "album_path_aiff"))
+    if not (code and name and aiff):
+        raise TaskError("Недостаточно данных в session.json.")
+    covers_root = cfg.get("_ALL ALBUMS COVERS", "")
+    if not covers_root or not os.path.isdir(covers_root):
+        raise TaskError(f"Папка обложек не найдена:\n{covers_root}")
+    ses["cover_file"] = copy_cover(ctx, covers_root, code, name, aiff)
+    return ses
+
+
+def step5(ctx, cfg: dict, ses: dict, ans: Answers, opts) -> dict:
+    meta_dir = cfg.get("_ALL ALBUMS METADATA", "")
+    if not os.path.isdir(meta_dir):
+        raise TaskError(f"Папка METADATA не найдена:\n{meta_dir}")
+    composers, publishers, catalog = load_databases()
+
+    code, name = ses.get("album_code", ""), ses.get("album_name", "")
+    day   = str(opts.release_date or ans.get("release_date") or datetime.date.today().isoformat())
+    desc  = str(opts.description if opts.description is not None else ans.get("description", "")).strip()
+    style = str(opts.styles if opts.styles is not None else ans.get("styles", "")).strip()
+    ses["album_description"] = desc
+
+    # ручные поля треков: ключ — номер («01», в YAML может прийти как 1) или название
+    manual = {str(k).zfill(2) if str(k).isdigit() else str(k): v
+              for k, v in (ans.get("tracks", {}) or {}).items()}
+    for trk in ses.get("tracks", []):
+        m = manual.get(trk.get("track_number", "")) or manual.get(trk.get("track_name", "")) or {}
+        trk["manual_description"]     = str(m.get("description", "")).strip()
+        trk["manual_instrumentation"] = str(m.get("instrumentation", "")).strip()
+        trk["manual_keywords"]        = str(m.get("keywords", "")).strip()
+
+    out  = metadata_path(meta_dir, code, name)
+    if os.path.exists(out) and not ans.confirm(
+            "overwrite_metadata", f"{os.path.basename(out)} уже есть. Заменить?"):
+        raise TaskError("Отменено: METADATA.xlsx альбома уже существует.")
+
+    if catalog.album_exists(code):
+        ctx.log(f"⚠️ {code} уже есть в каталоге — трекам будут выданы новые ISRC.")
+    isrcs = reserve_isrc(catalog, ses)
+    ctx.log(f"🔢 ISRC: {isrcs[0]} … {isrcs[-1]}" if isrcs else "🔢 Треков нет — ISRC не нужны.")
+    rows  = build_rows(ses, composers, publishers, isrcs, day, desc, style)
+    write_outputs(ctx, rows, out, catalog)
+    ctx.log(f"✅ Файл METADATA.xlsx создан: {out}")
+
+    if ans.confirm("sync_total", "Добавить строки в TOTAL METADATA?"):
+        sync_total(ctx, meta_dir, out, code)
+        ctx.log("✅ Синхронизация выполнена (бэкап создан).")
+    return ses
+
+
+def step6(ctx, cfg: dict, ses: dict, ans: Answers, opts) -> dict:
+    verify_all_tracks(ctx, ses, cfg, opts.workers)
+    hv_album = harvest_album_path(ses, cfg)
+    if os.path.exists(hv_album) and not ans.confirm(
+            "overwrite_harvest", f"Папка {hv_album} уже существует. Обновить её?"):
+        raise TaskError("Отмена: папка Harvest уже существует.")
+    build_harvest(ctx, ses, cfg, hv_album, opts.workers)
+    return ses
+
+
+def step7(ctx, cfg: dict, ses: dict, ans: Answers, opts) -> dict:
+    disco = (opts.disco or ans.get("disco", "")).strip()
+    yt    = (opts.youtube or ans.get("youtube", "")).strip()
+    if not (disco and yt):
+        raise TaskError("Для Шага 7 нужны ссылки на DISCO и YouTube (--disco / --youtube).")
+    desc_en = ses.get("album_description", "")
+    desc_ru = ans.get("description_ru") or translate_ru(desc_en)
+    ctx.log(build_posts(ses.get("album_code", ""), ses.get("album_name", ""),
+                        desc_en, desc_ru, disco, yt))
+    return ses
+
+
+STEPS = {
+    1: ("Структура альбома", step1),
+    2: ("Стемы",             step2),
+    3: ("Композиторы",       step3),
+    4: ("Обложка",           step4),
+    5: ("Метаданные",        step5),
+    6: ("Подготовка для Harvest", step6),
+    7: ("Соцсети",           step7),
+}
+
+
+def parse_steps(spec: str) -> list[int]:
+    """«1-6», «2,3,5», «6» → отсортированный список номеров шагов (ValueError)."""
+    out: set[int] = set()
+    try:
+        for part in spec.split(","):
+            a, _, b = part.strip().partition("-")
+            out.update(range(int(a), int(b or a) + 1))
+    except ValueError:
+        raise ValueError(f"Неверный список шагов: {spec}")
+    if not out or not out <= set(STEPS):
+        raise ValueError(f"Шаги должны быть в диапазоне 1–{max(STEPS)}: {spec}")
+    return sorted(out)
+
+
+def run_steps(ctx, cfg: dict, steps: list[int], session_path: str,
+              ans: Answers, opts) -> dict:
+    """
+    Выполняет шаги по порядку, сохраняя session после каждого.
+    Шаг 1 создаёт сессию, остальные читают её из session_path.
+    Выполненные шаги копятся в session["steps_done"].
+    """
+    store = session_store(session_path)
+    conversion_cache(cfg)                   # папка и предел кэша — из этого config
+    for n in steps:
+        title, fn = STEPS[n]
+        ctx.check()
+        ctx.log(f"\n══════ ШАГ {n}: {title.upper()} ══════")
+        if n != 1 and not store.exists:
+            raise TaskError(f"Нет {session_path} — сначала выполните Шаг 1.")
+        try:
+            with _exclusive if n in EXCLUSIVE_STEPS else nullcontext():
+                store.replace(fn(ctx, cfg, store.data if n != 1 else None, ans, opts))
+        except BaseException:
+            store.reload()              # недоделанный шаг не должен попасть в файл
+            raise
+        store.mark_step(n)
+        if not store.flush():
+            raise TaskError(f"Не удалось сохранить {session_path}")
+        ctx.log(f"💾 {session_path} сохранён.")
+    return store.data
@@ -0,0 +1,40 @@
+# core_social.py
+"""Шаг 7 без GUI: тексты анонса альбома для соцсетей."""
+import traceback
+
+
+def translate_ru(text: str) -> str:
+    """EN → RU через deep_translator; пустая строка, если перевод недоступен."""
+    if not text.strip():
+        return ""
+    try:
+        # опциональный автоперевод; импорт тянет requests — только по делу
+        from deep_translator import GoogleTranslator   # pip install deep-translator
+    except Exception:
+        return ""
+    try:
+        return GoogleTranslator(source="en", target="ru").translate(text)
+    except Exception:
+        print("[Step7] auto-translation failed:\n", traceback.format_exc())
+        return ""
+
+
+def build_posts(code: str, name: str, desc_en: str, desc_ru: str,
+                disco: str, yt: str) -> str:
+    """Посты Instagram / Facebook / LinkedIn / VK и описание для YouTube."""
+    insta = f"{code} {name} | New Album\n\n{desc_en}\n\n#imaginemusic"
+    fb    = (f"{code} {name} | New Album\n\n{desc_en}\n\n"
+             f"The album is available for listening in our client area: {disco}\nPreview: {yt}")
+    li    = (f"{code} {name} | New Album\n\n{desc_en}\n\n"
+             f"The album is available for listening in our client area: {disco}\n"
+             f"Preview: {yt}\n\n#imaginemusic #trailermusic")
+    vk    = (f"{code} {name} | Новый альбом\n\n{desc_ru}\n\n"
+             f"Альбом уже доступен для прослушивания: {disco}\nПревью: {yt}")
+    yt_desc = (f"{code} {name} | New Album\n\n{desc_en}\n\n"
+               f"The album is available for listening in our client area: {disco}")
+
+    return ("=== INSTAGRAM ===\n" + insta + "\n\n"
+            "=== FACEBOOK ===\n"  + fb    + "\n\n"
+            "=== LINKEDIN ===\n"  + li    + "\n\n"
+            "=== VK ===\n"       + vk    + "\n\n"
+            "=== YOUTUBE ===\n"  + yt_desc)
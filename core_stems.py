@@ -0,0 +1,169 @@
+# core_stems.py
+"""
+Шаг 2 без GUI: поиск, конвертация и переименование стемов.
+
+collect_stems() возвращает stems_map {«01 Track»: [stem_obj, …]}, где
+stem_obj = {"old_path", "prefix", "stem", "ext"}.  Проверку списка
+(правка имён, удаление лишних) делает вызывающий код, после чего
+finalize_stems() переименовывает файлы и пишет tr["stems"] в сессию.
+
+Готовые конвертации записываются в манифест шага (util_manifest):
+повторный запуск после сбоя конвертирует только недостающее.
+"""
+import os, re
+
+from util_convert import ffmpeg_convert, link_or_copy, run_parallel, conversion_slot
+from util_audio import is_pcm_24_48_be
+from util_cache import audio_cache
+from util_convcache import cached_convert
+from util_scan import index_top_folders
+from util_manifest import Manifest, manifest_path
+from util_scratch import Scratch
+
+IGNORE_KEYWORDS  = ["mix", "full mix", "unmastered", "mastered", "master", "bpm"]
+AUDIO_EXTENSIONS = (".wav", ".aif", ".aiff")
+STEM_FORMAT      = "aiff pcm_s24be 48000"           # ключ формата в кэше конвертаций
+
+
+# ───────────────────── helpers ─────────────────────
+def is_audio_candidate(fn: str) -> bool:
+    """Часть is_stem, не зависящая от трека (фильтр при обходе диска)."""
+    low = fn.lower()
+    if os.path.splitext(low)[1] not in AUDIO_EXTENSIONS:     return False
+    return not ("pdf" in low or any(k in low for k in IGNORE_KEYWORDS))
+
+def is_stem(fn: str, track: str) -> bool:
+    if not is_audio_candidate(fn): return False
+    return os.path.splitext(fn.lower())[0].strip() != track.lower().strip()
+
+def do_ffmpeg_convert(src: str, dst: str) -> bool:
+    return ffmpeg_convert(src, dst, "pcm_s24be", 48000)
+
+def convert_stem(src: str, dst: str, origin: str | None = None) -> str:
+    """
+    Стем → AIFF 24/48.  Если исходник уже AIFF 24 bit/48 kHz — без
+    перекодирования (ссылка/копия); уже конвертированный раньше — из кэша.
+    origin — исходный стем, если src — его копия в черновой папке.
+    Возвращает "copy", "cache", "ffmpeg" или "".
+    """
+    origin = origin or src
+    with conversion_slot():
+        if is_pcm_24_48_be(audio_cache().probe(origin)) and link_or_copy(src, dst):
+            return "copy"
+        return cached_convert(src, dst, STEM_FORMAT, do_ffmpeg_convert, key_src=origin)
+
+def clean_stem_name(fname: str, track: str) -> str:
+    base, _ = os.path.splitext(fname)
+    tmp = re.sub(re.escape(track), "", base, flags=re.IGNORECASE)
+    tmp = re.sub(r"(?i)\bstem\b|\b\d{2,3}\b", "", tmp)
+    tmp = re.sub(r"[_,\-.]", " ", tmp).replace("&", "AND")
+    tmp = re.sub(r"\s{2,}", " ", tmp)
+    return tmp.strip().upper()
+
+def drop_stem(st: dict):
+    """Удаляет сконвертированный стем с диска и помечает его в списке."""
+    if os.path.exists(st["old_path"]): os.remove(st["old_path"])
+    st["__delete__"] = True
+
+
+# ───────────────────── поиск и конвертация ─────────────────────
+def collect_stems(ctx, session: dict, workers: int,
+                  scratch: Scratch | None = None) -> dict[str, list[dict]]:
+    """
+    Поиск и конвертация стемов.  Возвращает stems_map.
+    scratch — черновая папка для режима staging (None — конвертация на месте).
+    """
+    album_code  = session.get("album_code", "IMG000")
+    album_name  = session.get("album_name", "Unknown")
+    album_path  = session.get("album_path_negotovoe", "")
+    tracks_info = session.get("tracks", [])
+    stems_map = {}
+
+    # один обход дерева альбома: {папка трека: [(root, файл-кандидат)]};
+    # обходятся только папки, в имени которых есть название трека
+    ctx.log("📂 Индексирую папку альбома…")
+    titles        = [t.get("track_name", "Unknown").lower() for t in tracks_info]
+    album_index   = index_top_folders(album_path, ("archive",), is_audio_candidate,
+                                      want=lambda n: any(t in n.lower() for t in titles))
+    album_folders = list(album_index)
+
+    # поиск стемов: сначала собираем задания, потом конвертируем пулом
+    entries: list[tuple[str, str, dict]] = []      # (track_key, dst, stem_obj)
+    tasks:   dict[str, str] = {}                   # dst → src (последний выигрывает)
+    for trk in tracks_info:
+        tnum, tname = trk.get("track_number", "00"), trk.get("track_name", "Unknown")
+        stems_folder = trk.get("stems_folder", "")
+        track_key = f"{tnum} {tname}"
+        stems_map[track_key] = []
+
+        real = next((x for x in album_folders if tname.lower() in x.lower()), None)
+        if not real:
+            ctx.log(f"⚠️ Нет папки для «{track_key}»"); continue
+        # индекс уже содержит и подпапку Stems — отдельный обход не нужен
+        processed, base = set(), tname.lower().strip()
+        for root, f in album_index[real]:
+            if os.path.splitext(f.lower())[0].strip() == base or f in processed: continue
+            processed.add(f)
+
+            short  = clean_stem_name(f, tname)
+            prefix = f"{album_code} - {album_name} - {tnum} {tname} "
+            ext    = ".aiff"
+            src, dst = os.path.join(root, f), os.path.join(stems_folder, prefix+short+ext)
+
+            tasks[dst] = src
+            entries.append((track_key, dst,
+                            {"old_path": dst, "prefix": prefix, "stem": short, "ext": ext}))
+
+    # готовое с прошлого запуска (исходник и результат не менялись) — пропускаем
+    manifest = Manifest(manifest_path(session, 2))
+    manifest.forget(set(tasks))
+    ready    = {dst for dst, src in tasks.items() if manifest.is_done(dst, src)}
+    if ready:
+        ctx.log(f"↩ Уже сконвертировано ранее: {len(ready)} — пропускаю")
+
+    # конвертация: N процессов ffmpeg одновременно, лог — по мере готовности
+    jobs    = [(dst, src) for dst, src in tasks.items() if dst not in ready]
+    ctx.log(f"🔄 Конвертация стемов: {len(jobs)} (потоков: {workers})")
+    finished = 0; ctx.progress(0, len(jobs))
+
+    def _done(_i, job, how):
+        nonlocal finished
+        dst, src = job
+        if how: manifest.done(dst, src, how=how)
+        else:   manifest.failed(dst)
+        mark = {"copy": "⚡", "cache": "♻️", "ffmpeg": "✅"}.get(how, "❌")
+        ctx.log(f"{mark} {os.path.basename(src)} → {os.path.basename(dst)}")
+        finished += 1; ctx.progress(finished, len(jobs))
+
+    # в режиме staging — через локальную черновую папку (util_scratch)
+    convert = lambda dst, src, origin=None: convert_stem(src, dst, origin)
+    try:
+        if scratch:
+            results = scratch.run(ctx, jobs, convert, workers, _done, lambda: ctx.cancelled)
+        else:
+            results = run_parallel(jobs, convert, workers, _done, lambda: ctx.cancelled)
+    finally:
+        manifest.save()
+        audio_cache().save()
+    ctx.check()
+    ok_dst  = ready | {dst for (dst, _), ok in zip(jobs, results) if ok}
+    for track_key, dst, st in entries:
+        if dst in ok_dst:
+            stems_map[track_key].append(st)
+    return stems_map
+
+
+# ───────────────────── итоговое переименование ─────────────────────
+def finalize_stems(ctx, session: dict, updated: dict[str, list[dict]]):
+    """Переименовывает проверенные стемы и записывает tr["stems"] в session."""
+    tracks_info = session.get("tracks", [])
+    for tr in tracks_info:
+        key = f"{tr['track_number']} {tr['track_name']}"
+        for st in updated.get(key, []):
+            old = st["old_path"]
+            new = os.path.join(os.path.dirname(old), st["prefix"]+st["stem"]+st["ext"])
+            if new != old and os.path.exists(old):
+                try: os.rename(old, new); st["old_path"] = new
+                except Exception as e: ctx.log(f"⚠️ Ошибка переименования: {e}")
+        tr["stems"] = [os.path.basename(s["old_path"]) for s in updated.get(key, [])]
+    session["tracks"] = tracks_info
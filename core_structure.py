@@ -0,0 +1,156 @@
+# core_structure.py
+"""
+Шаг 1 без GUI: анализ _MASTERED и создание каталогов альбома.
+
+Функции не задают вопросов пользователю — решения (перезаписывать ли
+существующие папки) принимает вызывающий код: окно шага или CLI.
+"""
+import os, re, shutil
+
+from util_cache import audio_cache
+from util_task import TaskError
+
+MASTERED_RE = r'IMG\d{3} - .* - \d{2} .*\.aif{1,2}$'
+
+
+# ──────────── util ────────────
+def get_track_duration(file_path: str) -> float | None:
+    """Длительность по заголовку файла (ffprobe — только для чужих форматов)."""
+    info = audio_cache().probe(file_path)
+    return round(info["duration"], 2) if info else None
+
+
+def list_albums(cfg: dict) -> list[str]:
+    """Папки альбомов в _НЕГОТОВЫЕ (пусто, если папки нет)."""
+    p = cfg.get("_НЕГОТОВЫЕ", "")
+    if not p or not os.path.exists(p):
+        return []
+    return [d for d in os.listdir(p) if os.path.isdir(os.path.join(p, d))]
+
+
+# ──────────── анализ альбома ────────────
+def analyze_album(ctx, album_path: str) -> dict:
+    """_MASTERED → код, название, список треков с длительностями."""
+    mastered_path = os.path.join(album_path, "_MASTERED")
+    if not os.path.exists(mastered_path):
+        raise TaskError("Ошибка! В папке альбома нет _MASTERED.")
+
+    ctx.log("📂 Найдена _MASTERED, анализирую…")
+    mastered_tracks = [f for f in os.listdir(mastered_path) if re.match(MASTERED_RE, f)]
+    if not mastered_tracks:
+        raise TaskError("Ошибка! В _MASTERED не найдено треков.")
+
+    ctx.log(f"✅ Найдено {len(mastered_tracks)} треков:")
+    for t in mastered_tracks: ctx.log(f"   🎵 {t}")
+
+    m = re.match(r'(IMG\d{3}) - (.*?) - \d{2} .*', mastered_tracks[0])
+    if not m:
+        raise TaskError("Ошибка! Не удалось определить код и название альбома.")
+    album_code, album_name = m.groups()
+    track_list = sorted(mastered_tracks)
+
+    ctx.log(f"📌 Код: {album_code}")
+    ctx.log(f"📌 Название: {album_name}")
+
+    tracks_data = []
+    poss = os.listdir(album_path)
+    for i, track_file in enumerate(track_list):
+        ctx.check(); ctx.progress(i, len(track_list))
+        tm = re.match(r'(IMG\d{3}) - (.*?) - (\d{2}) (.*)\.aif{1,2}$', track_file)
+        if not tm: continue
+        _, _, track_number, track_name = tm.groups()
+
+        full_path = os.path.join(mastered_path, track_file)
+        duration  = get_track_duration(full_path)
+
+        track_folder = next((x for x in poss if track_name in x), None)
+        if track_folder and (fm := re.match(r'(.+?) - (.+) (\d+)$', track_folder)):
+            composer_full, _, bpm = fm.groups()
+            composers = [c.strip() for c in composer_full.split(" and ")]
+        else:
+            composers = ["Неизвестный"]; bpm = "000"
+
+        tracks_data.append({
+            "track_number": track_number,
+            "track_name": track_name,
+            "composers": composers,
+            "track_bpm": bpm,
+            "duration": duration,
+            "mastered_file": track_file
+        })
+
+    audio_cache().save()
+    return {"album_code": album_code, "album_name": album_name,
+            "track_list": track_list, "tracks_data": tracks_data}
+
+
+# ──────────── структура IMG PART и папок альбома ────────────
+def find_or_create_img_part(base_path: str) -> str:
+    """Возвращает подходящую _IMG PART X (макс 5 альбомов) или создаёт новую."""
+    parts = sorted(
+        [d for d in os.listdir(base_path) if re.match(r'_IMG PART \d+', d)],
+        key=lambda x: int(x.split()[-1])
+    )
+    if not parts:
+        new_part = os.path.join(base_path, "_IMG PART 1")
+        os.makedirs(new_part)
+        return new_part
+
+    last_part = os.path.join(base_path, parts[-1])
+    if len([d for d in os.listdir(last_part) if os.path.isdir(os.path.join(last_part, d))]) < 5:
+        return last_part
+
+    new_num = int(parts[-1].split()[-1]) + 1
+    new_part = os.path.join(base_path, f"_IMG PART {new_num}")
+    os.makedirs(new_part)
+    return new_part
+
+
+def new_session(cfg: dict, album_path_negotovoe: str, analysis: dict) -> dict:
+    """Черновик session.json: пути в _ALL ALBUMS AIFF/MP3 + треки из анализа."""
+    code, name = analysis["album_code"], analysis["album_name"]
+    ai_parent = find_or_create_img_part(cfg["_ALL ALBUMS AIFF"])
+    mp_parent = find_or_create_img_part(cfg["_ALL ALBUMS MP3"])
+    album_aiff = os.path.join(ai_parent, f"{code} {name}")
+    album_mp3  = os.path.join(mp_parent, f"{code} {name}")
+    return {
+        "album_code":  code,
+        "album_name":  name,
+        "album_path_negotovoe": album_path_negotovoe,
+        "album_path_aiff":     album_aiff,
+        "album_path_mp3":      album_mp3,
+        "stems_path":          os.path.join(album_aiff, "Stems"),
+        "tracks":              analysis["tracks_data"]
+    }
+
+
+def album_folders_exist(session: dict) -> bool:
+    return os.path.exists(session["album_path_aiff"]) or os.path.exists(session["album_path_mp3"])
+
+
+def build_structure(ctx, session: dict):
+    """Удаляет старые каталоги и создаёт новые (+ папки стемов в session)."""
+    album_aiff, album_mp3 = session["album_path_aiff"], session["album_path_mp3"]
+    stems_path = session["stems_path"]
+
+    # удаляем и логируем
+    for p in (album_aiff, album_mp3):
+        if os.path.exists(p):
+            shutil.rmtree(p)
+            ctx.log(f"♻️ Удалён старый каталог: {p}")
+
+    # ── создаём заново ────────────────────────────────────────────────────
+    os.makedirs(album_aiff, exist_ok=True)
+    os.makedirs(album_mp3,  exist_ok=True)
+    os.makedirs(stems_path, exist_ok=True)
+
+    ctx.log(f"📂 Созданы:\n  - {album_aiff}\n  - {album_mp3}\n  - {stems_path}")
+
+    # подпапки стемов
+    code, name = session["album_code"], session["album_name"]
+    for tr in session["tracks"]:
+        folder_name = f"{code} - {name} - {tr['track_number']} {tr['track_name']}"
+        fp = os.path.join(stems_path, folder_name)
+        os.makedirs(fp, exist_ok=True)
+        tr["stems_folder"] = fp
+        ctx.log(f"📁 Папка стемов: {fp}")
@@ -1,16 +1,15 @@
-import sys, os, json
+import sys, os, json, importlib
+from util_timing import startup                    # первым — отсчёт времени запуска
 
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel,
     QPushButton, QStackedWidget
 )
-from PyQt6.QtGui  import QPixmap, QCursor
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui  import QPixmap, QCursor, QShortcut, QKeySequence
+from PyQt6.QtCore import Qt, QTimer
 
-from step1_create_structure import Step1CreateStructure
-from settings_page          import SettingsPage
-from composer_list_page     import ComposerListPage
 from step_prepare_step1     import StepPrepareStep1
+from page_manager           import PageManager, DebugPanel
 
 from util_json import load_json_safe
 from util_path import rsrc
@@ -18,6 +17,16 @@ from util_path import rsrc
 
 CONFIG_FILE = "config.json"                         # имя не меняем — используем rsrc()
 
+# страницы главного меню → (модуль, класс); собираются при первом переходе,
+# чтобы запуск не ждал pandas, чтения базы композиторов и папок в CloudStorage
+PAGES = {
+    "settings":  ("settings_page",      "SettingsPage"),
+    "composers": ("composer_list_page", "ComposerListPage"),
+    "batch":     ("batch_page",         "BatchPage"),
+}
+
+startup.mark("импорт модулей")
+
 # ───────────────────────────── главное окно ───────────────────────────────
 class AlbumReleaseApp(QWidget):
     def __init__(self):
@@ -69,6 +78,11 @@ class AlbumReleaseApp(QWidget):
         self.composer_button.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
         menu_lo.addWidget(self.composer_button)
 
+        self.batch_button = QPushButton("📦 ПАКЕТНАЯ ОБРАБОТКА", clicked=self.show_batch)
+        self.batch_button.setStyleSheet(btn_style)
+        self.batch_button.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        menu_lo.addWidget(self.batch_button)
+
         # поясняющий текст
         welcome = QLabel(
             "Добро пожаловать в Release Master! Это приложение ускорит выпуск альбомов "
@@ -80,29 +94,41 @@ class AlbumReleaseApp(QWidget):
         welcome.setStyleSheet("margin-top:18px;font-size:13pt;")
         menu_lo.addWidget(welcome)
 
-        self.stack.addWidget(self.main_menu)
+        # ── страницы: меню + остальные (см. page()) и шаги — через pages.show() ──
+        self.pages = PageManager(self.stack, self.main_menu)
 
-        # ── остальные страницы ──
-        self.step1_page       = Step1CreateStructure(self)
-        self.settings_page    = SettingsPage(self)
-        self.composer_list_pg = ComposerListPage(self)
-
-        for w in (self.step1_page, self.settings_page, self.composer_list_pg):
-            self.stack.addWidget(w)
+        # ── отладочная панель: Ctrl+Shift+D ──
+        self.debug_panel = DebugPanel(self.pages)
+        root_layout.addWidget(self.debug_panel)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.debug_panel.toggle)
 
         self.load_settings()
 
+    # ── страницы ──
+    def page(self, key: str) -> QWidget:
+        """Страница из PAGES; при первом обращении импортируется и собирается."""
+        def build():
+            mod, cls = PAGES[key]
+            with startup.measure(f"страница {cls}"):
+                return getattr(importlib.import_module(mod), cls)(self)
+        return self.pages.keep(key, build)
+
     # ── навигация ──
     def start_step1(self):
-        prep = StepPrepareStep1(self)
-        self.stack.addWidget(prep)
-        self.stack.setCurrentWidget(prep)
+        self.pages.show(StepPrepareStep1(self))
 
     def show_settings(self):
-        self.stack.setCurrentWidget(self.settings_page)
+        self.pages.show(self.page("settings"))
 
     def show_composer_list(self):
-        self.stack.setCurrentWidget(self.composer_list_pg)
+        self.pages.show(self.page("composers"))
+
+    def show_batch(self):
+        fresh = not self.pages.has("batch")             # новая страница уже всё прочла
+        batch = self.page("batch")
+        if not fresh:
+            batch.reload()
+        self.pages.show(batch)
 
     # ── загрузка путей из config.json ──
     def load_settings(self):
@@ -114,6 +140,7 @@ class AlbumReleaseApp(QWidget):
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     win = AlbumReleaseApp()
+    startup.mark("главное окно")
     win.show()
 
     # центрируем окно
@@ -121,4 +148,6 @@ if __name__ == "__main__":
     geo.moveCenter(win.screen().availableGeometry().center())
     win.move(geo.topLeft())
 
+    # первый оборот цикла событий — окно уже отрисовано
+    QTimer.singleShot(0, lambda: (startup.mark("первый показ"), startup.print_report()))
     sys.exit(app.exec())
@@ -15,7 +15,9 @@ a = Analysis(
         ('_DATABASES/composer_database.json', '_DATABASES'),
         ('_DATABASES/isrc_database.json', '_DATABASES'),
     ],
-    hiddenimports=['PyQt6'],
+    hiddenimports=['PyQt6',
+                   # страницы меню импортируются лениво (main.PAGES)
+                   'settings_page', 'composer_list_page', 'batch_page'],
     hookspath=[],
     runtime_hooks=[],
     excludes=[],
@@ -0,0 +1,161 @@
+# page_manager.py
+"""
+Страницы главного окна (QStackedWidget) и отладочная панель.
+
+Раньше каждый переход создавал новую страницу шага и добавлял её в стек
+навсегда: за несколько альбомов в стеке копились десятки страниц со
+звуками, таблицами и загруженным JSON.  Теперь страницы двух видов:
+  • постоянные — главное меню и страницы меню (настройки, композиторы,
+    пакет): собираются один раз, при первом переходе;
+  • страницы шагов — одноразовые: show() новой страницы убирает
+    предыдущую из стека и удаляет её (deleteLater).
+Кнопки «Назад» всех шагов ведут в главное меню, так что хранить прошлые
+шаги незачем.  Страницу, у которой ещё идёт фоновая задача (TaskPanel),
+удаляем на первом переходе после её завершения.
+
+Отладочная панель (Ctrl+Shift+D или RM_DEBUG=1) показывает число страниц
+и виджетов и память процесса — рост этих цифр от альбома к альбому и
+есть утечка.
+"""
+import os, sys
+from typing import Callable
+
+from PyQt6.QtWidgets import QApplication, QWidget, QHBoxLayout, QLabel, QStackedWidget
+from PyQt6.QtCore import QTimer
+
+from task_panel import TaskPanel
+
+DEBUG_ENV      = "RM_DEBUG"
+DEBUG_INTERVAL = 1000           # мс — обновление отладочной панели
+
+
+def memory_mb() -> tuple[float, str] | None:
+    """(МБ, что измерено): текущий RSS через psutil, иначе пиковый из resource."""
+    try:
+        import psutil                                   # необязательная зависимость
+        return psutil.Process().memory_info().rss / (1 << 20), "RSS"
+    except ImportError:
+        pass
+    try:
+        import resource                                 # нет на Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: байты на macOS, килобайты на Linux
+    return peak / ((1 << 20) if sys.platform == "darwin" else (1 << 10)), "пик"
+
+
+class PageManager:
+    """Постоянные страницы + не больше одной текущей страницы шага."""
+
+    def __init__(self, stack: QStackedWidget, home: QWidget):
+        self.stack = stack
+        self.home_page = home
+        self._kept: dict[str, QWidget] = {}
+        self._flow:   QWidget | None = None          # текущая страница шага
+        self._parked: list[QWidget] = []             # ждут конца своей задачи
+        self.opened = self.disposed = 0
+        stack.addWidget(home)
+
+    # ───── постоянные страницы ─────
+    def keep(self, key: str, factory: Callable[[], QWidget]) -> QWidget:
+        """Постоянная страница key; factory() вызывается при первом обращении."""
+        w = self._kept.get(key)
+        if w is None:
+            w = self._kept[key] = factory()
+            self.stack.addWidget(w)
+        return w
+
+    def has(self, key: str) -> bool:
+        return key in self._kept
+
+    def is_kept(self, w: QWidget) -> bool:
+        return w is self.home_page or any(w is p for p in self._kept.values())
+
+    # ───── переходы ─────
+    def show(self, w: QWidget):
+        """
+        Показывает страницу.  Новая страница шага становится текущей,
+        а прежняя убирается из стека.
+        """
+        prev = self._flow
+        if w is not prev and not self.is_kept(w):
+            self.stack.addWidget(w)
+            self._flow = w
+            self.opened += 1
+        elif self.is_kept(w):
+            self._flow = None
+        self.stack.setCurrentWidget(w)
+        if prev is not None and prev is not self._flow:
+            self._retire(prev)
+        self._sweep()
+
+    def home(self):
+        self.show(self.home_page)
+
+    # ───── удаление ─────
+    @staticmethod
+    def _busy(w: QWidget) -> bool:
+        return any(p.busy for p in w.findChildren(TaskPanel))
+
+    def _retire(self, w: QWidget):
+        if self._busy(w):
+            self._parked.append(w)           # задача ещё пишет в лог страницы
+        else:
+            self._dispose(w)
+
+    def _sweep(self):
+        for w in [w for w in self._parked if not self._busy(w)]:
+            self._parked.remove(w)
+            self._dispose(w)
+
+    def _dispose(self, w: QWidget):
+        self.stack.removeWidget(w)
+        w.deleteLater()
+        self.disposed += 1
+
+    # ───── цифры для отладки ─────
+    def stats(self) -> dict:
+        mem = memory_mb()
+        return {
+            "pages":    self.stack.count(),
+            "kept":     len(self._kept) + 1,
+            "flow":     int(self._flow is not None),
+            "parked":   len(self._parked),
+            "opened":   self.opened,
+            "disposed": self.disposed,
+            "widgets":  len(QApplication.allWidgets()),
+            "memory":   mem,
+        }
+
+
+class DebugPanel(QWidget):
+    """Строка с цифрами PageManager.stats(); обновляется, пока видна."""
+
+    def __init__(self, pages: PageManager, parent=None):
+        super().__init__(parent)
+        self.pages = pages
+        lo = QHBoxLayout(self); lo.setContentsMargins(0, 0, 0, 0)
+        self.label = QLabel()
+        self.label.setStyleSheet("font-family:monospace;font-size:10pt;color:#888;")
+        lo.addWidget(self.label)
+        self.timer = QTimer(self, interval=DEBUG_INTERVAL, timeout=self.refresh)
+        self.setVisible(bool(os.environ.get(DEBUG_ENV)))
+
+    def toggle(self):
+        self.setVisible(self.isHidden())
+
+    def setVisible(self, visible: bool):
+        super().setVisible(visible)
+        if visible:
+            self.refresh(); self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        s = self.pages.stats()
+        mem = f"{s['memory'][0]:.0f} МБ ({s['memory'][1]})" if s["memory"] else "н/д"
+        self.label.setText(
+            f"🐞 страниц в стеке: {s['pages']} (постоянных {s['kept']}, шаг {s['flow']}, "
+            f"ждут задачу {s['parked']}) · шагов открыто/удалено: {s['opened']}/{s['disposed']} · "
+            f"виджетов: {s['widgets']} · память: {mem}")
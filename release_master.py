@@ -0,0 +1,163 @@
+# release_master.py
+"""
+Release Master без GUI — прогон шагов 1–7 из командной строки.
+
+  python release_master.py list
+  python release_master.py run --album "IMG123 Album" --steps 1-6 --answers answers.yaml
+  python release_master.py batch --albums "IMG123 Album" "IMG124 Other" --steps 1-2
+  python release_master.py import [--full]   # базы композиторов и ISRC из TOTAL METADATA
+
+Ответы на вопросы окон — флаги или файл ответов (формат описан
+в core_pipeline).  В пакетном режиме у каждого альбома своя сессия
+в _SESSIONS, а конвертации всех альбомов делят общий лимит --workers.
+PyQt6 здесь не импортируется.
+"""
+import sys, argparse
+
+from util_json import load_json_safe
+from util_path import rsrc
+from util_task import TaskContext, TaskError, TaskCancelled
+from core_structure import list_albums
+from core_pipeline import Answers, load_answers, parse_steps, run_steps
+from core_batch import STATUS_LABELS, new_job, run_batch
+
+CONFIG_FILE  = "config.json"
+SESSION_FILE = "session.json"
+
+
+def _steps_arg(spec: str) -> list[int]:
+    try:
+        return parse_steps(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+# ──────────────────────────── команды ────────────────────────────
+def cmd_list(args) -> int:
+    cfg = load_json_safe(args.config, {})
+    albums = sorted(list_albums(cfg))
+    if not albums:
+        print("❌ Папка _НЕГОТОВЫЕ не найдена или пуста."); return 1
+    print("\n".join(albums))
+    return 0
+
+
+def cmd_run(args) -> int:
+    ctx = TaskContext()
+    cfg = load_json_safe(args.config, {})
+    if not cfg:
+        ctx.log(f"❌ Нет config.json: {args.config}"); return 1
+
+    try:
+        ans = Answers(ctx, load_answers(args.answers), args.yes)
+        run_steps(ctx, cfg, args.steps, args.session, ans, args)
+    except TaskError as e:
+        ctx.log(f"❌ {e}"); return 1
+    except (TaskCancelled, KeyboardInterrupt):
+        ctx.log("⛔ Остановлено пользователем."); return 130
+
+    ctx.log("\n✅ Готово.")
+    return 0
+
+
+def cmd_batch(args) -> int:
+    ctx = TaskContext()
+    cfg = load_json_safe(args.config, {})
+    if not cfg:
+        ctx.log(f"❌ Нет config.json: {args.config}"); return 1
+
+    albums = sorted(list_albums(cfg)) if args.all else args.albums
+    if not albums:
+        ctx.log("❌ Не выбрано ни одного альбома (--albums … или --all)."); return 1
+    try:
+        answers = load_answers(args.answers)
+    except TaskError as e:
+        ctx.log(f"❌ {e}"); return 1
+
+    jobs = [new_job(a, args.steps) for a in albums]
+    try:
+        run_batch(ctx, cfg, jobs, answers, args.yes, args.workers)
+    except KeyboardInterrupt:
+        ctx.cancel()
+        ctx.log("⛔ Остановлено пользователем."); return 130
+
+    for j in jobs:
+        took = f"{j['finished'] - j['started']:.0f} с" if j["started"] and j["finished"] else "—"
+        ctx.log(f"{STATUS_LABELS[j['status']]:<16} {j['album']:<40} {took:>6}  {j['message']}")
+    return 0 if all(j["status"] == "done" for j in jobs) else 1
+
+
+def cmd_import(args) -> int:
+    ctx = TaskContext()
+    cfg = load_json_safe(args.config, {})
+    total = args.total or cfg.get("TOTAL METADATA", "")
+    if not total:
+        ctx.log("❌ Не указан файл TOTAL METADATA (--total или «Настройки»)."); return 1
+    try:
+        from core_catalog import COMPOSER_DB_PATH, import_total
+        import_total(ctx, total, COMPOSER_DB_PATH, full=args.full)
+    except TaskError as e:
+        ctx.log(f"❌ {e}"); return 1
+    except (TaskCancelled, KeyboardInterrupt):
+        ctx.log("⛔ Остановлено пользователем."); return 130
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    config = argparse.ArgumentParser(add_help=False)
+    config.add_argument("--config",  default=rsrc(CONFIG_FILE), help="путь к config.json")
+    common = argparse.ArgumentParser(add_help=False, parents=[config])
+    common.add_argument("--session", default=SESSION_FILE,      help="путь к session.json")
+
+    ap = argparse.ArgumentParser(prog="release-master",
+                                 description="Выпуск альбома Imagine Music без GUI.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", parents=[config],
+                   help="альбомы в _НЕГОТОВЫЕ").set_defaults(func=cmd_list)
+
+    run = sub.add_parser("run", parents=[common], help="выполнить шаги выпуска")
+    run.set_defaults(func=cmd_run)
+    run.add_argument("--album", help="папка альбома в _НЕГОТОВЫЕ (нужна для Шага 1)")
+    run.add_argument("--steps", type=_steps_arg, default=parse_steps("1-6"),
+                     help="например 1-6, 2,3 или 5 (по умолчанию 1-6)")
+    run.add_argument("--answers", help="файл ответов .yaml/.yml/.json")
+    run.add_argument("-y", "--yes", action="store_true",
+                     help="отвечать «да» на вопросы без ответа в файле")
+    run.add_argument("--workers", type=int, help="потоки конвертации (Шаг 2)")
+    run.add_argument("--release-date", help="Шаг 5: дата релиза YYYY-MM-DD")
+    run.add_argument("--description",  help="Шаг 5: описание альбома")
+    run.add_argument("--styles",       help="Шаг 5: Styles")
+    run.add_argument("--disco",        help="Шаг 7: ссылка на DISCO / Client Area")
+    run.add_argument("--youtube",      help="Шаг 7: ссылка на YouTube-превью")
+
+    batch = sub.add_parser("batch", parents=[config],
+                           help="несколько альбомов параллельно (сессии в _SESSIONS)")
+    batch.set_defaults(func=cmd_batch)
+    who = batch.add_mutually_exclusive_group(required=True)
+    who.add_argument("--albums", nargs="+", help="папки альбомов в _НЕГОТОВЫЕ")
+    who.add_argument("--all", action="store_true", help="все альбомы из _НЕГОТОВЫЕ")
+    batch.add_argument("--steps", type=_steps_arg, default=parse_steps("1-2"),
+                       help="шаги для каждого альбома (по умолчанию 1-2)")
+    batch.add_argument("--answers", help="файл ответов; раздел albums — по альбомам")
+    batch.add_argument("-y", "--yes", action="store_true",
+                       help="отвечать «да» на вопросы без ответа в файле")
+    batch.add_argument("--workers", type=int,
+                       help="общий лимит одновременных конвертаций (по умолчанию из config.json)")
+
+    imp = sub.add_parser("import", parents=[config],
+                         help="обновить базы композиторов и ISRC из TOTAL METADATA")
+    imp.set_defaults(func=cmd_import)
+    imp.add_argument("--total", help="путь к TOTAL METADATA.xlsx (по умолчанию из config.json)")
+    imp.add_argument("--full", action="store_true",
+                     help="пересобрать базы целиком (по умолчанию — только изменившиеся строки)")
+    return ap
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
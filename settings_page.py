@@ -1,13 +1,17 @@
 # settings_page.py
-import os, json
+import os
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QFileDialog, QMessageBox, QSpacerItem, QSizePolicy
+    QFileDialog, QMessageBox, QSpacerItem, QSizePolicy, QSpinBox, QCheckBox
 )
 from PyQt6.QtGui  import QCursor
 from PyQt6.QtCore import Qt
 
 from util_json import load_json_safe, dump_json_safe   # «безопасные» I/O-функции
+from util_convert import (WORKERS_KEY, MAX_WORKERS,
+                          workers_from_config)
+from util_scratch import STAGING_KEY, DIR_KEY, GB_KEY, scratch_settings
+from task_panel import TaskPanel
 
 # ------------------------------------------------------------
 # paths / constants
@@ -17,12 +21,6 @@ CONFIG_FILE = os.path.join(APP_ROOT, "config.json")
 
 DB_DIR            = "_DATABASES"
 COMPOSER_DB_FILE  = "composer_database.json"
-ISRC_DB_FILE      = "isrc_database.json"
-
-try:
-    import pandas as pd
-except ImportError:
-    pd = None                                    # покажем ошибку при попытке
 
 # ------------------------------------------------------------
 # helpers / styles
@@ -44,20 +42,6 @@ def hint(text: str) -> QLabel:
     lbl = QLabel(text); lbl.setWordWrap(True)
     return lbl
 
-# --------- NaN-cleanup ----------------------------------------------------
-def _clean(val) -> str:
-    """
-    Превращает None, float('nan') или строку 'nan' → пустую строку.
-    Остальное возвращает как trimmed-строку.
-    """
-    if val is None:
-        return ""
-    if (pd is not None) and isinstance(val, float) and pd.isna(val):
-        return ""
-    s = str(val).strip()
-    return "" if s.lower() == "nan" else s
-# -------------------------------------------------------------------------
-
 # ------------------------------------------------------------
 # main widget
 # ------------------------------------------------------------
@@ -111,10 +95,38 @@ class SettingsPage(QWidget):
 
         root.addSpacerItem(v_spacer())
 
+        # ── производительность ──
+        root.addWidget(section_title("⚡ КОНВЕРТАЦИЯ"))
+        root.addWidget(hint("Сколько процессов ffmpeg запускать одновременно "
+                            "при обработке стемов и подготовке Harvest."))
+        row = QHBoxLayout(); row.setSpacing(4)
+        row.addWidget(QLabel("Параллельных конвертаций:"))
+        self.workers_spin = QSpinBox(minimum=1, maximum=MAX_WORKERS)
+        row.addWidget(self.workers_spin); row.addStretch(1)
+        root.addLayout(row)
+
+        self.staging_box = QCheckBox("Конвертировать через локальную черновую папку "
+                                     "(для папок в Dropbox / CloudStorage)")
+        root.addWidget(self.staging_box)
+        root.addWidget(hint("Исходники копируются туда пачками, конвертация идёт на "
+                            "локальном диске, готовые файлы переносятся в рабочие папки разом."))
+        row = QHBoxLayout(); row.setSpacing(4)
+        self.scratch_edit = QLineEdit()
+        scratch_btn = QPushButton("📁 Обзор", clicked=self._pick_scratch)
+        scratch_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        scratch_btn.setStyleSheet(BTN_STYLE)
+        row.addWidget(self.scratch_edit); row.addWidget(scratch_btn)
+        row.addWidget(QLabel("Не больше, ГБ:"))
+        self.scratch_spin = QSpinBox(minimum=1, maximum=2000)
+        row.addWidget(self.scratch_spin)
+        root.addLayout(row)
+
+        root.addSpacerItem(v_spacer())
+
         # ── TOTAL-METADATA и базы ──
         root.addWidget(section_title("📊 TOTAL METADATA"))
-        root.addWidget(hint("Excel-файл нужен, чтобы обновлять базы композиторов "
-                            "и ISRC-кодов."))
+        root.addWidget(hint("Excel-файл нужен, чтобы обновлять базу композиторов "
+                            "и каталог альбомов с ISRC-кодами."))
 
         row = QHBoxLayout(); row.setSpacing(4)
         self.tm_edit = QLineEdit()
@@ -124,17 +136,16 @@ class SettingsPage(QWidget):
         row.addWidget(self.tm_edit); row.addWidget(tm_btn)
         root.addLayout(row)
 
-        self.comp_btn = QPushButton("📥 Подгрузить базу композиторов",
-                                    clicked=self._update_composer_db)
-        self.comp_btn.setStyleSheet(BTN_STYLE)
-        self.comp_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-        root.addWidget(self.comp_btn)
+        self.import_btn = QPushButton("📥 Обновить базы композиторов и ISRC",
+                                      clicked=self._update_databases)
+        self.import_btn.setStyleSheet(BTN_STYLE)
+        self.import_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        root.addWidget(self.import_btn)
+        self.full_box = QCheckBox("Полная пересборка (иначе читаются только изменившиеся листы и строки)")
+        root.addWidget(self.full_box)
 
-        self.isrc_btn = QPushButton("📥 Подгрузить базу ISRC",
-                                    clicked=self._update_isrc_db)
-        self.isrc_btn.setStyleSheet(BTN_STYLE)
-        self.isrc_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-        root.addWidget(self.isrc_btn)
+        self.task = TaskPanel(busy_widgets=[self.import_btn])
+        root.addWidget(self.task)
 
         root.addSpacerItem(v_spacer(20))
 
@@ -146,7 +157,7 @@ class SettingsPage(QWidget):
 
         back_btn = QPushButton("⬅ Назад",
                                clicked=lambda:
-                               self.app.stack.setCurrentWidget(self.app.main_menu))
+                               self.app.pages.home())
         back_btn.setStyleSheet(BTN_STYLE)
         back_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
         root.addWidget(back_btn)
@@ -157,6 +168,11 @@ class SettingsPage(QWidget):
         if path:
             self.folder_fields[key].setText(path)
 
+    def _pick_scratch(self):
+        path = QFileDialog.getExistingDirectory(self, "Черновая папка")
+        if path:
+            self.scratch_edit.setText(path)
+
     def _pick_excel(self):
         f, _ = QFileDialog.getOpenFileName(self, "Excel-файл", "",
                                            "Excel (*.xlsx *.xls)")
@@ -165,8 +181,13 @@ class SettingsPage(QWidget):
 
     # ------------------------------------------------------ config I/O
     def _save_config(self):
-        cfg = {k: w.text().strip() for k, w in self.folder_fields.items()}
+        cfg = load_json_safe(CONFIG_FILE, {})          # сохраняем «чужие» ключи
+        cfg.update({k: w.text().strip() for k, w in self.folder_fields.items()})
         cfg["TOTAL METADATA"] = self.tm_edit.text().strip()
+        cfg[WORKERS_KEY]      = self.workers_spin.value()
+        cfg[STAGING_KEY]      = self.staging_box.isChecked()
+        cfg[DIR_KEY]          = self.scratch_edit.text().strip()
+        cfg[GB_KEY]           = self.scratch_spin.value()
 
         if not dump_json_safe(cfg, CONFIG_FILE):
             QMessageBox.critical(
@@ -176,17 +197,25 @@ class SettingsPage(QWidget):
             )
             return
 
-        self.app.stack.setCurrentWidget(self.app.main_menu)
+        self.app.pages.home()
 
     def _load_config(self):
         cfg = load_json_safe(CONFIG_FILE, {})
         for k, w in self.folder_fields.items():
             w.setText(cfg.get(k, ""))
         self.tm_edit.setText(cfg.get("TOTAL METADATA", ""))
+        self.workers_spin.setValue(workers_from_config(cfg))
+        staging, scratch_dir, scratch_gb = scratch_settings(cfg)
+        self.staging_box.setChecked(staging)
+        self.scratch_edit.setText(cfg.get(DIR_KEY, ""))
+        self.scratch_edit.setPlaceholderText(scratch_dir)
+        self.scratch_spin.setValue(max(1, round(scratch_gb)))
 
     # ------------------------------------------------------ DB helpers
     def _check_prereq(self) -> bool:
-        if pd is None:
+        try:
+            import core_catalog                   # тянет pandas — грузим только по делу
+        except ImportError:
             QMessageBox.critical(self, "Ошибка",
                                  "pandas не установлен.\n`pip install pandas openpyxl`")
             return False
@@ -207,88 +236,27 @@ class SettingsPage(QWidget):
         return True
 
     # ---------------- загрузка / обновление баз --------------------------
-    def _update_composer_db(self):
+    def _update_databases(self):
+        """TOTAL METADATA → composer_database.json + каталог (по умолчанию — только новое)."""
         if not self._check_prereq():
             return
         db_path = os.path.join(DB_DIR, COMPOSER_DB_FILE)
-        if not self._confirm_over(db_path):
+        full    = self.full_box.isChecked()
+        if full and not self._confirm_over(db_path):
             return
-        try:
-            os.makedirs(DB_DIR, exist_ok=True)
-            res = {"composers": {}, "publishers": {}}
-
-            xls = pd.ExcelFile(self.tm_edit.text().strip())
-            for sh in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name=sh, dtype=str)
-                for _, r in df.iterrows():
-                    self._add_composers(res, r)
-                    self._add_publisher(res, r)
-
-            with open(db_path, "w", encoding="utf-8") as f:
-                json.dump(res, f, indent=4, ensure_ascii=False)
-
+        from core_catalog import import_total
+        self.task.start(import_total, self.tm_edit.text().strip(), db_path, None, full,
+                        on_done=self._on_imported,
+                        on_fail=lambda msg: QMessageBox.critical(
+                            self, "Ошибка", f"Не удалось обновить базы:\n{msg}"))
+
+    def _on_imported(self, rep: dict):
+        if not rep["sheets"]:
             QMessageBox.information(self, "Готово",
-                                    f"База композиторов обновлена:\n{db_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка",
-                                 f"Не удалось обновить базу:\n{e}")
-
-    def _update_isrc_db(self):
-        if not self._check_prereq():
-            return
-        db_path = os.path.join(DB_DIR, ISRC_DB_FILE)
-        if not self._confirm_over(db_path):
-            return
-        try:
-            os.makedirs(DB_DIR, exist_ok=True)
-            xls  = pd.ExcelFile(self.tm_edit.text().strip())
-            isrc = {}
-            for sh in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name=sh, dtype=str)
-                for _, r in df.iterrows():
-                    code = _clean(r.get("CODE: ISRC"))
-                    if not code:
-                        continue
-                    isrc.setdefault(code, {
-                        "album_code":  _clean(r.get("ALBUM: Code")),
-                        "album_title": _clean(r.get("ALBUM: Title")),
-                        "track_title": _clean(r.get("TRACK: Title"))
-                    })
-
-            with open(db_path, "w", encoding="utf-8") as f:
-                json.dump(dict(sorted(isrc.items())), f,
-                          indent=4, ensure_ascii=False)
-
-            QMessageBox.information(self, "Готово",
-                                    f"База ISRC обновлена:\n{db_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка",
-                                 f"Не удалось обновить базу:\n{e}")
-
-    # ---------------- Excel-row parsers ----------------------------------
-    def _add_composers(self, dst, row):
-        for i in (1, 2, 3):
-            fn = _clean(row.get(f"WRITER:{i}: First Name"))
-            ln = _clean(row.get(f"WRITER:{i}: Last Name"))
-            mn = _clean(row.get(f"WRITER:{i}: Middle Name"))
-            if not (fn or ln):
-                continue
-            key = " ".join(p for p in (fn, mn, ln) if p)
-            dst["composers"].setdefault(key, {
-                "first_name": fn,
-                "middle_name": mn,
-                "last_name": ln,
-                "society":       _clean(row.get(f"WRITER:{i}: Society")),
-                "ipi":           _clean(row.get(f"WRITER:{i}: IPI")),
-                "publisher_key": _clean(row.get(f"WRITER:{i}: Original Publisher"))
-            })
-
-    def _add_publisher(self, dst, row):
-        name = _clean(row.get("PUBLISHER:1: Name"))
-        if not name:
-            return
-        dst["publishers"].setdefault(name, {
-            "publisher_name":    name,
-            "publisher_society": _clean(row.get("PUBLISHER:1: Society")),
-            "publisher_ipi":     _clean(row.get("PUBLISHER:1: IPI"))
-        })
+                                    "TOTAL METADATA не изменился — базы актуальны."); return
+        QMessageBox.information(
+            self, "Готово",
+            f"Базы обновлены.\n\nДобавлено композиторов: {rep['composers']}, "
+            f"издателей: {rep['publishers']}, ISRC: {rep['isrcs']}\n"
+            f"{rep['rows']} строк за {rep['seconds']:.1f} с "
+            f"({rep['rows_per_sec']:.0f} строк/с)")
@@ -1,5 +1,5 @@
 # step1_create_structure.py
-import os, re, json, subprocess, shutil
+import os
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QListWidget, QTextEdit,
     QPushButton, QMessageBox, QHBoxLayout
@@ -9,24 +9,14 @@ from PyQt6.QtMultimedia import QSoundEffect
 from PyQt6.QtCore import QUrl
 
 from util_json import load_json_safe
+from util_session import session_store
+from util_task import TaskError
 from util_path import rsrc
+from core_structure import (list_albums, analyze_album, new_session,
+                            album_folders_exist, build_structure)
+from task_panel import TaskPanel
 
 CONFIG_FILE  = "config.json"
-SESSION_FILE = "session.json"
-
-
-# ──────────── util ────────────
-def get_track_duration(file_path: str) -> float | None:
-    try:
-        r = subprocess.run(
-            ["ffprobe", "-v", "error",
-             "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
-            text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        return round(float(r.stdout.strip()), 2)
-    except Exception:
-        return None
 
 
 # ──────────── ШАГ 1 ────────────
@@ -87,6 +77,11 @@ class Step1CreateStructure(QWidget):
         nav.addWidget(back_btn)
         lay.addLayout(nav)
 
+        # фоновая задача (прогресс / отмена) — под логом
+        self.task = TaskPanel(self.log, [self.select_button, self.album_list,
+                                         self.next_button, back_btn])
+        lay.insertWidget(lay.indexOf(self.log_output) + 1, self.task)
+
         # ── внутреннее ──
         self.selected_album = self.album_code = self.album_name = None
         self.track_list, self.tracks_data = [], []
@@ -102,11 +97,8 @@ class Step1CreateStructure(QWidget):
     def load_albums(self):
         self.album_list.clear()
         if "_НЕГОТОВЫЕ" in self.paths:
-            p = self.paths["_НЕГОТОВЫЕ"]
-            if os.path.exists(p):
-                self.album_list.addItems(
-                    d for d in os.listdir(p) if os.path.isdir(os.path.join(p, d))
-                )
+            if os.path.exists(self.paths["_НЕГОТОВЫЕ"]):
+                self.album_list.addItems(list_albums(self.paths))
             else:
                 self.log("❌ Папка _НЕГОТОВЫЕ не найдена!")
 
@@ -121,104 +113,35 @@ class Step1CreateStructure(QWidget):
 
         self.selected_album = item.text()
         album_path = os.path.join(self.paths["_НЕГОТОВЫЕ"], self.selected_album)
-        mastered_path = os.path.join(album_path, "_MASTERED")
         self.log(f"\n🔹 Выбран альбом: {self.selected_album}")
+        self.task.start(analyze_album, album_path,
+                        on_done=lambda res: self._on_analyzed(album_path, res),
+                        on_fail=self.show_error)
 
-        if not os.path.exists(mastered_path):
-            self.show_error("Ошибка! В папке альбома нет _MASTERED.")
-            self.log("❌ Нет _MASTERED."); return
-
-        self.log("📂 Найдена _MASTERED, анализирую…")
-        mastered_tracks = [
-            f for f in os.listdir(mastered_path)
-            if re.match(r'IMG\d{3} - .* - \d{2} .*\.aif{1,2}$', f)
-        ]
-        if not mastered_tracks:
-            self.show_error("Ошибка! В _MASTERED не найдено треков.")
-            self.log("❌ Нет треков."); return
-
-        self.log(f"✅ Найдено {len(mastered_tracks)} треков:")
-        for t in mastered_tracks: self.log(f"   🎵 {t}")
-
-        m = re.match(r'(IMG\d{3}) - (.*?) - \d{2} .*', mastered_tracks[0])
-        if not m:
-            self.show_error("Ошибка! Не удалось определить код и название альбома.")
-            self.log("❌ Не удалось спарсить код/название."); return
-        self.album_code, self.album_name = m.groups()
-        self.track_list = sorted(mastered_tracks)
-
-        self.log(f"📌 Код: {self.album_code}")
-        self.log(f"📌 Название: {self.album_name}")
-
-        self.tracks_data.clear()
-        for track_file in self.track_list:
-            tm = re.match(r'(IMG\d{3}) - (.*?) - (\d{2}) (.*)\.aif{1,2}$', track_file)
-            if not tm: continue
-            _, _, track_number, track_name = tm.groups()
-
-            full_path = os.path.join(mastered_path, track_file)
-            duration  = get_track_duration(full_path)
-
-            poss = os.listdir(album_path)
-            track_folder = next((x for x in poss if track_name in x), None)
-            if track_folder and (fm := re.match(r'(.+?) - (.+) (\d+)$', track_folder)):
-                composer_full, _, bpm = fm.groups()
-                composers = [c.strip() for c in composer_full.split(" and ")]
-            else:
-                composers = ["Неизвестный"]; bpm = "000"
-
-            self.tracks_data.append({
-                "track_number": track_number,
-                "track_name": track_name,
-                "composers": composers,
-                "track_bpm": bpm,
-                "duration": duration,
-                "mastered_file": track_file
-            })
-
-        self.create_album_folders(album_path)
+    def _on_analyzed(self, album_path: str, res: dict):
+        self.album_code, self.album_name = res["album_code"], res["album_name"]
+        self.track_list, self.tracks_data = res["track_list"], res["tracks_data"]
+        self.create_album_folders(album_path, res)
+
+    def _on_structure_ready(self, _=None):
         self.show_success_popup()
         self.next_button.setEnabled(True)   # ← теперь просто активируем
         self.next_button.setStyleSheet("background-color: #388E3C; color: white; font-weight: bold;")
         # проигрываем звук
-        self.next_step_sound = QSoundEffect()
+        self.next_step_sound = QSoundEffect(self)
         self.next_step_sound.setSource(QUrl.fromLocalFile(rsrc("notify.wav")))
         self.next_step_sound.setVolume(0.5)
         self.next_step_sound.play()
 
     # ──────────────────────────────────────────────────────────────────────────
-    #             создание структуры IMG PART и папок альбома
+    #                          создание папок альбома
     # ──────────────────────────────────────────────────────────────────────────
-    def find_or_create_img_part(self, base_path: str) -> str:
-        """Возвращает подходящую _IMG PART X (макс 5 альбомов) или создаёт новую."""
-        parts = sorted(
-            [d for d in os.listdir(base_path) if re.match(r'_IMG PART \d+', d)],
-            key=lambda x: int(x.split()[-1])
-        )
-        if not parts:
-            new_part = os.path.join(base_path, "_IMG PART 1")
-            os.makedirs(new_part)
-            return new_part
-
-        last_part = os.path.join(base_path, parts[-1])
-        if len([d for d in os.listdir(last_part) if os.path.isdir(os.path.join(last_part, d))]) < 5:
-            return last_part
-
-        new_num = int(parts[-1].split()[-1]) + 1
-        new_part = os.path.join(base_path, f"_IMG PART {new_num}")
-        os.makedirs(new_part)
-        return new_part
-
-    def create_album_folders(self, album_path_negotovoe: str):
-        """Создаёт все нужные папки (c перезаписью) и сохраняет session.json."""
-        ai_parent = self.find_or_create_img_part(self.paths["_ALL ALBUMS AIFF"])
-        mp_parent = self.find_or_create_img_part(self.paths["_ALL ALBUMS MP3"])
-
-        album_aiff = os.path.join(ai_parent, f"{self.album_code} {self.album_name}")
-        album_mp3  = os.path.join(mp_parent,  f"{self.album_code} {self.album_name}")
+    def create_album_folders(self, album_path_negotovoe: str, analysis: dict):
+        """Спрашивает про перезапись и в фоне создаёт папки + session.json."""
+        session = new_session(self.paths, album_path_negotovoe, analysis)
 
         # ── если каталоги уже существуют ────────────────────────────────────
-        if os.path.exists(album_aiff) or os.path.exists(album_mp3):
+        if album_folders_exist(session):
             ask = QMessageBox.question(
                 self, "Папки уже существуют",
                 "Каталоги альбома уже есть в _ALL ALBUMS.\n"
@@ -229,42 +152,18 @@ class Step1CreateStructure(QWidget):
             if ask == QMessageBox.StandardButton.No:
                 self.log("⚠️ Создание отменено пользователем."); return
 
-            # удаляем и логируем
-            for p in (album_aiff, album_mp3):
-                if os.path.exists(p):
-                    shutil.rmtree(p)
-                    self.log(f"♻️ Удалён старый каталог: {p}")
-
-        # ── создаём заново ────────────────────────────────────────────────────
-        os.makedirs(album_aiff, exist_ok=True)
-        os.makedirs(album_mp3,  exist_ok=True)
-
-        stems_path = os.path.join(album_aiff, "Stems")
-        os.makedirs(stems_path, exist_ok=True)
-
-        self.log(f"📂 Созданы:\n  - {album_aiff}\n  - {album_mp3}\n  - {stems_path}")
-
-        # подпапки стемов
-        for tr in self.tracks_data:
-            folder_name = f"{self.album_code} - {self.album_name} - {tr['track_number']} {tr['track_name']}"
-            fp = os.path.join(stems_path, folder_name)
-            os.makedirs(fp, exist_ok=True)
-            tr["stems_folder"] = fp
-            self.log(f"📁 Папка стемов: {fp}")
-
-        # ── session.json ─────────────────────────────────────────────────────
-        with open(SESSION_FILE, "w", encoding="utf-8") as f:
-            json.dump({
-                "album_code":  self.album_code,
-                "album_name":  self.album_name,
-                "album_path_negotovoe": album_path_negotovoe,
-                "album_path_aiff":     album_aiff,
-                "album_path_mp3":      album_mp3,
-                "stems_path":          stems_path,
-                "tracks":              self.tracks_data
-            }, f, indent=4, ensure_ascii=False)
-
-        self.log("💾 session.json сохранён — можно переходить к Шагу 2.")
+        self.task.start(self._build_folders, session,
+                        on_done=self._on_structure_ready, on_fail=self.show_error)
+
+    @staticmethod
+    def _build_folders(ctx, session: dict):
+        """(фон) Удаляет старые каталоги, создаёт новые и пишет session.json."""
+        build_structure(ctx, session)
+        store = session_store()
+        store.replace(session)
+        if not store.flush():
+            raise TaskError(f"Не удалось сохранить {store.path}")
+        ctx.log("💾 session.json сохранён — можно переходить к Шагу 2.")
 
     # ──────────────────────────────────────────────────────────────────────────
     #                     всплывающие окна / навигация
@@ -297,8 +196,7 @@ class Step1CreateStructure(QWidget):
     def go_to_next_step(self):
         from step2_process_stems import Step2ProcessStems
         w = Step2ProcessStems(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
 
     def go_back(self):
-        self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
\ No newline at end of file
+        self.main_app.pages.home()
\ No newline at end of file
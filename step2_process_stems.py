@@ -5,7 +5,7 @@
   • показываем окно проверки, где можно переименовать или удалить лишние стемы,
   • переименовываем окончательно, сохраняем в session.json.
 """
-import os, re, json, subprocess
+import os
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTextEdit,
     QMessageBox, QLineEdit, QDialog
@@ -15,10 +15,15 @@ from PyQt6.QtGui  import QCursor
 from PyQt6.QtMultimedia import QSoundEffect
 from PyQt6.QtCore import QUrl
 from util_path import rsrc
+from util_json import load_json_safe
+from util_convert import workers_from_config
+from util_task import TaskContext
+from util_session import session_store
+from util_scratch import Scratch
+from core_stems import collect_stems, drop_stem, finalize_stems
+from task_panel import TaskPanel
 
-SESSION_FILE     = "session.json"
-IGNORE_KEYWORDS  = ["mix", "full mix", "unmastered", "mastered", "master", "bpm"]
-AUDIO_EXTENSIONS = (".wav", ".aif", ".aiff")
+CONFIG_FILE      = "config.json"
 
 # ───────────────────── helpers ─────────────────────
 def show_error(title: str, text: str):
@@ -26,34 +31,11 @@ def show_error(title: str, text: str):
     m.setIcon(QMessageBox.Icon.Critical); m.exec()
 
 def load_session():
-    if not os.path.exists(SESSION_FILE):
-        show_error("Ошибка", f"Не найден {SESSION_FILE}. Повторите Шаг 1.")
+    store = session_store()
+    if not store.exists:
+        show_error("Ошибка", f"Не найден {store.path}. Повторите Шаг 1.")
         return None
-    with open(SESSION_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def is_stem(fn: str, track: str) -> bool:
-    low, base = fn.lower(), os.path.splitext(fn.lower())[0]
-    if os.path.splitext(low)[1] not in AUDIO_EXTENSIONS:     return False
-    if "pdf" in low or any(k in low for k in IGNORE_KEYWORDS): return False
-    return base.strip() != track.lower().strip()
-
-def do_ffmpeg_convert(src: str, dst: str) -> bool:
-    try:
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", src, "-c:a", "pcm_s24be", "-ar", "48000", dst],
-            check=True
-        ); return True
-    except Exception as e:
-        print(f"FFmpeg error: {e}"); return False
-
-def clean_stem_name(fname: str, track: str) -> str:
-    base, _ = os.path.splitext(fname)
-    tmp = re.sub(re.escape(track), "", base, flags=re.IGNORECASE)
-    tmp = re.sub(r"(?i)\bstem\b|\b\d{2,3}\b", "", tmp)
-    tmp = re.sub(r"[_,\-.]", " ", tmp).replace("&", "AND")
-    tmp = re.sub(r"\s{2,}", " ", tmp)
-    return tmp.strip().upper()
+    return store
 
 # ────────────────── диалог проверки ──────────────────
 class StemsCheckDialog(QDialog):
@@ -79,8 +61,7 @@ class StemsCheckDialog(QDialog):
         lay.addWidget(ok)
 
     def _del(self, le, st, _):
-        if os.path.exists(st["old_path"]): os.remove(st["old_path"])
-        st["__delete__"] = True; le.hide()
+        drop_stem(st); le.hide()
 
     def on_ok(self):
         for le, st, _ in self.rows:
@@ -136,58 +117,36 @@ class Step2ProcessStems(QWidget):
         back_btn = QPushButton("⬅ Назад", clicked=self.go_back)
         nav.addWidget(self.next_btn); nav.addWidget(back_btn)
         lo.addLayout(nav)
+
+        # фоновая задача — сразу под логом
+        self.task = TaskPanel(self.log, [self.run_btn, self.next_btn, back_btn])
+        lo.insertWidget(lo.indexOf(self.log_output) + 1, self.task)
         return lo
 
     def log(self, t: str): self.log_output.append(t)
 
     # ─── логика шага ───
     def run_step2(self):
-        session = load_session()
-        if not session:
+        store = load_session()
+        if not store:
             self.log("❌ Нет session.json"); return
-        self.session_data = session
+        self.store = store
+        session = self.session_data = store.data
 
-        album_code  = session.get("album_code", "IMG000")
-        album_name  = session.get("album_name", "Unknown")
-        album_path  = session.get("album_path_negotovoe", "")
-        tracks_info = session.get("tracks", [])
+        album_code  = store.album_code or "IMG000"
+        album_name  = store.album_name or "Unknown"
+        album_path  = store.album_path_negotovoe
 
         if not os.path.isdir(album_path):
             show_error("Ошибка", f"Не найдена папка альбома:\n{album_path}"); return
 
         self.log(f"🎵 {album_code} – {album_name}")
-        stems_map, album_folders = {}, os.listdir(album_path)
-
-        # поиск стемов
-        for trk in tracks_info:
-            tnum, tname = trk.get("track_number", "00"), trk.get("track_name", "Unknown")
-            stems_folder = trk.get("stems_folder", "")
-            track_key = f"{tnum} {tname}"
-
-            real = next((x for x in album_folders if tname.lower() in x.lower()), None)
-            if not real:
-                self.log(f"⚠️ Нет папки для «{track_key}»"); stems_map[track_key] = []; continue
-            cand = [os.path.join(album_path, real)]
-            sub  = os.path.join(cand[0], "Stems");  cand.append(sub) if os.path.isdir(sub) else None
-
-            processed, stems = set(), []
-            for c in cand:
-                for root, dirs, files in os.walk(c):
-                    if "archive" in dirs: dirs.remove("archive")
-                    for f in files:
-                        if not is_stem(f, tname) or f in processed: continue
-                        processed.add(f)
-
-                        short  = clean_stem_name(f, tname)
-                        prefix = f"{album_code} - {album_name} - {tnum} {tname} "
-                        ext    = ".aiff"
-                        src, dst = os.path.join(root, f), os.path.join(stems_folder, prefix+short+ext)
-
-                        self.log(f"🔄 {f} → {os.path.basename(dst)}")
-                        if do_ffmpeg_convert(src, dst):
-                            stems.append({"old_path": dst, "prefix": prefix, "stem": short, "ext": ext})
-            stems_map[track_key] = stems
+        cfg     = load_json_safe(rsrc(CONFIG_FILE), {})
+        self.task.start(collect_stems, session, workers_from_config(cfg), Scratch.from_config(cfg),
+                        on_done=lambda stems_map: self._review_stems(session, stems_map))
 
+    def _review_stems(self, session: dict, stems_map: dict[str, list[dict]]):
+        """Окна проверки, финальное переименование и сохранение session.json."""
         # диалоги проверки
         updated = {}
         for track_key, lst in stems_map.items():
@@ -196,25 +155,15 @@ class Step2ProcessStems(QWidget):
             dlg = StemsCheckDialog(track_key, lst, self)
             updated[track_key] = lst if dlg.exec() != QDialog.DialogCode.Accepted else dlg.corrected_stems
 
-        # итоговое переименование
-        for tr in tracks_info:
-            key = f"{tr['track_number']} {tr['track_name']}"
-            for st in updated.get(key, []):
-                old = st["old_path"]
-                new = os.path.join(os.path.dirname(old), st["prefix"]+st["stem"]+st["ext"])
-                if new != old and os.path.exists(old):
-                    try: os.rename(old, new); st["old_path"] = new
-                    except Exception as e: self.log(f"⚠️ Ошибка переименования: {e}")
-            tr["stems"] = [os.path.basename(s["old_path"]) for s in updated.get(key, [])]
-
-        # сохранить сессию
-        session["tracks"] = tracks_info
-        with open(SESSION_FILE, "w", encoding="utf-8") as f: json.dump(session, f, indent=4)
+        # итоговое переименование + сохранить сессию
+        finalize_stems(TaskContext(log=self.log), session, updated)
+        if not self.store.flush():
+            show_error("Ошибка", f"Не удалось сохранить {self.store.path}"); return
 
         self.log("✅ Шаг 2 завершён!")
         self.next_btn.setEnabled(True)
         self.next_btn.setStyleSheet("background-color: #388E3C; color: white; font-weight: bold;")
-        self.next_step_sound = QSoundEffect()
+        self.next_step_sound = QSoundEffect(self)
         self.next_step_sound.setSource(QUrl.fromLocalFile(rsrc("notify.wav")))
         self.next_step_sound.setVolume(0.5)
         self.next_step_sound.play()
@@ -223,8 +172,7 @@ class Step2ProcessStems(QWidget):
     def go_to_next_step(self):
         from step3_composer_match import Step3ComposerMatch
         w = Step3ComposerMatch(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
 
     def go_back(self):
-        self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
+        self.main_app.pages.home()
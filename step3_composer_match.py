@@ -1,4 +1,4 @@
-import os, json, re
+import os, json
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QListWidget, QMessageBox, QInputDialog
@@ -10,28 +10,9 @@ from add_composer_dialog import AddComposerDialog
 from PyQt6.QtMultimedia import QSoundEffect
 from PyQt6.QtCore import QUrl
 from util_path import rsrc
-
-DATABASES_FOLDER     = "_DATABASES"
-COMPOSER_DB_FILENAME = "composer_database.json"
-SESSION_FILE         = "session.json"
-
-# ────────────────────────── вспомогательная логика ──────────────────────────
-def smart_lookup(name: str, db: dict[str, dict]) -> str | None:
-    """1) точное совпадение; 2) First + Last (Middle — опц.)."""
-    norm = " ".join(name.split()).strip()
-    if norm in db:
-        return norm
-
-    parts = norm.split()
-    if len(parts) < 2:
-        return None
-    first, last = parts[0].lower(), parts[-1].lower()
-
-    for key in db:
-        p = key.split()
-        if len(p) >= 2 and p[0].lower() == first and p[-1].lower() == last:
-            return key
-    return None
+from util_session import session_store
+from core_composers import (DATABASES_FOLDER, COMPOSER_DB_FILENAME,
+                            load_composer_db, match_composers)
 
 
 # ─────────────────────────────── ШАГ 3: КОМПОЗИТОРЫ ─────────────────────────
@@ -41,6 +22,7 @@ class Step3ComposerMatch(QWidget):
     def __init__(self, main_app):
         super().__init__()
         self.main_app = main_app
+        self.store = session_store()
         self.session_data: dict | None = None
         self.setLayout(self._ui())
 
@@ -92,13 +74,12 @@ class Step3ComposerMatch(QWidget):
 
     # ───────────────────────── session.json / список треков ──────────────────
     def _load_session(self):
-        if not os.path.exists(SESSION_FILE):
+        if not self.store.exists:
             return
-        with open(SESSION_FILE, "r", encoding="utf-8") as f:
-            self.session_data = json.load(f)
+        self.session_data = self.store.data
 
         self.track_list.clear()
-        for t in self.session_data.get("tracks", []):
+        for t in self.store.tracks:
             tn  = t.get("track_number", "??")
             ttl = t.get("track_name", "Unknown")
             cps = ", ".join(t.get("composers", []))
@@ -106,29 +87,22 @@ class Step3ComposerMatch(QWidget):
 
     # ───────────────────────────── основная логика ───────────────────────────
     def match_composers(self):
-        db_path = os.path.join(DATABASES_FOLDER, COMPOSER_DB_FILENAME)
-        if not os.path.exists(db_path):
+        composers_db = load_composer_db()
+        if composers_db is None:
             QMessageBox.warning(self, "Ошибка", "Не найдена composer_database.json.")
             return
 
-        with open(db_path, "r", encoding="utf-8") as f:
-            composers_db = json.load(f).get("composers", {})
+        self.session_data = self.store.data if self.store.exists else None
+        if self.session_data is None:
+            QMessageBox.warning(self, "Ошибка", "Нет session.json — повторите предыдущие шаги.")
+            return
 
-        tracks = self.session_data.get("tracks", [])
-        for tr in tracks:
-            matched = []
-            for name in tr.get("composers", []):
-                key = smart_lookup(name, composers_db)
-                if key:
-                    matched.append(key)
-                else:
-                    matched.append(self._resolve_unknown(name, composers_db))
-            tr["matched_composers"] = matched
+        match_composers(self.session_data, composers_db, self._resolve_unknown)
 
         # сохраняем результат
-        self.session_data["tracks"] = tracks
-        with open(SESSION_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.session_data, f, indent=4)
+        if not self.store.flush():
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить {self.store.path}")
+            return
 
         # --- НОВОЕ: сообщение в «лог» вместо всплывающего окна ---
         self.track_list.addItem("✅ Композиторы успешно сопоставлены!")
@@ -138,29 +112,37 @@ class Step3ComposerMatch(QWidget):
         self.next_btn.setStyleSheet(
             "background-color:#388E3C; color:white; font-weight:bold;")
 
-        self.next_step_sound = QSoundEffect()
+        self.next_step_sound = QSoundEffect(self)
         self.next_step_sound.setSource(QUrl.fromLocalFile(rsrc("notify.wav")))
         self.next_step_sound.setVolume(0.5)
         self.next_step_sound.play()
 
     # ─────────────── «композитор не найден»  →  выбрать / добавить ────────────
-    def _resolve_unknown(self, comp_name, db) -> str:
+    def _resolve_unknown(self, comp_name, db, suggestions) -> str:
         msg = QMessageBox(self)
         msg.setWindowTitle("Композитор не найден")
-        msg.setText(f"«{comp_name}» не найден в базе.\nЧто сделать?")
+        text = f"«{comp_name}» не найден в базе."
+        if suggestions:
+            text += "\nВозможно, это один из похожих композиторов:"
+        msg.setText(text + "\nЧто сделать?")
+        quick  = {msg.addButton(f"✔ {key}", QMessageBox.ButtonRole.AcceptRole): key
+                  for key in suggestions[:3]}
         choose = msg.addButton("Выбрать из базы",  QMessageBox.ButtonRole.YesRole)
         add    = msg.addButton("Добавить нового",  QMessageBox.ButtonRole.NoRole)
         msg.addButton("Отмена",                    QMessageBox.ButtonRole.RejectRole)
         msg.exec()
 
+        if msg.clickedButton() in quick:
+            return quick[msg.clickedButton()]
         if msg.clickedButton() == choose:
-            return self._choose_existing(db) or ""
+            return self._choose_existing(db, suggestions) or ""
         if msg.clickedButton() == add:
             return self._add_new_flow(comp_name, db) or ""
         return ""
 
-    def _choose_existing(self, db) -> str:
-        items = sorted(db.keys())
+    def _choose_existing(self, db, suggestions) -> str:
+        # похожие — в начале списка, остальные по алфавиту
+        items = suggestions + sorted(k for k in db if k not in suggestions)
         if not items:
             QMessageBox.warning(self, "Ошибка", "База композиторов пуста."); return ""
         text, ok = QInputDialog.getItem(self, "Выберите композитора", "", items, 0, False)
@@ -188,8 +170,7 @@ class Step3ComposerMatch(QWidget):
     def go_to_next_step(self):
         from step4_add_cover import Step4AddCover
         w = Step4AddCover(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
 
     def go_back(self):
-        self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
+        self.main_app.pages.home()
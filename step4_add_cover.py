@@ -1,5 +1,5 @@
 # step4_add_cover.py
-import os, json, shutil, re
+import os, json
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTextEdit, QMessageBox
@@ -8,8 +8,10 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtMultimedia import QSoundEffect
 from PyQt6.QtCore import QUrl
 from util_path import rsrc
+from util_session import SessionStore, session_store
+from core_cover import copy_cover
+from task_panel import TaskPanel
 
-SESSION_FILE = "session.json"
 CONFIG_FILE  = "config.json"
 
 
@@ -58,12 +60,15 @@ class Step4AddCover(QWidget):
         self.next_btn = QPushButton("➡ Следующий шаг", enabled=False,
                                     clicked=self.go_to_next_step)
         back_btn = QPushButton("⬅ Назад",
-                               clicked=lambda: self.main_app.stack.setCurrentWidget(
-                                   self.main_app.main_menu))
+                               clicked=lambda: self.main_app.pages.home())
         nav.addWidget(self.next_btn)
         nav.addWidget(back_btn)
         lo.addLayout(nav)
 
+        # ── фоновая задача ──
+        self.task = TaskPanel(self.log, [self.run_btn, self.next_btn, back_btn])
+        lo.insertWidget(lo.indexOf(self.log_out) + 1, self.task)
+
         return lo
 
     # ────────────────────── helpers ──────────────────────
@@ -76,13 +81,11 @@ class Step4AddCover(QWidget):
     # ────────────────────── logic ────────────────────────
     def run_step4(self):
         # 1) session.json
-        if not os.path.exists(SESSION_FILE):
+        ses = session_store()
+        if not ses.exists:
             self._err("Ошибка", "Нет session.json — повторите предыдущие шаги."); return
-        with open(SESSION_FILE, "r", encoding="utf-8") as f:
-            ses = json.load(f)
 
-        code, name, aiff = (ses.get(k, "") for k in
-                            ("album_code", "album_name", "album_path_aiff"))
+        code, name, aiff = ses.album_code, ses.album_name, ses.album_path_aiff
         if not (code and name and aiff):
             self.log("❌ Недостаточно данных в session.json."); return
 
@@ -94,33 +97,20 @@ class Step4AddCover(QWidget):
         if not covers_root or not os.path.isdir(covers_root):
             self._err("Ошибка", f"Папка обложек не найдена:\n{covers_root}"); return
 
-        # 3) ищем файл
-        album_dir = os.path.join(covers_root, f"{code} {name}")
-        if not os.path.isdir(album_dir):
-            self.log(f"❌ Нет папки: {album_dir}"); return
-        cover = next((f for f in os.listdir(album_dir)
-                      if re.search(r"8[\s_]?mb", f, re.I)), None)
-        if not cover:
-            self.log("❌ Не найден файл с «8 MB»."); return
-        self.log(f"✅ Найден файл: {cover}")
-
-        # 4) копируем
-        ext = os.path.splitext(cover)[1]
-        dst = os.path.join(aiff, f"{code} {name}{ext}")
-        try:
-            shutil.copy2(os.path.join(album_dir, cover), dst)
-            self.log(f"✅ Скопировано → {os.path.basename(dst)}")
-        except Exception as e:
-            self.log(f"❌ Ошибка копирования: {e}"); return
+        # 3–4) поиск и копирование — в фоне; ошибки только в лог
+        self.task.start(copy_cover, covers_root, code, name, aiff,
+                        on_done=lambda dst: self._finish(ses, dst),
+                        on_fail=lambda _msg: None)
 
+    def _finish(self, ses: SessionStore, dst: str):
         # 5) сохраняем и активируем «Следующий шаг»
-        ses["cover_file"] = dst
-        with open(SESSION_FILE, "w", encoding="utf-8") as f:
-            json.dump(ses, f, indent=4)
+        ses.cover_file = dst
+        if not ses.flush():
+            self._err("Ошибка", f"Не удалось сохранить {ses.path}"); return
         self.log("✅ Шаг 4 завершён!")
         self.next_btn.setEnabled(True)
         self.next_btn.setStyleSheet("background-color: #388E3C; color: white; font-weight: bold;")
-        self.next_step_sound = QSoundEffect()
+        self.next_step_sound = QSoundEffect(self)
         self.next_step_sound.setSource(QUrl.fromLocalFile(rsrc("notify.wav")))
         self.next_step_sound.setVolume(0.5)
         self.next_step_sound.play()
@@ -129,5 +119,4 @@ class Step4AddCover(QWidget):
     def go_to_next_step(self):
         from step_prepare_step5 import StepPrepareStep5
         w = StepPrepareStep5(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
\ No newline at end of file
+        self.main_app.pages.show(w)
\ No newline at end of file
@@ -1,6 +1,5 @@
 # step5_generate_metadata.py
-import os, json, shutil, subprocess
-import pandas as pd, openpyxl
+import os, json, subprocess
 
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
@@ -11,14 +10,13 @@ from PyQt6.QtCore        import Qt, QDate, QUrl
 from PyQt6.QtGui         import QDesktopServices
 from PyQt6.QtMultimedia  import QSoundEffect
 from util_path import rsrc
+from util_session import session_store
+from core_metadata import (load_databases, metadata_path, reserve_isrc, build_rows,
+                           write_outputs, sync_total)
+from task_panel import TaskPanel
 
 
-SESSION_FILE        = "session.json"
 CONFIG_FILE         = "config.json"
-DATABASES_FOLDER    = "_DATABASES"
-COMPOSER_DB_FILE    = os.path.join(DATABASES_FOLDER, "composer_database.json")
-ISRC_DB_FILE        = os.path.join(DATABASES_FOLDER, "isrc_database.json")
-TOTAL_METADATA_FILE = "_IMAGINE MUSIC TOTAL METADATA.xlsx"
 
 
 # ──────────────────────────────── ШАГ 5 ────────────────────────────────
@@ -66,6 +64,10 @@ class Step5GenerateMetadata(QWidget):
                                    clicked=self._run, minimumHeight=32)
         root.addWidget(self.btn_run)
 
+        # фоновая задача (запись xlsx / синхронизация)
+        self.task = TaskPanel(busy_widgets=[self.btn_run])
+        root.addWidget(self.task)
+
         # пояснение
         desc = QLabel(
             "Описание шага: программа собирает данные о треках, добавляет ISRC-коды, "
@@ -84,8 +86,7 @@ class Step5GenerateMetadata(QWidget):
                                     clicked=self._go_next)
         self.btn_back = QPushButton("⬅ Назад",
                                     clicked=lambda:
-                                    self.main_app.stack.setCurrentWidget(
-                                        self.main_app.main_menu))
+                                    self.main_app.pages.home())
         nav.addWidget(self.btn_next); nav.addWidget(self.btn_back)
         root.addLayout(nav)
 
@@ -94,10 +95,10 @@ class Step5GenerateMetadata(QWidget):
     # ---------- загрузка данных ----------
     def _load_data(self):
         # session
-        if not os.path.exists(SESSION_FILE):
+        self.store = session_store()
+        if not self.store.exists:
             self._err("Нет session.json — повторите предыдущие шаги."); return
-        with open(SESSION_FILE,"r",encoding="utf-8") as f:
-            self.ses = json.load(f)
+        self.ses = self.store.data
 
         # config
         if not os.path.exists(rsrc(CONFIG_FILE)):
@@ -109,19 +110,10 @@ class Step5GenerateMetadata(QWidget):
             self._err(f"Папка METADATA не найдена:\n{self.meta_dir}"); return
 
         # базы
-        with open(rsrc(COMPOSER_DB_FILE),"r",encoding="utf-8") as f:
-            db = json.load(f)
-        self.composers  = db.get("composers",{})
-        self.publishers = db.get("publishers",{})
-
-        self.isrc_db = {}
-        if os.path.exists(rsrc(ISRC_DB_FILE)):
-            with open(rsrc(ISRC_DB_FILE),"r",encoding="utf-8") as f:
-                self.isrc_db = json.load(f)
-        self.last_isrc = self._find_last_isrc()
+        self.composers, self.publishers, self.catalog = load_databases()
 
         # наполняем таблицу
-        self.tracks = self.ses.get("tracks",[])
+        self.tracks = self.store.tracks
         self.tbl.setRowCount(len(self.tracks))
         for r,trk in enumerate(self.tracks):
             itm = QTableWidgetItem(trk.get("track_name",""))
@@ -134,104 +126,22 @@ class Step5GenerateMetadata(QWidget):
     def _run(self):
         self._commit_table_edits()      # ← фиксация последнего ввода
 
-        code,name,cover = (self.ses.get(k,"") for k in
-                           ("album_code","album_name","cover_file"))
+        code,name = self.store.album_code, self.store.album_name
         day   = self.ed_date.date().toString("yyyy-MM-dd")
         desc  = self.ed_desc.toPlainText().strip()
         style = self.ed_style.text().strip()
 
-        # сохраняем описание альбома в session.json
-        self.ses["album_description"] = desc
-        with open(SESSION_FILE,"w",encoding="utf-8") as f:
-            json.dump(self.ses,f,indent=4)
-
-        # читаем таблицу
-        for r,trk in enumerate(self.tracks):
+        # описание альбома + таблица → session.json (одна запись)
+        self.store.album_description = desc
+        for r,trk in enumerate(self.store.tracks):     # живой список хранилища, не копия
             trk["manual_description"]     = (self.tbl.item(r,1).text() or "").strip()
             trk["manual_instrumentation"] = (self.tbl.item(r,2).text() or "").strip()
             trk["manual_keywords"]        = (self.tbl.item(r,3).text() or "").strip()
-
-        # общий набор ключевых слов альбома
-        album_kw = sorted({kw.strip()
-                           for t in self.tracks
-                           for kw in t.get("manual_keywords","").split(",")
-                           if kw.strip()})
-        album_kw_str = ", ".join(album_kw)
-
-        new_isrc = self._next_isrc(len(self.tracks))
-        cols     = self._columns(); rows=[]
-
-        for i,trk in enumerate(self.tracks):
-            rd = {}
-            # --- ALBUM ---
-            rd.update({
-                "LIBRARY: Name"        : self._lib_name(code),
-                "ALBUM: Code"          : code,
-                "ALBUM: Identity"      : "",
-                "ALBUM: Title"         : name,
-                "ALBUM: Display Title" : f"{code} {name}",
-                "ALBUM: Description"   : desc,
-                "ALBUM: Keywords"      : album_kw_str,
-                "ALBUM: Tags"          : "",
-                "ALBUM: Styles"        : style,
-                "ALBUM: Release Date"  : day,
-                "ALBUM: Artwork Filename": os.path.basename(cover)
-            })
-            # --- TRACK ---
-            rd["TRACK: Title"]         = trk.get("track_name","")
-            rd["TRACK: Display Title"] = trk.get("track_name","")
-            rd["TRACK: Alternate Title"]= ""
-            rd["TRACK: Description"]   = trk.get("manual_description","")
-            rd["TRACK: Number"]        = str(i+1)              # 1,2,3…
-            rd["TRACK: Is Main"]       = "Y"
-            rd["TRACK: Main Track Number"]= ""
-            rd["TRACK: Version"]       = "Main"
-            rd["TRACK: Duration"]      = self._dur_mmss(trk.get("duration",0.0))
-            rd["TRACK: BPM"]           = str(trk.get("track_bpm",""))
-            rd["TRACK: Tempo"]         = self._tempo(trk.get("track_bpm",0))
-            rd["TRACK: Genre"]         = "Trailer"
-            rd["TRACK: Mixout"]        = ""
-            rd["TRACK: Instrumentation"]= trk.get("manual_instrumentation","")
-            rd["TRACK: Keywords"]      = trk.get("manual_keywords","")
-            rd["TRACK: Lyrics"]        = ""
-            rd["TRACK: Identity"]      = trk.get("track_name","")
-            rd["TRACK: Category Codes"]= ""
-
-            # writers / publishers
-            writers,pubs = self._build_wp(trk.get("matched_composers",[]))
-            rd["TRACK: Composer(s)"]  = " and ".join(self._full_name(w) for w in writers)
-            rd["TRACK: Publisher(s)"] = " and ".join(sorted({w["publisher_name"]
-                                                             for w in writers if w["publisher_name"]}))
-            rd["TRACK: Artist(s)"]    = rd["TRACK: Composer(s)"]
-
-            # --- Audio Filename (без расширения) ---
-            audio_path   = trk.get("mastered_file","")          # полный путь
-            base_name    = os.path.basename(audio_path)         # IMG001 - Album - 01 Track.aif
-            audio_no_ext = os.path.splitext(base_name)[0]       # IMG001 - Album - 01 Track
-            rd["TRACK: Audio Filename"] = audio_no_ext
-
-            # пустой ARTIST:1
-            for f in ("First Name","Middle Name","Last Name","Society","IPI"):
-                rd[f"ARTIST:1: {f}"] = ""
-
-            for n in (1,2,3): self._fill_writer(rd,writers[:3]+[None]*3,n)
-            for n in (1,2):   self._fill_publisher(rd,pubs[:2],n)
-
-            rd["CODE: ISWC"] = ""
-            rd["CODE: ISRC"] = new_isrc[i]
-            self.isrc_db[new_isrc[i]] = {
-                "album_code":code,"album_title":name,
-                "track_title":trk.get("track_name","")}
-
-            rows.append([rd.get(c,"") for c in cols])
-
-        # записываем isrc-базу
-        with open(rsrc(ISRC_DB_FILE),"w",encoding="utf-8") as f:
-            json.dump(self.isrc_db,f,indent=4)
+        if not self.store.flush():
+            self._err(f"Не удалось сохранить {self.store.path}"); return
 
         # xlsx-файл альбома
-        out = os.path.join(self.meta_dir,
-                           f"{code.upper()} {name.upper()} METADATA.xlsx")
+        out = metadata_path(self.meta_dir, code, name)
         if os.path.exists(out) and \
            QMessageBox.question(self,"Файл уже существует",
                                 f"{os.path.basename(out)} уже есть. Заменить?",
@@ -241,7 +151,15 @@ class Step5GenerateMetadata(QWidget):
            QMessageBox.StandardButton.No:
             return
 
-        pd.DataFrame(rows,columns=cols).fillna("").to_excel(out,index=False)
+        # ISRC резервируются только после подтверждения
+        rows = build_rows(self.ses, self.composers, self.publishers,
+                          reserve_isrc(self.catalog, self.ses), day, desc, style)
+
+        self.task.start(write_outputs, rows, out, self.catalog,
+                        on_done=lambda _: self._after_write(out, code),
+                        on_fail=self._err)
+
+    def _after_write(self, out: str, code: str):
         self._info("Файл METADATA.xlsx создан — проверьте его.")
         self._open(out)
 
@@ -251,7 +169,8 @@ class Step5GenerateMetadata(QWidget):
                                 QMessageBox.StandardButton.No,
                                 QMessageBox.StandardButton.No) == \
            QMessageBox.StandardButton.Yes:
-            self._sync_total(out,code)
+            self.task.start(sync_total, self.meta_dir, out, code,
+                            on_done=lambda _: self._on_synced(), on_fail=self._err)
 
     # ---------- фиксация последнего ввода ----------
     def _commit_table_edits(self):
@@ -265,30 +184,7 @@ class Step5GenerateMetadata(QWidget):
         self.tbl.setFocus(Qt.FocusReason.OtherFocusReason)
         QApplication.processEvents()            # завершить цикл событий
 
-    # ---------- TOTAL METADATA ----------
-    def _sync_total(self, meta_xlsx:str, album_code:str):
-        sheet = "IMT" if album_code.startswith("IMT") else "IMG"
-        total = os.path.join(self.meta_dir,TOTAL_METADATA_FILE)
-        if not os.path.exists(total):
-            self._err(f"Не найден {TOTAL_METADATA_FILE}"); return
-
-        shutil.copy2(total,os.path.join(
-            self.meta_dir,"_IMAGINE MUSIC TOTAL METADATA (backup).xlsx"))
-
-        wb = openpyxl.load_workbook(total)
-        if sheet not in wb.sheetnames:
-            self._err(f"В таблице нет листа {sheet}"); return
-        ws = wb[sheet]
-
-        start = self._last_real_row(ws)+2      # ровно ОДНА пустая строка
-        data  = pd.read_excel(meta_xlsx,dtype=str).fillna("").values.tolist()
-
-        for r,row in enumerate(data,start):
-            for c,val in enumerate(row,1):
-                ws.cell(row=r,column=c,value=str(val))
-
-        wb.save(total)
-
+    def _on_synced(self):
         self.btn_next.setEnabled(True)
         self.btn_next.setStyleSheet("background:#388E3C;color:white;font-weight:bold;")
 
@@ -297,149 +193,7 @@ class Step5GenerateMetadata(QWidget):
 
         self._info("Синхронизация выполнена (бэкап создан).")
 
-    # ────────────────────── util helpers ──────────────────────
-    def _find_last_isrc(self) -> str:
-        codes = [k for k in self.isrc_db if k.startswith("RU-AD4-20-") and len(k) == 15]
-        if not codes: return "RU-AD4-20-01000"
-        return max(codes, key=lambda x: int(x[-5:]))
-
-    def _next_isrc(self, n: int):
-        base = self._find_last_isrc()[:-5]
-        last = int(self._find_last_isrc()[-5:])
-        return [f"{base}{last+i+1:05d}" for i in range(n)]
-
-    def _lib_name(self, code: str) -> str:
-        return "Imagine Music Tools" if code.startswith("IMT") else "Imagine Music"
-
-    @staticmethod
-    def _dur_mmss(sec: float) -> str:
-        m, s = divmod(int(sec), 60)
-        return f"{m}.{s:02d}"
-
-    @staticmethod
-    def _tempo(bpm) -> str:
-        try: bpm = int(bpm)
-        except: bpm = 0
-        if bpm <= 70:  return "Slow"
-        if bpm <= 90:  return "Downtempo"
-        if bpm <= 115: return "Midtempo"
-        if bpm <= 140: return "Uptempo"
-        return "Fast"
-
-    @staticmethod
-    def _columns():
-        # … список колонок без изменений …
-        return [
-            "LIBRARY: Name","ALBUM: Code","ALBUM: Identity","ALBUM: Title","ALBUM: Display Title",
-            "ALBUM: Description","ALBUM: Keywords","ALBUM: Tags","ALBUM: Styles","ALBUM: Release Date",
-            "ALBUM: Artwork Filename",
-            "TRACK: Title","TRACK: Display Title","TRACK: Alternate Title","TRACK: Description",
-            "TRACK: Number","TRACK: Is Main","TRACK: Main Track Number","TRACK: Version","TRACK: Duration",
-            "TRACK: BPM","TRACK: Tempo","TRACK: Genre","TRACK: Mixout","TRACK: Instrumentation",
-            "TRACK: Keywords","TRACK: Lyrics","TRACK: Identity","TRACK: Category Codes",
-            "TRACK: Composer(s)","TRACK: Publisher(s)","TRACK: Artist(s)","TRACK: Audio Filename",
-            "ARTIST:1: First Name","ARTIST:1: Middle Name","ARTIST:1: Last Name",
-            "ARTIST:1: Society","ARTIST:1: IPI",
-            "WRITER:1: First Name","WRITER:1: Middle Name","WRITER:1: Last Name",
-            "WRITER:1: Capacity","WRITER:1: Society","WRITER:1: IPI","WRITER:1: Territory",
-            "WRITER:1: Owner Performance Share %","WRITER:1: Owner Mechanical Share %","WRITER:1: Original Publisher",
-            "WRITER:2: First Name","WRITER:2: Middle Name","WRITER:2: Last Name",
-            "WRITER:2: Capacity","WRITER:2: Society","WRITER:2: IPI","WRITER:2: Territory",
-            "WRITER:2: Owner Performance Share %","WRITER:2: Owner Mechanical Share %","WRITER:2: Original Publisher",
-            "WRITER:3: First Name","WRITER:3: Middle Name","WRITER:3: Last Name",
-            "WRITER:3: Capacity","WRITER:3: Society","WRITER:3: IPI","WRITER:3: Territory",
-            "WRITER:3: Owner Performance Share %","WRITER:3: Owner Mechanical Share %","WRITER:3: Original Publisher",
-            "PUBLISHER:1: Name","PUBLISHER:1: Capacity","PUBLISHER:1: Society","PUBLISHER:1: IPI",
-            "PUBLISHER:1: Territory","PUBLISHER:1: Owner Performance Share %","PUBLISHER:1: Owner Mechanical Share %",
-            "PUBLISHER:2: Name","PUBLISHER:2: Capacity","PUBLISHER:2: Society","PUBLISHER:2: IPI",
-            "PUBLISHER:2: Territory","PUBLISHER:2: Owner Performance Share %","PUBLISHER:2: Owner Mechanical Share %",
-            "CODE: ISWC","CODE: ISRC"
-        ]
-
-    # ---------- writer / publisher helpers ----------
-    @staticmethod
-    def _full_name(w):                 # first + middle + last
-        return " ".join(p for p in (w["first_name"], w["middle_name"], w["last_name"]) if p).strip()
-
-    def _build_wp(self, names):
-        n = len(names)
-        if n == 0: return [], []
-        shares = ([100] if n == 1 else
-                  [50, 50][:n] if n == 2 else
-                  [34, 33, 33][:n] if n == 3 else
-                  self._even_shares(n))
-
-        writers, pubs = [], {}
-        for share, nm in zip(shares, names):
-            c = self.composers.get(nm, {})
-            pub_key = c.get("publisher_key", "")
-            p_info  = self.publishers.get(pub_key, {}) if pub_key else {}
-            w = dict(
-                first_name=c.get("first_name", ""), middle_name=c.get("middle_name", ""),
-                last_name=c.get("last_name", ""),  capacity=c.get("capacity", "Composer/Author"),
-                society=c.get("society", ""), ipi=c.get("ipi", ""),
-                publisher_name = p_info.get("publisher_name", pub_key),
-                owner_perf_share=str(share), owner_mech_share=str(share)
-            )
-            writers.append(w)
-
-            if w["publisher_name"]:
-                pubs.setdefault(w["publisher_name"], dict(
-                    publisher_name = w["publisher_name"],
-                    publisher_society = p_info.get("publisher_society", ""),
-                    publisher_ipi = p_info.get("publisher_ipi", ""),
-                    owner_perf_share = w["owner_perf_share"],
-                    owner_mech_share = w["owner_mech_share"]
-                ))
-        return writers, list(pubs.values())
-
-    @staticmethod
-    def _even_shares(n):
-        base, rem = divmod(100, n)
-        return [base + (1 if i < rem else 0) for i in range(n)]
-
-    def _fill_writer(self, rd, slots, idx):
-        p = f"WRITER:{idx}"
-        w = slots[idx-1]
-        if not w:
-            for fld in ("First Name","Middle Name","Last Name","Capacity","Society","IPI",
-                        "Territory","Owner Performance Share %","Owner Mechanical Share %",
-                        "Original Publisher"):
-                rd[f"{p}: {fld}"] = ""; return
-        rd[f"{p}: First Name"] = w["first_name"]
-        rd[f"{p}: Middle Name"] = w["middle_name"]
-        rd[f"{p}: Last Name"] = w["last_name"]
-        rd[f"{p}: Capacity"] = w["capacity"]
-        rd[f"{p}: Society"] = w["society"]
-        rd[f"{p}: IPI"] = w["ipi"]
-        rd[f"{p}: Territory"] = "WORLD"
-        rd[f"{p}: Owner Performance Share %"] = w["owner_perf_share"]
-        rd[f"{p}: Owner Mechanical Share %"] = w["owner_mech_share"]
-        rd[f"{p}: Original Publisher"] = w["publisher_name"]
-
-    def _fill_publisher(self, rd, pubs, idx):
-        p = f"PUBLISHER:{idx}"
-        if idx > len(pubs):
-            for fld in ("Name","Capacity","Society","IPI","Territory",
-                        "Owner Performance Share %","Owner Mechanical Share %"):
-                rd[f"{p}: {fld}"] = ""; return
-        pb = pubs[idx-1]
-        rd[f"{p}: Name"]       = pb["publisher_name"]
-        rd[f"{p}: Capacity"]   = "Original Publisher"
-        rd[f"{p}: Society"]    = pb["publisher_society"]
-        rd[f"{p}: IPI"]        = pb["publisher_ipi"]
-        rd[f"{p}: Territory"]  = "WORLD"
-        rd[f"{p}: Owner Performance Share %"] = pb["owner_perf_share"]
-        rd[f"{p}: Owner Mechanical Share %"]  = pb["owner_mech_share"]
-
     # ---------- misc ----------
-    @staticmethod
-    def _last_real_row(ws):
-        for row in range(ws.max_row, 0, -1):
-            if any((cell.value not in ("", None)) for cell in ws[row]):
-                return row
-        return 1
-
     def _err(self, msg):
         QMessageBox.critical(self, "Ошибка", msg)
 
@@ -458,5 +212,4 @@ class Step5GenerateMetadata(QWidget):
     def _go_next(self):
         from step_prepare_step6 import StepPrepareStep6
         w = StepPrepareStep6(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
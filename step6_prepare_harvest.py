@@ -1,6 +1,5 @@
 # step6_prepare_harvest.py
-import os, json, shutil, subprocess
-import pandas as pd
+import os, json
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
@@ -10,9 +9,12 @@ from PyQt6.QtCore         import Qt, QUrl
 from PyQt6.QtMultimedia   import QSoundEffect
 from PyQt6.QtGui          import QDesktopServices
 from util_path import rsrc
+from util_task import TaskError
+from util_session import session_store
+from core_harvest import verify_all_tracks, harvest_album_path, build_harvest
+from task_panel import TaskPanel
 
 
-SESSION_FILE = "session.json"
 CONFIG_FILE  = "config.json"
 
 
@@ -74,11 +76,14 @@ class Step6PrepareHarvest(QWidget):
                                     clicked=self.go_to_next_step)
         self.back_btn = QPushButton("⬅ Назад",
                                     clicked=lambda:
-                                    self.main_app.stack.setCurrentWidget(
-                                        self.main_app.main_menu))
+                                    self.main_app.pages.home())
         nav.addWidget(self.next_btn)
         nav.addWidget(self.back_btn)
         lo.addLayout(nav)
+
+        # ── фоновая задача ──
+        self.task = TaskPanel(self.log, [self.run_btn, self.next_btn, self.back_btn])
+        lo.insertWidget(lo.indexOf(self.log_out) + 1, self.task)
         return lo
 
     # ─────────────────────── helpers ────────────────────────
@@ -97,127 +102,37 @@ class Step6PrepareHarvest(QWidget):
     # ─────────────────────── logic ──────────────────────────
     def run_step6(self):
         # session.json
-        if not os.path.exists(SESSION_FILE):
+        store = session_store()
+        if not store.exists:
             self._err("Ошибка", "Нет session.json — повторите предыдущие шаги."); return
-        with open(SESSION_FILE, "r", encoding="utf-8") as f:
-            self.session_data = json.load(f)
-
-        # проверяем треки
-        if not self.verify_all_tracks():
-            return
-
-        # готовим Harvest
-        self.prepare_for_harvest()
-
-    # ---------- verify ----------
-    def verify_all_tracks(self) -> bool:
-        code  = self.session_data.get("album_code","IMG000")
-        name  = self.session_data.get("album_name","Unknown")
-
-        p_aiff = self.config.get("_ALL ALBUMS AIFF","")
-        p_mp3  = self.config.get("_ALL ALBUMS MP3","")
-        if not os.path.isdir(p_aiff) or not os.path.isdir(p_mp3):
-            self._err("Ошибка", "Папки AIFF / MP3 не найдены в config.json"); return False
-
-        f_aiff_folder = self.session_data.get("album_path_aiff","")
-        f_mp3_folder  = self.session_data.get("album_path_mp3","")
-        if not os.path.isdir(f_aiff_folder) or not os.path.isdir(f_mp3_folder):
-            self._err("Ошибка", "Альбом не найден в AIFF или MP3"); return False
-
-        for trk in self.session_data.get("tracks", []):
-            num  = trk.get("track_number","")
-            t_nm = trk.get("track_name","")
-            base = f"{code} - {name} - {num} {t_nm}"
-
-            # AIFF
-            if not any(os.path.exists(os.path.join(f_aiff_folder, base + ext))
-                       for ext in (".aiff", ".aif")):
-                self._err("Ошибка", f"Не найден AIFF: {base}"); return False
-
-            # MP3
-            if not os.path.exists(os.path.join(f_mp3_folder, base + ".mp3")):
-                self._err("Ошибка", f"Не найден MP3: {base}.mp3"); return False
-        self.log("✅ Все треки найдены.")
-        return True
+        self.session_data = store.data
+
+        # проверяем треки (в фоне), затем готовим Harvest
+        self.task.start(verify_all_tracks, self.session_data, self.config,
+                        on_done=lambda _: self.prepare_for_harvest(),
+                        on_fail=lambda msg: self._err("Ошибка", msg))
 
     # ---------- prepare ----------
     def prepare_for_harvest(self):
-        code = self.session_data.get("album_code","IMG000")
-        name = self.session_data.get("album_name","Unknown")
-        cover= self.session_data.get("cover_file","")
-        meta_root = self.config.get("_ALL ALBUMS METADATA","")
-        hv_root = self.config.get("_ALL ALBUMS HARVEST","")
-
-        if not os.path.isdir(hv_root):
-            self._err("Ошибка", "Папка Harvest Albums не найдена!"); return
+        try:
+            hv_album = harvest_album_path(self.session_data, self.config)
+        except TaskError as e:
+            self._err("Ошибка", str(e)); return
 
-        hv_album = os.path.join(hv_root, f"{code} {name}")
         if os.path.exists(hv_album):
             if QMessageBox.question(self, "Перезапись",
-                                    f"Папка {hv_album} уже существует. Удалить и создать заново?",
+                                    f"Папка {hv_album} уже существует. Обновить её?\n"
+                                    "Готовые файлы останутся, недостающие и устаревшие "
+                                    "будут сделаны заново, лишние — удалены.",
                                     QMessageBox.StandardButton.Yes |
                                     QMessageBox.StandardButton.No,
                                     QMessageBox.StandardButton.No) \
                == QMessageBox.StandardButton.No:
                 self.log("Отмена."); return
-            try: shutil.rmtree(hv_album)
-            except Exception as e:
-                self._err("Ошибка", f"Не удалось удалить старую папку: {e}"); return
-        os.makedirs(hv_album)
-
-        # обложка
-        if cover and os.path.exists(cover):
-            shutil.copy2(cover, os.path.join(hv_album, os.path.basename(cover)))
-            self.log("✅ Обложка скопирована.")
-
-        # конвертация AIFF → WAV
-        aiff_folder = self.session_data["album_path_aiff"]
-        for fname in os.listdir(aiff_folder):
-            fpath = os.path.join(aiff_folder, fname)
-            if os.path.isdir(fpath) and fname.lower() == "stems":
-                continue
-            if fname.lower().endswith((".aif", ".aiff")):
-                wav_out = os.path.join(hv_album, os.path.splitext(fname)[0] + ".wav")
-                if self.convert_to_wav_24_48(fpath, wav_out):
-                    self.log(f"✅ {fname} → WAV")
-                else:
-                    self._err("Ошибка", f"Не удалось конвертировать {fname}"); return
-            else:                                   # копируем «как есть»
-                shutil.copy2(fpath, os.path.join(hv_album, fname))
-
-        # метаданные .xlsx + .txt
-        meta_xlsx = os.path.join(
-            meta_root, f"{code.upper()} {name.upper()} METADATA.xlsx")
-        if os.path.exists(meta_xlsx):
-            dst_xlsx = os.path.join(hv_album, os.path.basename(meta_xlsx))
-            shutil.copy2(meta_xlsx, dst_xlsx)
-            dst_txt  = dst_xlsx.replace(".xlsx", ".txt")
-            self.generate_tab_delimited(dst_xlsx, dst_txt)
-            self.log("✅ Метаданные и TXT скопированы.")
-        else:
-            self.log("❌ Файл METADATA.xlsx не найден — пропускаем.")
-
-        self.log(f"✅ Папка для Harvest подготовлена: {hv_album}")
-        self.activate_next_step()
-
-    # ---------- converters ----------
-    def convert_to_wav_24_48(self, src, dst) -> bool:
-        try:
-            subprocess.run(["ffmpeg","-y","-i", src,
-                            "-c:a","pcm_s24le","-ar","48000", dst],
-                           check=True, stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL)
-            return True
-        except Exception as e:
-            print("ffmpeg error:", e)
-            return False
-
-    def generate_tab_delimited(self, xlsx_path, txt_path):
-        try:
-            df = pd.read_excel(xlsx_path, dtype=str).fillna("")
-            df.to_csv(txt_path, sep='\t', index=False)
-        except Exception as e:
-            self._err("Ошибка", f"Не удалось сохранить TXT: {e}")
+
+        self.task.start(build_harvest, self.session_data, self.config, hv_album,
+                        on_done=lambda _: self.activate_next_step(),
+                        on_fail=lambda msg: self._err("Ошибка", msg))
 
     # ---------- misc ----------
     def activate_next_step(self):
@@ -225,7 +140,7 @@ class Step6PrepareHarvest(QWidget):
         self.next_btn.setStyleSheet(
             "background-color:#388E3C; color:white; font-weight:bold;")
         # пинг
-        self._snd = QSoundEffect()
+        self._snd = QSoundEffect(self)
         self._snd.setSource(QUrl.fromLocalFile(rsrc("notify.wav")))
         self._snd.setVolume(0.5)
         self._snd.play()
@@ -243,6 +158,5 @@ class Step6PrepareHarvest(QWidget):
     def go_to_next_step(self):
         from step_prepare_step7 import StepPrepareStep7
         w = StepPrepareStep7(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
 
@@ -1,21 +1,12 @@
 # step7_social_media.py
-import os, json, traceback
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
     QTextEdit, QMessageBox
 )
 from PyQt6.QtCore import Qt
 from step_finals import StepFinals
-
-# ─── опциональный автоперевод EN→RU ───
-try:
-    from deep_translator import GoogleTranslator       # pip install deep-translator
-    _tr_ok = True
-except Exception:
-    _tr_ok = False
-# ──────────────────────────────────────
-
-SESSION_FILE = "session.json"
+from util_session import session_store
+from core_social import translate_ru, build_posts
 
 
 class Step7SocialMedia(QWidget):
@@ -34,14 +25,13 @@ class Step7SocialMedia(QWidget):
         root.addWidget(title)
 
         # ── session.json ──
-        if not os.path.exists(SESSION_FILE):
+        ses = session_store()
+        if not ses.exists:
             QMessageBox.critical(self, "Ошибка", "Нет session.json — повторите предыдущие шаги.")
             self._back(); return
-        with open(SESSION_FILE, "r", encoding="utf-8") as f:
-            ses = json.load(f)
-        self.album_code = ses.get("album_code", "")
-        self.album_name = ses.get("album_name", "")
-        self.album_desc_en = ses.get("album_description", "")
+        self.album_code = ses.album_code
+        self.album_name = ses.album_name
+        self.album_desc_en = ses.album_description
 
         # ── ссылки ──
         root.addWidget(QLabel("Ссылка на DISCO / Client Area:"))
@@ -91,13 +81,8 @@ class Step7SocialMedia(QWidget):
 
     # ────────────────── helpers ──────────────────
     def _auto_translate(self):
-        if not (_tr_ok and self.album_desc_en.strip()):
-            return
-        try:
-            ru = GoogleTranslator(source="en", target="ru").translate(self.album_desc_en)
+        if ru := translate_ru(self.album_desc_en):
             self.desc_ru_in.setText(ru)
-        except Exception:
-            print("[Step7] auto-translation failed:\n", traceback.format_exc())
 
     def _generate(self):
         disco, yt = self.disco_in.text().strip(), self.yt_in.text().strip()
@@ -108,24 +93,7 @@ class Step7SocialMedia(QWidget):
         desc_ru = self.desc_ru_in.toPlainText().strip()
         code, name = self.album_code, self.album_name
 
-        insta = f"{code} {name} | New Album\n\n{desc_en}\n\n#imaginemusic"
-        fb    = (f"{code} {name} | New Album\n\n{desc_en}\n\n"
-                 f"The album is available for listening in our client area: {disco}\nPreview: {yt}")
-        li    = (f"{code} {name} | New Album\n\n{desc_en}\n\n"
-                 f"The album is available for listening in our client area: {disco}\n"
-                 f"Preview: {yt}\n\n#imaginemusic #trailermusic")
-        vk    = (f"{code} {name} | Новый альбом\n\n{desc_ru}\n\n"
-                 f"Альбом уже доступен для прослушивания: {disco}\nПревью: {yt}")
-        yt_desc = (f"{code} {name} | New Album\n\n{desc_en}\n\n"
-                   f"The album is available for listening in our client area: {disco}")
-
-        self.out.setPlainText(
-            "=== INSTAGRAM ===\n" + insta + "\n\n"
-            "=== FACEBOOK ===\n"  + fb    + "\n\n"
-            "=== LINKEDIN ===\n"  + li    + "\n\n"
-            "=== VK ===\n"       + vk    + "\n\n"
-            "=== YOUTUBE ===\n"  + yt_desc
-        )
+        self.out.setPlainText(build_posts(code, name, desc_en, desc_ru, disco, yt))
 
         self.finish_btn.setEnabled(True)
         self.finish_btn.setStyleSheet("background:#388E3C; color:white; font-weight:bold;")
@@ -133,8 +101,7 @@ class Step7SocialMedia(QWidget):
     # ─────────────── переходы ───────────────
     def _finish(self):
         w = StepFinals(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
 
     def _back(self):
-        self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
+        self.main_app.pages.home()
@@ -61,4 +61,4 @@ class StepFinals(QWidget):
 
     # ── helpers ──
     def go_to_main_menu(self):
-        self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
+        self.main_app.pages.home()
@@ -50,8 +50,7 @@ class StepPrepareStep1(QWidget):
         next_btn.setStyleSheet("background-color: #388E3C; color: white; font-weight: bold;")
         back_btn = QPushButton("⬅ Назад",
                                clicked=lambda:
-                               self.main_app.stack.setCurrentWidget(
-                                   self.main_app.main_menu))
+                               self.main_app.pages.home())
         nav.addWidget(next_btn)
         nav.addWidget(back_btn)
         root.addLayout(nav)
@@ -60,5 +59,4 @@ class StepPrepareStep1(QWidget):
     def go_to_step1(self):
         from step1_create_structure import Step1CreateStructure
         w = Step1CreateStructure(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
\ No newline at end of file
+        self.main_app.pages.show(w)
\ No newline at end of file
@@ -49,8 +49,7 @@ class StepPrepareStep5(QWidget):
         next_btn.setStyleSheet("background-color: #388E3C; color: white; font-weight: bold;")
         back_btn = QPushButton("⬅ Назад",
                                clicked=lambda:
-                               self.main_app.stack.setCurrentWidget(
-                                   self.main_app.main_menu))
+                               self.main_app.pages.home())
         nav.addWidget(next_btn)
         nav.addWidget(back_btn)
         root.addLayout(nav)
@@ -59,5 +58,4 @@ class StepPrepareStep5(QWidget):
     def go_to_step5(self):
         from step5_generate_metadata import Step5GenerateMetadata
         w = Step5GenerateMetadata(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
@@ -48,7 +48,7 @@ class StepPrepareStep6(QWidget):
         next_btn.setStyleSheet("background-color: #388E3C; color: white; font-weight: bold;")
 
         back_btn = QPushButton("⬅ Назад", clicked=lambda:
-            self.main_app.stack.setCurrentWidget(self.main_app.main_menu)
+            self.main_app.pages.home()
         )
         nav.addWidget(next_btn)
         nav.addWidget(back_btn)
@@ -57,5 +57,4 @@ class StepPrepareStep6(QWidget):
     def go_to_step6(self):
         from step6_prepare_harvest import Step6PrepareHarvest
         w = Step6PrepareHarvest(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
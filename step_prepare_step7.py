@@ -45,8 +45,7 @@ class StepPrepareStep7(QWidget):
         next_btn.setStyleSheet("background-color:#388E3C;color:white;font-weight:bold;")
         back_btn = QPushButton("⬅ Назад",
                                clicked=lambda:
-                               self.main_app.stack.setCurrentWidget(
-                                   self.main_app.main_menu))
+                               self.main_app.pages.home())
         nav.addWidget(next_btn)
         nav.addWidget(back_btn)
         root.addLayout(nav)
@@ -55,5 +54,4 @@ class StepPrepareStep7(QWidget):
     def go_to_step7(self):
         from step7_social_media import Step7SocialMedia
         w = Step7SocialMedia(self.main_app)
-        self.main_app.stack.addWidget(w)
-        self.main_app.stack.setCurrentWidget(w)
+        self.main_app.pages.show(w)
@@ -0,0 +1,128 @@
+# task_panel.py
+"""
+Панель фоновой задачи: прогресс-бар, последняя строка лога и «Отмена».
+Задача выполняется в QThreadPool, а лог/прогресс/результат приходят
+обратно в GUI-поток через сигналы — окно не «замерзает».
+"""
+import traceback
+from PyQt6.QtWidgets import (
+    QWidget, QHBoxLayout, QLabel, QProgressBar, QPushButton, QMessageBox
+)
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from util_task import TaskContext, TaskError, TaskCancelled
+
+
+class _Signals(QObject):
+    log       = pyqtSignal(str)
+    progress  = pyqtSignal(int, int)
+    done      = pyqtSignal(object)
+    failed    = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class _Runner(QRunnable):
+    def __init__(self, fn, args, ctx: TaskContext, sig: _Signals):
+        super().__init__()
+        self.fn, self.args, self.ctx, self.sig = fn, args, ctx, sig
+
+    def run(self):
+        try:
+            res = self.fn(self.ctx, *self.args)
+        except TaskCancelled:
+            self.sig.cancelled.emit(); return
+        except TaskError as e:
+            self.sig.failed.emit(str(e)); return
+        except Exception as e:
+            traceback.print_exc()
+            self.sig.failed.emit(f"{type(e).__name__}: {e}"); return
+        self.sig.done.emit(res)
+
+
+class TaskPanel(QWidget):
+    """
+    Встраивается в шаг под логом.
+      log          — куда дублировать строки лога (обычно self.log шага);
+      busy_widgets — что блокировать, пока задача идёт (run/next-кнопки).
+    """
+
+    def __init__(self, log=None, busy_widgets=(), parent=None):
+        super().__init__(parent)
+        self._log, self._busy_widgets = log, list(busy_widgets)
+        self._ctx: TaskContext | None = None
+        self._sig: _Signals | None = None
+        self._saved: list[tuple[QWidget, bool]] = []
+
+        lo = QHBoxLayout(self); lo.setContentsMargins(0, 0, 0, 0); lo.setSpacing(6)
+        self.bar = QProgressBar(textVisible=True)
+        self.status = QLabel()
+        self.cancel_btn = QPushButton("⛔ Отмена", clicked=self.cancel)
+        lo.addWidget(self.bar, 1); lo.addWidget(self.status, 2); lo.addWidget(self.cancel_btn)
+        self.hide()
+
+    # ───── API ─────
+    @property
+    def busy(self) -> bool:
+        return self._ctx is not None
+
+    def start(self, fn, *args, on_done=None, on_fail=None) -> bool:
+        """
+        Запускает fn(ctx, *args) в фоне.  on_done(result) / on_fail(msg)
+        вызываются в GUI-потоке.  False — если панель уже занята.
+        """
+        if self.busy:
+            return False
+        sig = _Signals(self)
+        sig.log.connect(self._on_log)
+        sig.progress.connect(self._on_progress)
+        sig.done.connect(lambda res: self._finish(on_done, res))
+        sig.failed.connect(lambda msg: self._fail(on_fail, msg))
+        sig.cancelled.connect(self._on_cancelled)
+
+        self._sig = sig
+        self._ctx = TaskContext(log=sig.log.emit, progress=sig.progress.emit)
+        self._saved = [(w, w.isEnabled()) for w in self._busy_widgets]
+        for w in self._busy_widgets: w.setEnabled(False)
+        self.bar.setRange(0, 0); self.status.clear()
+        self.cancel_btn.setEnabled(True); self.show()
+
+        QThreadPool.globalInstance().start(_Runner(fn, args, self._ctx, sig))
+        return True
+
+    def cancel(self):
+        if self._ctx:
+            self._ctx.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status.setText("Останавливаю…")
+
+    # ───── слоты ─────
+    def _on_log(self, msg: str):
+        self.status.setText(msg.splitlines()[-1] if msg.strip() else "")
+        if self._log: self._log(msg)
+
+    def _on_progress(self, done: int, total: int):
+        if total <= 0:
+            self.bar.setRange(0, 0)
+        else:
+            self.bar.setRange(0, total); self.bar.setValue(done)
+
+    def _reset(self):
+        if self._sig: self._sig.deleteLater()
+        self._ctx = self._sig = None
+        for w, was in self._saved: w.setEnabled(was)
+        self._saved = []
+        self.hide()
+
+    def _finish(self, cb, res):
+        self._reset()
+        if cb: cb(res)
+
+    def _fail(self, cb, msg: str):
+        self._reset()
+        if self._log: self._log(f"❌ {msg}")
+        if cb: cb(msg)
+        else:  QMessageBox.critical(self.window(), "Ошибка", msg)
+
+    def _on_cancelled(self):
+        self._reset()
+        if self._log: self._log("⛔ Остановлено пользователем.")
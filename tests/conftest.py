@@ -0,0 +1,4 @@
+# conftest.py — модули приложения лежат в корне репозитория
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
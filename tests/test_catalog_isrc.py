@@ -0,0 +1,50 @@
+# test_catalog_isrc.py — резервирование ISRC из нескольких процессов
+import multiprocessing as mp
+
+from util_catalog import ISRC_FIRST, ISRC_PREFIX, Catalog
+
+WORKERS = 4
+ROUNDS  = 5
+TRACKS  = 7
+
+
+def _reserve(path: str, worker: int, start, out):
+    start.wait()
+    codes = []
+    for r in range(ROUNDS):
+        titles = [f"w{worker} r{r} t{t}" for t in range(TRACKS)]
+        codes += Catalog(path).reserve_isrc(f"ALB{worker}{r}", titles)
+    out.put(codes)
+
+
+def test_reserve_isrc_concurrent(tmp_path):
+    path = str(tmp_path / "catalog.sqlite")
+    Catalog(path)                                    # схема создаётся до старта процессов
+
+    ctx   = mp.get_context("spawn")
+    start = ctx.Event()
+    out   = ctx.Queue()
+    procs = [ctx.Process(target=_reserve, args=(path, w, start, out)) for w in range(WORKERS)]
+    for p in procs:
+        p.start()
+    start.set()
+    batches = [out.get(timeout=120) for _ in procs]
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    codes = [c for b in batches for c in b]
+    total = WORKERS * ROUNDS * TRACKS
+    assert len(codes) == total
+    assert len(set(codes)) == total                  # ни одного повтора
+    serials = sorted(int(c[len(ISRC_PREFIX):]) for c in codes)
+    assert serials == list(range(ISRC_FIRST + 1, ISRC_FIRST + 1 + total))
+
+    for b in batches:                                # внутри одного вызова — подряд
+        for i in range(0, len(b), TRACKS):
+            block = [int(c[len(ISRC_PREFIX):]) for c in b[i:i + TRACKS]]
+            assert block == list(range(block[0], block[0] + TRACKS))
+
+    cat = Catalog(path)
+    assert cat.counts()["isrcs"] == total
+    assert cat.last_isrc() == f"{ISRC_PREFIX}{ISRC_FIRST + total:05d}"
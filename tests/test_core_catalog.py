@@ -0,0 +1,92 @@
+# test_core_catalog.py — инкрементальный импорт TOTAL METADATA = полный
+import json
+import sqlite3
+
+import openpyxl
+
+from core_catalog import IMPORT_COLUMNS, import_total
+from util_catalog import Catalog
+from util_task import TaskContext
+
+SHEET = "ALBUMS"
+
+
+def _row(track: int, first: str, last: str, ipi: str, publisher: str = "Imagine Music"):
+    row = dict.fromkeys(IMPORT_COLUMNS, "")
+    row.update({"ALBUM: Code": "IMG001", "ALBUM: Title": "Test", "TRACK: Number": str(track),
+                "TRACK: Title": f"Track {track}", "WRITER:1: First Name": first,
+                "WRITER:1: Last Name": last, "WRITER:1: IPI": ipi,
+                "WRITER:1: Original Publisher": publisher,
+                "PUBLISHER:1: Name": publisher, "PUBLISHER:1: IPI": ipi[:2],
+                "CODE: ISRC": f"RU-AD4-20-{2000 + track:05d}"})
+    return [row[c] for c in IMPORT_COLUMNS]
+
+
+def _save(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = SHEET
+    ws.append(IMPORT_COLUMNS)
+    for r in rows:
+        ws.append(r)
+    wb.save(path)
+
+
+def _import(folder, xlsx, full=False):
+    folder.mkdir(exist_ok=True)
+    db, cat = str(folder / "composer_database.json"), str(folder / "catalog.sqlite")
+    import_total(TaskContext(), str(xlsx), db, Catalog(cat), full=full)
+    with open(db, encoding="utf-8") as f:
+        data = json.load(f)
+    con = sqlite3.connect(cat)
+    try:
+        tables = {t: con.execute(f"SELECT * FROM {t} ORDER BY 1").fetchall()
+                  for t in ("writers", "publishers", "isrcs")}
+    finally:
+        con.close()
+    return data, tables
+
+
+def test_appended_duplicate_keeps_first_mention(tmp_path):
+    xlsx = tmp_path / "total.xlsx"
+    first = [_row(1, "Ann", "Lee", "111"), _row(2, "Bob", "Ray", "555")]
+    _save(xlsx, first)
+    _import(tmp_path / "inc", xlsx)
+
+    _save(xlsx, first + [_row(3, "Ann", "Lee", "222", "Other Pub"), _row(4, "Cy", "Moe", "777")])
+    inc = _import(tmp_path / "inc", xlsx)
+    full = _import(tmp_path / "full", xlsx, full=True)
+
+    assert inc == full
+    assert inc[0]["composers"]["Ann Lee"]["ipi"] == "111"
+    assert set(inc[0]["composers"]) == {"Ann Lee", "Bob Ray", "Cy Moe"}
+    assert set(inc[0]["publishers"]) == {"Imagine Music", "Other Pub"}
+
+
+def test_edit_mid_sheet_matches_full_import(tmp_path):
+    xlsx = tmp_path / "total.xlsx"
+    rows = [_row(1, "Ann", "Lee", "111"), _row(2, "Bob", "Ray", "555")]
+    _save(xlsx, rows)
+    _import(tmp_path / "inc", xlsx)
+
+    rows[0] = _row(1, "Ann", "Lee", "333")           # исправили IPI в старой строке
+    _save(xlsx, rows + [_row(3, "Ann", "Lee", "222")])
+    inc = _import(tmp_path / "inc", xlsx)
+    full = _import(tmp_path / "full", xlsx, full=True)
+
+    assert inc == full
+    assert inc[0]["composers"]["Ann Lee"]["ipi"] == "333"
+
+
+def test_log_counts_only_read_rows(tmp_path):
+    xlsx = tmp_path / "total.xlsx"
+    first = [_row(1, "Ann", "Lee", "111")]
+    _save(xlsx, first)
+    _import(tmp_path / "db", xlsx)
+
+    _save(xlsx, first + [[""] * len(IMPORT_COLUMNS), _row(3, "Cy", "Moe", "777")])
+    lines = []
+    import_total(TaskContext(log=lines.append), str(xlsx),
+                 str(tmp_path / "db" / "composer_database.json"),
+                 Catalog(str(tmp_path / "db" / "catalog.sqlite")))
+    assert any("строки 4–4, 1 строк" in line for line in lines), lines
@@ -0,0 +1,151 @@
+# test_util_audio.py — AIFF 24 bit → WAV без ffmpeg, побайтно
+import os
+import random
+import struct
+
+import pytest
+
+import util_audio
+from util_audio import (BLOCK_FRAMES, aiff_to_wav, is_pcm_24_48_be,
+                        read_aiff_header, read_wav_header, walk_mp3_frames)
+
+KSDATAFORMAT_PCM = bytes.fromhex("0100000000001000800000aa00389b71")
+
+
+def _ext80(rate: int) -> bytes:
+    exp = rate.bit_length() - 1
+    return struct.pack(">HQ", 16383 + exp, rate << (63 - exp))
+
+
+def _chunk(cid: bytes, body: bytes) -> bytes:
+    return cid + struct.pack(">I", len(body)) + body + b"\0" * (len(body) & 1)
+
+
+def _aiff(path, pcm: bytes, channels: int, bits: int = 24, rate: int = 48000,
+          aifc: bool = False, offset: int = 0):
+    frames = len(pcm) // (channels * bits // 8)
+    comm = struct.pack(">hIh", channels, frames, bits) + _ext80(rate)
+    if aifc:
+        comm += b"NONE" + b"\x0enot compressed\0"
+    chunks = [_chunk(b"COMM", comm),
+              _chunk(b"SSND", struct.pack(">II", offset, 0) + b"\0" * offset + pcm)]
+    if aifc:
+        chunks.insert(0, _chunk(b"FVER", struct.pack(">I", 0xA2805140)))
+    body = (b"AIFC" if aifc else b"AIFF") + b"".join(chunks)
+    with open(path, "wb") as f:
+        f.write(b"FORM" + struct.pack(">I", len(body)) + body)
+    return str(path)
+
+
+def _expected_wav(pcm_be: bytes, channels: int, rate: int = 48000) -> bytes:
+    data  = b"".join(pcm_be[i:i + 3][::-1] for i in range(0, len(pcm_be), 3))
+    align = channels * 3
+    fmt = (struct.pack("<HHIIHH", 0xFFFE, channels, rate, rate * align, align, 24)
+           + struct.pack("<HHI", 22, 24, {1: 0x4, 2: 0x3}[channels]) + KSDATAFORMAT_PCM)
+    pad = b"\0" * (len(data) & 1)
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"data" + struct.pack("<I", len(data)) + data + pad)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+@pytest.mark.parametrize("channels, frames, aifc, offset", [
+    (2, BLOCK_FRAMES + 123, False, 0),       # несколько блоков чтения
+    (2, 10, True, 4),                        # AIFC/NONE, смещение в SSND
+    (1, 5, False, 0),                        # нечётный размер данных → байт-заполнитель
+])
+def test_aiff_to_wav_bytes(tmp_path, channels, frames, aifc, offset):
+    rnd = random.Random(frames)
+    pcm = bytes(rnd.getrandbits(8) for _ in range(frames * channels * 3))
+    src = _aiff(tmp_path / "in.aif", pcm, channels, aifc=aifc, offset=offset)
+    dst = str(tmp_path / "out.wav")
+
+    info = read_aiff_header(src)
+    assert is_pcm_24_48_be(info)
+    assert info["frames"] == frames and info["data_size"] == len(pcm)
+
+    assert aiff_to_wav(src, dst, info)
+    with open(dst, "rb") as f:
+        assert f.read() == _expected_wav(pcm, channels)
+    assert not os.path.exists(dst + ".part")
+
+    wav = read_wav_header(dst)
+    assert (wav["channels"], wav["bit_depth"], wav["sample_rate"]) == (channels, 24, 48000)
+    assert wav["data_size"] == len(pcm)
+
+
+def test_aiff_to_wav_refuses_16_bit(tmp_path):
+    src = _aiff(tmp_path / "in.aif", b"\1\2" * 20, 2, bits=16)
+    dst = str(tmp_path / "out.wav")
+    assert not aiff_to_wav(src, dst)
+    assert not os.path.exists(dst)
+
+
+def test_aiff_to_wav_truncated_ssnd(tmp_path):
+    src = _aiff(tmp_path / "in.aif", bytes(range(60)), 2)
+    with open(src, "r+b") as f:                      # COMM обещает больше фреймов, чем есть
+        f.seek(0x14 + 2)
+        f.write(struct.pack(">I", 1000))
+    dst = str(tmp_path / "out.wav")
+    assert not aiff_to_wav(src, dst)                 # пусть конвертирует ffmpeg
+    assert not os.path.exists(dst)
+
+
+class _Trickle:
+    """Файл, который отдаёт не больше STEP байт за read() — как сетевой диск."""
+    STEP = 1000                                      # не кратно 3
+
+    def __init__(self, f):
+        self._f = f
+
+    def read(self, n=-1):
+        return self._f.read(self.STEP if n < 0 else min(n, self.STEP))
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+def test_aiff_to_wav_short_reads(tmp_path, monkeypatch):
+    pcm = bytes(random.Random(7).getrandbits(8) for _ in range(3000 * 2 * 3))
+    src = _aiff(tmp_path / "in.aif", pcm, 2)
+    dst = str(tmp_path / "out.wav")
+    real_open = open
+    monkeypatch.setattr(util_audio, "open",
+                        lambda p, mode="r", *a, **kw: _Trickle(real_open(p, mode, *a, **kw))
+                        if "r" in mode else real_open(p, mode, *a, **kw), raising=False)
+    assert aiff_to_wav(src, dst)
+    with real_open(dst, "rb") as f:
+        assert f.read() == _expected_wav(pcm, 2)
+
+
+def _mp3(path, frames: int, cut: int = 0, tag: bool = True):
+    """MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, стерео: фрейм 417 байт."""
+    frame = b"\xff\xfb\x90\x00" + b"\x55" * 413
+    data = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\0" * 10 + frame * frames
+    data = data[:len(data) - cut] if cut else data
+    with open(path, "wb") as f:
+        f.write(data + (b"TAG" + b"\0" * 125 if tag else b""))
+    return str(path)
+
+
+@pytest.mark.parametrize("frames, cut, tag", [(50, 0, True), (50, 100, False), (1, 0, False)])
+def test_walk_mp3_frames(tmp_path, frames, cut, tag):
+    path = _mp3(tmp_path / "a.mp3", frames, cut, tag)
+    info = walk_mp3_frames(path)
+    assert info["frames"] == frames
+    assert info["duration"] == pytest.approx(frames * 1152 / 44100)
+    assert info["complete"] == (not cut)
+    assert info["truncated"] == bool(cut)
+    with open(path, "rb") as f:                      # тот же обход по bytes
+        assert util_audio._walk_frames(f.read(), 20) == info
+
+
+def test_walk_mp3_frames_empty(tmp_path):
+    (tmp_path / "e.mp3").write_bytes(b"")
+    assert walk_mp3_frames(str(tmp_path / "e.mp3")) is None
+    assert walk_mp3_frames(str(tmp_path / "missing.mp3")) is None
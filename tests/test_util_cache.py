@@ -0,0 +1,52 @@
+# test_util_cache.py — audio_cache.json: сохранение и чистка
+import json
+import os
+
+from util_cache import AudioCache, file_hash
+
+
+def test_save_keeps_entries_and_load_prunes(tmp_path, monkeypatch):
+    a, b = tmp_path / "a.bin", tmp_path / "b.bin"
+    a.write_bytes(b"a" * 10)
+    b.write_bytes(b"b" * 20)
+    path = str(tmp_path / "db" / "audio_cache.json")
+
+    cache = AudioCache(path)
+    assert cache.content_hash(str(a)) == file_hash(str(a))
+    cache.content_hash(str(b))
+    b.unlink()
+
+    stats = []
+    real_exists = os.path.exists
+    monkeypatch.setattr(os.path, "exists", lambda p: stats.append(p) or real_exists(p))
+    assert cache.save()
+    monkeypatch.undo()
+    assert not any(p in cache.entries for p in stats)   # save() не проверяет записи по одной
+    with open(path, encoding="utf-8") as f:
+        assert set(json.load(f)) == {str(a), str(b)}
+
+    again = AudioCache(path)                         # исчезнувшее — выбрасывается при загрузке
+    assert set(again.entries) == {str(a)}
+    assert again.entries[str(a)]["hash"] == file_hash(str(a))
+    assert again.save()
+    with open(path, encoding="utf-8") as f:
+        assert set(json.load(f)) == {str(a)}
+
+
+def test_copy_hashed_records_source_hash(tmp_path, monkeypatch):
+    src, dst = tmp_path / "stem.wav", tmp_path / "copy.wav"
+    src.write_bytes(os.urandom(3 << 20))
+    os.utime(src, ns=(1_600_000_000_000_000_000,) * 2)
+    expected = file_hash(str(src))
+
+    cache = AudioCache(str(tmp_path / "audio_cache.json"))
+    cache.copy_hashed(str(src), str(dst))
+    assert dst.read_bytes() == src.read_bytes()
+    assert os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns
+
+    def no_reread(path):
+        raise AssertionError(f"повторное чтение {path}")
+    monkeypatch.setattr("util_cache.file_hash", no_reread)
+    assert cache.content_hash(str(src)) == expected
+    cache.copy_hashed(str(src), str(tmp_path / "again.wav"))   # хэш уже есть — обычная копия
+    assert (tmp_path / "again.wav").read_bytes() == src.read_bytes()
@@ -0,0 +1,97 @@
+# test_util_xlsx.py — дописывание строк в xlsx и чтение обратно
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import Font, PatternFill
+
+from util_xlsx import SheetReader, append_rows, sheet_names
+
+SHEET = "TOTAL"
+HEAD  = ["Track", "Album", "Duration", "Date"]
+BODY  = [
+    ["Night Drive", "A & B <Mix>", 120, datetime.datetime(2024, 5, 1)],
+    ["Night Drive", "Shared",      3.5, None],
+    ["Ёлка",        "Shared",      None, None],
+]
+
+
+def _book(path, trailing: int = 5):
+    """Книга как у Excel: общие строки + «пустые» строки с форматированием в конце."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = SHEET
+    for row in [HEAD, *BODY]:
+        ws.append(row)
+    ws["D2"].number_format = "yyyy-mm-dd"
+    fill = PatternFill("solid", fgColor="FFFF00")
+    for r in range(len(BODY) + 2, len(BODY) + 2 + trailing):
+        for c in range(1, len(HEAD) + 1):
+            ws.cell(r, c).fill = fill
+            ws.cell(r, c).font = Font(bold=True)
+    wb.create_sheet("Other")["A1"] = "keep"
+    wb.save(path)
+    return path
+
+
+def test_append_skips_formatted_empty_rows(tmp_path):
+    src, out = _book(str(tmp_path / "in.xlsx")), str(tmp_path / "out.xlsx")
+    new = [["Sunrise", "Dawn", "95", "2025"], ["Tab\tчасть", "x\x01y", "", "Ёж"]]
+
+    first = append_rows(src, SHEET, new, out)
+    last_real = 1 + len(BODY)
+    assert first == last_real + 2                    # одна пустая строка-разделитель
+
+    ws = openpyxl.load_workbook(out)[SHEET]
+    assert [c.value for c in ws[1]] == HEAD
+    assert ws["B2"].value == "A & B <Mix>" and ws["C2"].value == 120
+    assert ws["D2"].value == datetime.datetime(2024, 5, 1)
+    assert all(c.value is None for c in ws[last_real + 1])
+    assert [c.value for c in ws[first]] == new[0]
+    assert [c.value for c in ws[first + 1]] == ["Tab\tчасть", "xy", None, "Ёж"]
+    assert ws.max_row == first + 1                   # хвост форматирования убран
+    assert openpyxl.load_workbook(out)["Other"]["A1"].value == "keep"
+    assert sheet_names(out) == [SHEET, "Other"]
+
+
+def test_append_read_back_with_pandas(tmp_path):
+    src, out = _book(str(tmp_path / "in.xlsx")), str(tmp_path / "out.xlsx")
+    append_rows(src, SHEET, [["Sunrise", "Shared", "95", "2025"]], out, gap=0)
+
+    df = pd.read_excel(out, sheet_name=SHEET, dtype=str)
+    assert list(df.columns) == HEAD
+    assert len(df) == len(BODY) + 1
+    assert df.iloc[-1].tolist() == ["Sunrise", "Shared", "95", "2025"]
+    assert df.iloc[0]["Album"] == "A & B <Mix>"
+
+
+def test_append_twice_continues_after_last_row(tmp_path):
+    src = _book(str(tmp_path / "in.xlsx"))
+    mid, out = str(tmp_path / "mid.xlsx"), str(tmp_path / "out.xlsx")
+    first = append_rows(src, SHEET, [["one"]], mid)
+    assert append_rows(mid, SHEET, [["two"]], out) == first + 2
+
+
+def test_append_missing_sheet(tmp_path):
+    with pytest.raises(KeyError):
+        append_rows(_book(str(tmp_path / "in.xlsx")), "Nope", [["x"]], str(tmp_path / "o.xlsx"))
+
+
+def test_sheet_reader_matches_pandas(tmp_path):
+    src, out = _book(str(tmp_path / "in.xlsx")), str(tmp_path / "out.xlsx")
+    first = append_rows(src, SHEET, [["Sunrise", "Shared", "95", ""]], out)
+
+    reader = SheetReader(out, SHEET)
+    assert reader.last == first
+    rows = reader.rows(2)
+    assert sorted(rows) == [2, 3, 4, first]          # пустые строки пропущены
+
+    df = pd.read_excel(out, sheet_name=SHEET, dtype=str, header=None)
+    for r, values in rows.items():
+        expected = ["" if pd.isna(v) else v for v in df.iloc[r - 1].tolist()]
+        assert values[:len(expected)] == expected[:len(values)], r
+    assert rows[2][:3] == ["Night Drive", "A & B <Mix>", "120"]
+    assert rows[3][2] == "3.5"
+    assert rows[4][0] == "Ёлка"
+    assert reader.rows(first, first) == {first: ["Sunrise", "Shared", "95"]}
@@ -0,0 +1,363 @@
+# util_audio.py
+"""
+Чтение заголовков аудиофайлов без ffmpeg/ffprobe.
+probe_audio() — общая точка входа: AIFF/AIFC/WAV/MP3 разбираются сами,
+для остального вызывается ffprobe.
+
+AIFF / AIFC:  FORM <size> AIFF|AIFC, далее чанки  <id:4><size:4 BE><data>,
+выровненные по чётной границе.  Нас интересуют
+  • COMM — каналы, число фреймов, разрядность, частота (80-бит extended),
+           у AIFC ещё тип компрессии;
+  • SSND — смещение начала PCM-данных.
+"""
+import os, json, mmap, struct, subprocess
+
+
+# ──────────────────────────── helpers ────────────────────────────
+def _ext80_to_float(b: bytes) -> float:
+    """IEEE 754 80-bit extended (big-endian) → float."""
+    exp, mant = struct.unpack(">HQ", b)
+    sign = -1.0 if exp & 0x8000 else 1.0
+    exp &= 0x7FFF
+    if exp == 0 and mant == 0:
+        return 0.0
+    return sign * mant * 2.0 ** (exp - 16383 - 63)
+
+
+# ──────────────────────────── AIFF ────────────────────────────────
+def read_aiff_header(path: str) -> dict | None:
+    """
+    Разбирает AIFF/AIFC-заголовок.  Возвращает dict
+      format, channels, frames, bit_depth, sample_rate, compression,
+      data_offset (абсолютное смещение PCM), data_size (байт PCM в SSND)
+    или None, если файл не AIFF или заголовок битый.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if len(head) < 12 or head[:4] != b"FORM" or head[8:12] not in (b"AIFF", b"AIFC"):
+                return None
+            info = {"format": head[8:12].decode().lower(), "compression": "NONE"}
+            file_size = os.fstat(f.fileno()).st_size
+
+            while "channels" not in info or "data_offset" not in info:
+                ch = f.read(8)
+                if len(ch) < 8:
+                    break
+                cid, size = ch[:4], struct.unpack(">I", ch[4:])[0]
+                start = f.tell()
+
+                if cid == b"COMM":
+                    comm = f.read(min(size, 64))
+                    if len(comm) < 18:
+                        return None
+                    ch_n, frames, bits = struct.unpack(">hIh", comm[:8])
+                    info.update(channels=ch_n, frames=frames, bit_depth=bits,
+                                sample_rate=_ext80_to_float(comm[8:18]))
+                    if info["format"] == "aifc" and len(comm) >= 22:
+                        info["compression"] = comm[18:22].decode("latin-1")
+                elif cid == b"SSND":
+                    offset = struct.unpack(">I", f.read(8)[:4])[0]
+                    info["data_offset"] = start + 8 + offset
+                    info["data_size"]   = max(0, min(size, file_size - start) - 8 - offset)
+
+                f.seek(start + size + (size & 1))
+            if "channels" not in info:
+                return None
+            return info
+    except (OSError, struct.error):
+        return None
+
+
+def is_pcm_24_48_be(info: dict | None) -> bool:
+    """AIFF(C) без компрессии, 24 bit, 48 kHz — то, что ждёт DISCO/Harvest."""
+    return bool(info) and info["format"] in ("aiff", "aifc") \
+        and info.get("compression", "NONE") == "NONE" \
+        and info.get("bit_depth") == 24 and info.get("sample_rate") == 48000
+
+
+# ──────────────────────────── AIFF → WAV ─────────────────────────
+_KSDATAFORMAT_PCM = bytes.fromhex("0100000000001000800000aa00389b71")
+_CHANNEL_MASKS    = {1: 0x4, 2: 0x3}                  # как у ffmpeg: mono=FC, stereo=FL|FR
+BLOCK_FRAMES      = 1 << 16                           # фреймов за одно чтение
+
+
+def _wav_header(channels: int, rate: int, bits: int, data_size: int) -> bytes:
+    """RIFF/WAVE-заголовок с WAVE_FORMAT_EXTENSIBLE (ffmpeg пишет так же для >16 bit)."""
+    align = channels * bits // 8
+    fmt = struct.pack("<HHIIHHHHI16s", 0xFFFE, channels, rate, rate * align, align,
+                      bits, 22, bits, _CHANNEL_MASKS.get(channels, 0), _KSDATAFORMAT_PCM)
+    pad = data_size & 1
+    riff_size = 4 + (8 + len(fmt)) + (8 + data_size + pad)
+    return (b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"data" + struct.pack("<I", data_size))
+
+
+def aiff_to_wav(src: str, dst: str, info: dict | None = None) -> bool:
+    """
+    AIFF(C) PCM 24 bit → WAV PCM 24 bit без декодирования: переписываем
+    заголовок и разворачиваем порядок байт каждого 3-байтового сэмпла.
+    Данные идут блоками по BLOCK_FRAMES фреймов.  Частота не меняется —
+    вызывающий сам проверяет, что она подходит.  True при успехе.  Если
+    SSND короче, чем обещает COMM, — False: такой файл конвертирует
+    ffmpeg, звук молча не обрезается.
+    """
+    info = info or read_aiff_header(src)
+    if not info or info.get("compression", "NONE") != "NONE" \
+       or info.get("bit_depth") != 24 or "data_offset" not in info:
+        return False
+
+    frame = info["channels"] * 3
+    size  = info["frames"] * frame
+    if size > info["data_size"]:
+        return False
+    tmp   = dst + ".part"
+    try:
+        with open(src, "rb") as fi, open(tmp, "wb") as fo:
+            fo.write(_wav_header(info["channels"], int(info["sample_rate"]), 24, size))
+            fi.seek(info["data_offset"])
+            left = size
+            while left:
+                want = min(left, BLOCK_FRAMES * frame)     # кратно 3: блок из целых сэмплов
+                buf  = fi.read(want)
+                while len(buf) < want:                      # короткое чтение — дочитываем
+                    more = fi.read(want - len(buf))
+                    if not more:
+                        raise OSError("SSND обрезан")
+                    buf += more
+                out = bytearray(want)
+                out[0::3], out[1::3], out[2::3] = buf[2::3], buf[1::3], buf[0::3]
+                fo.write(out)
+                left -= want
+            if size & 1:
+                fo.write(b"\0")
+        os.replace(tmp, dst)
+        return True
+    except OSError as e:
+        print(f"AIFF→WAV error: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+# ──────────────────────────── WAV ─────────────────────────────────
+def read_wav_header(path: str) -> dict | None:
+    """RIFF/WAVE: fmt + data.  Поля — как у read_aiff_header (format="wav")."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+                return None
+            info = {"format": "wav"}
+            file_size = os.fstat(f.fileno()).st_size
+
+            while "channels" not in info or "data_offset" not in info:
+                ch = f.read(8)
+                if len(ch) < 8:
+                    break
+                cid, size = ch[:4], struct.unpack("<I", ch[4:])[0]
+                start = f.tell()
+
+                if cid == b"fmt ":
+                    fmt = f.read(min(size, 40))
+                    if len(fmt) < 16:
+                        return None
+                    tag, ch_n, rate, _, align, bits = struct.unpack("<HHIIHH", fmt[:16])
+                    info.update(tag=tag, channels=ch_n, sample_rate=float(rate),
+                                bit_depth=bits, block_align=align)
+                elif cid == b"data":
+                    info["data_offset"] = start
+                    info["data_size"]   = min(size, file_size - start)
+
+                f.seek(start + size + (size & 1))
+            if "channels" not in info:
+                return None
+            if info.get("block_align"):
+                info["frames"] = info.get("data_size", 0) // info["block_align"]
+            return info
+    except (OSError, struct.error):
+        return None
+
+
+# ──────────────────────────── MP3 ─────────────────────────────────
+_MP3_BITRATES = {                                     # kbit/s, индекс 1…14
+    (1, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+
+
+def parse_mp3_frame_header(h: bytes) -> dict | None:
+    """4 байта заголовка MPEG-фрейма → параметры фрейма или None."""
+    if len(h) < 4 or h[0] != 0xFF or (h[1] & 0xE0) != 0xE0:
+        return None
+    ver_bits, layer_bits = (h[1] >> 3) & 3, (h[1] >> 1) & 3
+    br_idx, sr_idx, pad  = h[2] >> 4, (h[2] >> 2) & 3, (h[2] >> 1) & 1
+    if ver_bits == 1 or layer_bits == 0 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    version = {3: 1, 2: 2, 0: 25}[ver_bits]
+    layer   = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][br_idx - 1] * 1000
+    rate    = _MP3_RATES[version][sr_idx]
+
+    if layer == 1:
+        spf, size = 384, (12 * bitrate // rate + pad) * 4
+    else:
+        spf  = 576 if (layer == 3 and version != 1) else 1152
+        size = spf // 8 * bitrate // rate + pad
+    return {"version": version, "layer": layer, "bitrate": bitrate,
+            "sample_rate": rate, "channels": 1 if (h[3] >> 6) == 3 else 2,
+            "samples": spf, "size": size}
+
+
+def mp3_audio_start(f) -> int:
+    """Смещение первого байта после ID3v2-тега (или 0)."""
+    f.seek(0)
+    id3 = f.read(10)
+    if len(id3) == 10 and id3[:3] == b"ID3":
+        size = (id3[6] << 21) | (id3[7] << 14) | (id3[8] << 7) | id3[9]
+        return 10 + size + (10 if id3[5] & 0x10 else 0)
+    return 0
+
+
+def read_mp3_header(path: str) -> dict | None:
+    """
+    MP3: первый фрейм + Xing/Info или VBRI (число фреймов),
+    иначе длительность оценивается как для CBR по размеру файла.
+    """
+    try:
+        with open(path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            start = mp3_audio_start(f)
+            f.seek(start)
+            buf = f.read(64 * 1024)
+            pos = next((i for i in range(len(buf) - 3)
+                        if buf[i] == 0xFF and parse_mp3_frame_header(buf[i:i+4])), None)
+            if pos is None:
+                return None
+            hdr = parse_mp3_frame_header(buf[pos:pos+4])
+            frame = buf[pos:pos + 200]
+
+            side = (32 if hdr["channels"] == 2 else 17) if hdr["version"] == 1 \
+                else (17 if hdr["channels"] == 2 else 9)
+            frames = None
+            x = frame[4 + side: 4 + side + 12]
+            if x[:4] in (b"Xing", b"Info") and len(x) == 12 and struct.unpack(">I", x[4:8])[0] & 1:
+                frames = struct.unpack(">I", x[8:12])[0]
+            elif frame[36:40] == b"VBRI" and len(frame) >= 54:
+                frames = struct.unpack(">I", frame[50:54])[0]
+
+            if frames:
+                duration = frames * hdr["samples"] / hdr["sample_rate"]
+            else:
+                f.seek(-128, os.SEEK_END)
+                tail = 128 if f.read(3) == b"TAG" else 0
+                audio = file_size - start - pos - tail
+                duration = audio * 8 / hdr["bitrate"]
+            return {"format": "mp3", "channels": hdr["channels"],
+                    "sample_rate": float(hdr["sample_rate"]), "bit_depth": None,
+                    "bitrate": hdr["bitrate"], "frames": frames,
+                    "data_offset": start + pos, "duration": duration}
+    except (OSError, struct.error):
+        return None
+
+
+def walk_mp3_frames(path: str) -> dict | None:
+    """
+    Проходит по всем MPEG-фреймам файла.  Файл отображается в память
+    (mmap), а не читается целиком: ОС подкачивает страницы по ходу обхода.
+    Возвращает
+      frames, duration (сек, без служебного Xing/Info-фрейма),
+      complete — поток дошёл до конца файла (до ID3v1/APE-тега),
+      truncated — последний фрейм обрезан,  end — где обход остановился;
+    None — в файле нет ни одного фрейма.
+    """
+    try:
+        with open(path, "rb") as f:
+            start = mp3_audio_start(f)
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _walk_frames(data, start)
+    except (OSError, ValueError):
+        return None
+
+
+def _walk_frames(data, start: int) -> dict | None:
+    """Обход walk_mp3_frames по байтам data (bytes или mmap)."""
+    end = len(data) - (128 if data[-128:-125] == b"TAG" else 0)
+
+    pos = next((i for i in range(start, min(end, start + 64 * 1024) - 3)
+                if data[i] == 0xFF and parse_mp3_frame_header(data[i:i+4])), None)
+    if pos is None:
+        return None
+    frames = samples = 0
+    rate, first = None, pos
+    while pos + 4 <= end:
+        hdr = parse_mp3_frame_header(data[pos:pos+4])
+        if not hdr or hdr["size"] < 4:
+            break
+        rate = rate or hdr["sample_rate"]
+        frames += 1; samples += hdr["samples"]
+        pos += hdr["size"]
+
+    # служебный первый фрейм Xing/Info/VBRI звука не содержит
+    hdr  = parse_mp3_frame_header(data[first:first+4])
+    side = (32 if hdr["channels"] == 2 else 17) if hdr["version"] == 1 \
+        else (17 if hdr["channels"] == 2 else 9)
+    if frames and (data[first + 4 + side: first + 8 + side] in (b"Xing", b"Info")
+                   or data[first + 36: first + 40] == b"VBRI"):
+        frames -= 1; samples -= hdr["samples"]
+
+    tail = data[pos:end]
+    complete = pos == end or tail[:8] == b"APETAGEX" or tail[:11] == b"LYRICSBEGIN"
+    return {"frames": frames, "duration": samples / rate if rate else 0.0,
+            "complete": complete, "truncated": pos > end, "end": min(pos, end)}
+
+
+# ──────────────────────────── общий probe ─────────────────────────
+def ffprobe_info(path: str) -> dict | None:
+    """Запасной вариант для неизвестных контейнеров — один вызов ffprobe."""
+    try:
+        r = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "format=format_name,duration:"
+                              "stream=sample_rate,channels,bits_per_raw_sample,bits_per_sample",
+             "-of", "json", path],
+            text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        data = json.loads(r.stdout or "{}")
+        fmt  = data.get("format", {})
+        st   = (data.get("streams") or [{}])[0]
+        bits = int(st.get("bits_per_raw_sample") or st.get("bits_per_sample") or 0) or None
+        return {"format": fmt.get("format_name", ""),
+                "duration": float(fmt["duration"]),
+                "sample_rate": float(st.get("sample_rate") or 0),
+                "bit_depth": bits, "channels": int(st.get("channels") or 0)}
+    except Exception:
+        return None
+
+
+def probe_audio(path: str) -> dict | None:
+    """
+    Формат, длительность (сек), частота, разрядность и число каналов.
+    Заголовок читается в процессе; ffprobe — только для незнакомых форматов.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".aif", ".aiff", ".aifc"):
+        info = read_aiff_header(path)
+    elif ext == ".wav":
+        info = read_wav_header(path)
+    elif ext == ".mp3":
+        info = read_mp3_header(path)
+    else:
+        info = None
+
+    if info and "duration" not in info and info.get("sample_rate"):
+        info["duration"] = info.get("frames", 0) / info["sample_rate"]
+    return info if info and info.get("duration") is not None else ffprobe_info(path)
@@ -0,0 +1,129 @@
+# util_cache.py
+"""
+Постоянный кэш сведений об аудиофайлах: _DATABASES/audio_cache.json.
+
+Ключ — абсолютный путь; запись действительна, пока совпадают размер и
+mtime файла.  Хранится результат probe_audio() и (по запросу) хэш
+содержимого.  Записи исчезнувших файлов выбрасываются при загрузке
+(и по prune()), а не при каждом сохранении — это stat на каждую запись.
+"""
+import os, shutil, hashlib, threading
+
+from util_audio import probe_audio
+from util_json import load_json_safe, write_json_atomic
+
+DATABASES_FOLDER = "_DATABASES"
+CACHE_FILE       = os.path.join(DATABASES_FOLDER, "audio_cache.json")
+HASH_CHUNK       = 1 << 20
+
+
+def file_hash(path: str) -> str:
+    """blake2b-160 содержимого файла (hex)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class AudioCache:
+    """Потокобезопасный кэш: probe() и content_hash() сначала смотрят сюда."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path    = path
+        self.entries: dict[str, dict] = load_json_safe(path, {})
+        self._lock   = threading.Lock()
+        self._dirty  = False
+        self.prune()
+
+    # ───── внутреннее ─────
+    def _entry(self, path: str) -> tuple[str, dict] | tuple[None, None]:
+        """(ключ, актуальная запись) — устаревшая запись заменяется пустой."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None
+        key = os.path.abspath(path)
+        with self._lock:
+            e = self.entries.get(key)
+            if not e or e.get("size") != st.st_size or e.get("mtime") != st.st_mtime_ns:
+                e = {"size": st.st_size, "mtime": st.st_mtime_ns}
+                self.entries[key] = e; self._dirty = True
+            return key, e
+
+    # ───── API ─────
+    def probe(self, path: str) -> dict | None:
+        """probe_audio() с кэшированием."""
+        key, e = self._entry(path)
+        if e is None:
+            return None
+        if "info" not in e:
+            info = probe_audio(path)
+            with self._lock:
+                e["info"] = info; self._dirty = True
+        return e["info"]
+
+    def content_hash(self, path: str) -> str | None:
+        """Хэш содержимого с кэшированием (считается только один раз)."""
+        key, e = self._entry(path)
+        if e is None:
+            return None
+        if "hash" not in e:
+            try:
+                digest = file_hash(path)
+            except OSError:
+                return None
+            with self._lock:
+                e["hash"] = digest; self._dirty = True
+        return e["hash"]
+
+    def copy_hashed(self, src: str, dst: str):
+        """
+        shutil.copy2(src, dst), заодно считая хэш src за то же чтение —
+        исходник из облачной папки не читается второй раз ради ключа
+        кэша конвертаций.  Ошибки (OSError) — как у copy2.
+        """
+        _, e = self._entry(src)
+        if e is None or "hash" in e:
+            shutil.copy2(src, dst)
+            return
+        h = hashlib.blake2b(digest_size=20)
+        with open(src, "rb") as fi, open(dst, "wb") as fo:
+            while chunk := fi.read(HASH_CHUNK):
+                h.update(chunk); fo.write(chunk)
+        shutil.copystat(src, dst)
+        st = os.stat(src)
+        if (st.st_size, st.st_mtime_ns) == (e["size"], e["mtime"]):   # не менялся, пока читали
+            with self._lock:
+                e["hash"] = h.hexdigest(); self._dirty = True
+
+    def prune(self) -> int:
+        """Удаляет записи файлов, которых больше нет.  Возвращает их число."""
+        with self._lock:
+            gone = [k for k in self.entries if not os.path.exists(k)]
+            for k in gone:
+                del self.entries[k]
+            self._dirty |= bool(gone)
+            return len(gone)
+
+    def save(self) -> bool:
+        """Сохраняет кэш (JSON без отступов, атомарная запись)."""
+        with self._lock:
+            if not self._dirty:
+                return True
+            try:
+                write_json_atomic(self.entries, self.path, indent=None)
+            except OSError:
+                return False
+            self._dirty = False
+            return True
+
+
+_cache: AudioCache | None = None
+
+def audio_cache() -> AudioCache:
+    """Общий экземпляр кэша (загружается при первом обращении)."""
+    global _cache
+    if _cache is None:
+        _cache = AudioCache()
+    return _cache
@@ -0,0 +1,373 @@
+# util_catalog.py
+"""
+Локальный каталог выпусков: _DATABASES/catalog.sqlite.
+
+Зеркало TOTAL METADATA — альбомы, треки, авторы (writers), издатели и
+ISRC — с индексами, чтобы Шаг 5 не загружал JSON-базы целиком:
+«следующий ISRC», «композитор по имени», «есть ли альбом» — это
+отдельные запросы.
+
+Каталог пополняется строками TOTAL METADATA (import_rows, «Настройки»)
+и строками нового альбома (add_rows, Шаг 5).  Повторный импорт ничего
+не дублирует: альбомы, треки, авторы и издатели обновляются (исправленный
+в TOTAL IPI или общество доходит до Шага 5), ISRC добавляются, только
+если их ещё нет.  Полный импорт (bulk_import(full=True)) заменяет
+авторов и издателей целиком — как и composer_database.json.
+
+ISRC выдаёт reserve_isrc(): счётчик «последний выданный номер» на
+префикс хранится в isrc_counters и сдвигается под BEGIN IMMEDIATE,
+поэтому два одновременных прогона (пакет, второй экземпляр программы)
+не получат один и тот же код.  Каждая выдача дописывается в
+isrc_journal — база целиком не переписывается.
+
+Соединение открывается на каждый вызов — каталог можно читать и писать
+из фоновых задач.  При первом открытии в него переносятся
+composer_database.json и isrc_database.json.
+"""
+import os, json, sqlite3
+from collections.abc import Mapping
+from typing import Iterable, Iterator
+
+from util_path import rsrc
+
+DATABASES_FOLDER = "_DATABASES"
+CATALOG_FILE     = os.path.join(DATABASES_FOLDER, "catalog.sqlite")
+COMPOSER_DB_FILE = os.path.join(DATABASES_FOLDER, "composer_database.json")
+ISRC_DB_FILE     = os.path.join(DATABASES_FOLDER, "isrc_database.json")
+
+ISRC_PREFIX      = "RU-AD4-20-"
+ISRC_FIRST       = 1000                  # «RU-AD4-20-01000», если кодов ещё нет
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS albums (
+    code         TEXT PRIMARY KEY,
+    title        TEXT NOT NULL DEFAULT '',
+    library      TEXT NOT NULL DEFAULT '',
+    release_date TEXT NOT NULL DEFAULT '',
+    styles       TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    album_code   TEXT NOT NULL,
+    number       TEXT NOT NULL,
+    title        TEXT NOT NULL DEFAULT '',
+    duration     TEXT NOT NULL DEFAULT '',
+    bpm          TEXT NOT NULL DEFAULT '',
+    composers    TEXT NOT NULL DEFAULT '',
+    audio_file   TEXT NOT NULL DEFAULT '',
+    isrc         TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (album_code, number)
+);
+CREATE INDEX IF NOT EXISTS tracks_isrc ON tracks (isrc);
+CREATE TABLE IF NOT EXISTS writers (
+    key           TEXT PRIMARY KEY,
+    first_name    TEXT NOT NULL DEFAULT '',
+    middle_name   TEXT NOT NULL DEFAULT '',
+    last_name     TEXT NOT NULL DEFAULT '',
+    capacity      TEXT NOT NULL DEFAULT '',
+    society       TEXT NOT NULL DEFAULT '',
+    ipi           TEXT NOT NULL DEFAULT '',
+    publisher_key TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS writers_name ON writers (last_name, first_name);
+CREATE TABLE IF NOT EXISTS publishers (
+    name          TEXT PRIMARY KEY,
+    society       TEXT NOT NULL DEFAULT '',
+    ipi           TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS isrcs (
+    code          TEXT PRIMARY KEY,
+    prefix        TEXT NOT NULL,
+    serial        INTEGER NOT NULL,
+    album_code    TEXT NOT NULL DEFAULT '',
+    album_title   TEXT NOT NULL DEFAULT '',
+    track_title   TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS isrcs_serial ON isrcs (prefix, serial);
+CREATE INDEX IF NOT EXISTS isrcs_album  ON isrcs (album_code);
+CREATE TABLE IF NOT EXISTS meta (
+    key           TEXT PRIMARY KEY,
+    value         TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS isrc_counters (
+    prefix        TEXT PRIMARY KEY,
+    last          INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS isrc_journal (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    at            TEXT NOT NULL DEFAULT (datetime('now')),
+    code          TEXT NOT NULL,
+    album_code    TEXT NOT NULL DEFAULT '',
+    track_title   TEXT NOT NULL DEFAULT ''
+);
+"""
+
+WRITER_FIELDS    = ("first_name", "middle_name", "last_name", "capacity",
+                    "society", "ipi", "publisher_key")
+
+# строка TOTAL главнее прежней записи; capacity в TOTAL не хранится — не трогаем
+UPSERT_WRITER    = ("INSERT INTO writers VALUES (?,?,?,?,?,?,?,?) ON CONFLICT(key) DO UPDATE "
+                    "SET first_name=excluded.first_name, middle_name=excluded.middle_name, "
+                    "last_name=excluded.last_name, society=excluded.society, "
+                    "ipi=excluded.ipi, publisher_key=excluded.publisher_key")
+UPSERT_PUBLISHER = ("INSERT INTO publishers VALUES (?,?,?) ON CONFLICT(name) DO UPDATE "
+                    "SET society=excluded.society, ipi=excluded.ipi")
+
+
+def _s(val) -> str:
+    """None / NaN / 'nan' → "" (как _clean в настройках)."""
+    if val is None or (isinstance(val, float) and val != val):
+        return ""
+    s = str(val).strip()
+    return "" if s.lower() == "nan" else s
+
+
+# ───────────────────── строка TOTAL METADATA → записи ─────────────────────
+def _writers(row: dict) -> Iterator[tuple]:
+    for i in (1, 2, 3):
+        fn = _s(row.get(f"WRITER:{i}: First Name"))
+        mn = _s(row.get(f"WRITER:{i}: Middle Name"))
+        ln = _s(row.get(f"WRITER:{i}: Last Name"))
+        if not (fn or ln):
+            continue
+        key = " ".join(p for p in (fn, mn, ln) if p)
+        yield (key, fn, mn, ln, "", _s(row.get(f"WRITER:{i}: Society")),
+               _s(row.get(f"WRITER:{i}: IPI")), _s(row.get(f"WRITER:{i}: Original Publisher")))
+
+def _isrc(code: str, album_code: str, album_title: str, track_title: str) -> tuple | None:
+    prefix, serial = code[:-5], code[-5:]
+    if not serial.isdigit():
+        return None
+    return (code, prefix, int(serial), album_code, album_title, track_title)
+
+
+class Catalog:
+    """Каталог в SQLite; по умолчанию — файл рядом с остальными базами."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or rsrc(CATALOG_FILE)
+        fresh = not os.path.exists(self.path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._run(lambda db: db.executescript(SCHEMA))
+        if fresh:
+            self._migrate_json(os.path.dirname(self.path))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _run(self, fn, *args):
+        """fn(db, *args) в одной транзакции; соединение закрывается."""
+        db = self._connect()
+        try:
+            with db:
+                return fn(db, *args)
+        finally:
+            db.close()
+
+    def _migrate_json(self, folder: str):
+        """Разовый перенос старых JSON-баз (одной транзакцией)."""
+        comp, codes = {}, {}
+        for name, dst in ((COMPOSER_DB_FILE, "comp"), (ISRC_DB_FILE, "isrc")):
+            p = os.path.join(folder, os.path.basename(name))
+            if os.path.exists(p):
+                with open(p, "r", encoding="utf-8") as f:
+                    if dst == "comp": comp  = json.load(f)
+                    else:             codes = json.load(f)
+
+        writers = [(k, *(_s(c.get(f, "")) for f in WRITER_FIELDS))
+                   for k, c in comp.get("composers", {}).items()]
+        pubs    = [(n, _s(p.get("publisher_society", "")), _s(p.get("publisher_ipi", "")))
+                   for n, p in comp.get("publishers", {}).items()]
+        isrcs   = [r for code, v in codes.items()
+                   if (r := _isrc(code, v.get("album_code", ""), v.get("album_title", ""),
+                                  v.get("track_title", "")))]
+        def _fill(db):
+            db.executemany("INSERT OR IGNORE INTO writers VALUES (?,?,?,?,?,?,?,?)", writers)
+            db.executemany("INSERT OR IGNORE INTO publishers VALUES (?,?,?)", pubs)
+            db.executemany("INSERT OR IGNORE INTO isrcs VALUES (?,?,?,?,?,?)", isrcs)
+        self._run(_fill)
+
+    # ───────────────────── наполнение ─────────────────────
+    def import_rows(self, rows: Iterable[dict]) -> int:
+        """
+        Строки TOTAL METADATA ({столбец: значение}) → каталог.
+        Возвращает число обработанных строк.
+        """
+        return self._run(self._import, rows)
+
+    def add_rows(self, rows: Iterable[dict]) -> int:
+        """Строки METADATA нового альбома (Шаг 5) — то же, что import_rows."""
+        return self.import_rows(rows)
+
+    @staticmethod
+    def _import(db: sqlite3.Connection, rows: Iterable[dict]) -> int:
+        n = 0
+        for row in rows:
+            n += 1
+            code = _s(row.get("ALBUM: Code"))
+            a_title, t_title = _s(row.get("ALBUM: Title")), _s(row.get("TRACK: Title"))
+            if code:
+                db.execute("INSERT INTO albums VALUES (?,?,?,?,?) ON CONFLICT(code) DO UPDATE "
+                           "SET title=excluded.title, library=excluded.library, "
+                           "release_date=excluded.release_date, styles=excluded.styles",
+                           (code, a_title, _s(row.get("LIBRARY: Name")),
+                            _s(row.get("ALBUM: Release Date")), _s(row.get("ALBUM: Styles"))))
+                if num := _s(row.get("TRACK: Number")):
+                    db.execute("INSERT OR REPLACE INTO tracks VALUES (?,?,?,?,?,?,?,?)",
+                               (code, num, t_title, _s(row.get("TRACK: Duration")),
+                                _s(row.get("TRACK: BPM")), _s(row.get("TRACK: Composer(s)")),
+                                _s(row.get("TRACK: Audio Filename")), _s(row.get("CODE: ISRC"))))
+            db.executemany(UPSERT_WRITER, list(_writers(row)))
+            if pub := _s(row.get("PUBLISHER:1: Name")):
+                db.execute(UPSERT_PUBLISHER,
+                           (pub, _s(row.get("PUBLISHER:1: Society")),
+                            _s(row.get("PUBLISHER:1: IPI"))))
+            if (isrc := _s(row.get("CODE: ISRC"))) and (rec := _isrc(isrc, code, a_title, t_title)):
+                db.execute("INSERT OR IGNORE INTO isrcs VALUES (?,?,?,?,?,?)", rec)
+        return n
+
+    def bulk_import(self, albums: list[tuple], tracks: list[tuple], writers: list[tuple],
+                    publishers: list[tuple], isrcs: list[tuple], full: bool = False):
+        """
+        Готовые кортежи в порядке столбцов таблиц — одной транзакцией
+        (импорт TOTAL METADATA из core_catalog).  Правила те же, что
+        у import_rows; full=True — авторы и издатели заменяются целиком.
+        """
+        def _fill(db):
+            if full:
+                db.execute("DELETE FROM writers")
+                db.execute("DELETE FROM publishers")
+            db.executemany("INSERT INTO albums VALUES (?,?,?,?,?) ON CONFLICT(code) DO UPDATE "
+                           "SET title=excluded.title, library=excluded.library, "
+                           "release_date=excluded.release_date, styles=excluded.styles", albums)
+            db.executemany("INSERT OR REPLACE INTO tracks VALUES (?,?,?,?,?,?,?,?)", tracks)
+            db.executemany(UPSERT_WRITER, writers)
+            db.executemany(UPSERT_PUBLISHER, publishers)
+            db.executemany("INSERT OR IGNORE INTO isrcs VALUES (?,?,?,?,?,?)", isrcs)
+        self._run(_fill)
+
+    def upsert_writer(self, key: str, info: dict, replace: bool = True):
+        """Композитор из окна «Добавить» / старой JSON-базы."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        vals = (key, *(_s(info.get(f, "")) for f in WRITER_FIELDS))
+        self._run(lambda db: db.execute(f"{verb} INTO writers VALUES (?,?,?,?,?,?,?,?)", vals))
+
+    def remove_writer(self, key: str):
+        self._run(lambda db: db.execute("DELETE FROM writers WHERE key = ?", (key,)))
+
+    def upsert_publisher(self, name: str, society: str = "", ipi: str = ""):
+        self._run(lambda db: db.execute("INSERT OR IGNORE INTO publishers VALUES (?,?,?)",
+                                        (name, _s(society), _s(ipi))))
+
+    def set_meta(self, key: str, value):
+        """Служебное значение (JSON) — например, отпечатки листов импорта."""
+        self._run(lambda db: db.execute("INSERT OR REPLACE INTO meta VALUES (?,?)",
+                                        (key, json.dumps(value, ensure_ascii=False))))
+
+    # ───────────────────── запросы ─────────────────────
+    def get_meta(self, key: str, default=None):
+        row = self._run(lambda db: db.execute("SELECT value FROM meta WHERE key = ?",
+                                              (key,)).fetchone())
+        return json.loads(row[0]) if row else default
+
+    def album_exists(self, code: str) -> bool:
+        return self._run(lambda db: db.execute(
+            "SELECT 1 FROM albums WHERE code = ?", (code,)).fetchone() is not None)
+
+    @staticmethod
+    def _high_water(db: sqlite3.Connection, prefix: str) -> int:
+        """Последний выданный номер: счётчик или импортированные коды — что больше."""
+        cnt = db.execute("SELECT last FROM isrc_counters WHERE prefix = ?", (prefix,)).fetchone()
+        mx  = db.execute("SELECT MAX(serial) FROM isrcs WHERE prefix = ?", (prefix,)).fetchone()
+        return max((v for v in (cnt and cnt[0], mx[0]) if v is not None), default=ISRC_FIRST)
+
+    def last_isrc(self, prefix: str = ISRC_PREFIX) -> str:
+        return f"{prefix}{self._run(self._high_water, prefix):05d}"
+
+    def next_isrc(self, n: int, prefix: str = ISRC_PREFIX) -> list[str]:
+        """n следующих кодов — только посмотреть, без резервирования."""
+        last = self._run(self._high_water, prefix)
+        return [f"{prefix}{last+i+1:05d}" for i in range(n)]
+
+    def reserve_isrc(self, album_code: str, track_titles: list[str], album_title: str = "",
+                     prefix: str = ISRC_PREFIX) -> list[str]:
+        """
+        Выдаёт по коду на каждый трек.  Блок резервируется атомарно
+        (BEGIN IMMEDIATE); выданные коды сразу попадают в isrcs и журнал.
+        """
+        n = len(track_titles)
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                last  = self._high_water(db, prefix)
+                codes = [f"{prefix}{last+i+1:05d}" for i in range(n)]
+                db.execute("INSERT INTO isrc_counters VALUES (?,?) ON CONFLICT(prefix) "
+                           "DO UPDATE SET last = excluded.last", (prefix, last + n))
+                db.executemany("INSERT OR IGNORE INTO isrcs VALUES (?,?,?,?,?,?)",
+                               [(c, prefix, last+i+1, album_code, album_title, t)
+                                for i, (c, t) in enumerate(zip(codes, track_titles))])
+                db.executemany("INSERT INTO isrc_journal (code, album_code, track_title) "
+                               "VALUES (?,?,?)", list(zip(codes, [album_code]*n, track_titles)))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK"); raise
+        finally:
+            db.close()
+        return codes
+
+    def composer(self, key: str) -> dict | None:
+        """Запись композитора в формате composer_database.json."""
+        row = self._run(lambda db: db.execute(
+            "SELECT * FROM writers WHERE key = ?", (key,)).fetchone())
+        if row is None:
+            return None
+        return {f: row[f] for f in WRITER_FIELDS if f != "capacity" or row[f]}
+
+    def publisher(self, name: str) -> dict | None:
+        row = self._run(lambda db: db.execute(
+            "SELECT * FROM publishers WHERE name = ?", (name,)).fetchone())
+        if row is None:
+            return None
+        return {"publisher_name": row["name"], "publisher_society": row["society"],
+                "publisher_ipi": row["ipi"]}
+
+    def composers(self) -> "CatalogView":
+        """{ключ: композитор} с выборкой по ключу по мере обращения."""
+        return CatalogView(self.composer, lambda: self._keys("writers", "key"))
+
+    def publishers(self) -> "CatalogView":
+        return CatalogView(self.publisher, lambda: self._keys("publishers", "name"))
+
+    def _keys(self, table: str, col: str) -> list[str]:
+        return self._run(lambda db: [r[0] for r in db.execute(f"SELECT {col} FROM {table}")])
+
+    def counts(self) -> dict[str, int]:
+        tables = ("albums", "tracks", "writers", "publishers", "isrcs")
+        return self._run(lambda db: {t: db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                                     for t in tables})
+
+
+class CatalogView(Mapping):
+    """
+    Словарь «только для чтения» поверх запроса по ключу: build_wp() и
+    прочий код, привыкший к composers.get(имя), работают без изменений.
+    """
+
+    def __init__(self, lookup, keys):
+        self._lookup, self._keys = lookup, keys
+        self._seen: dict = {}
+
+    def __getitem__(self, key):
+        if key not in self._seen:
+            self._seen[key] = self._lookup(key)
+        if self._seen[key] is None:
+            raise KeyError(key)
+        return self._seen[key]
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
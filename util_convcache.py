@@ -0,0 +1,179 @@
+# util_convcache.py
+"""
+Кэш конвертаций, общий для всех альбомов.
+
+Ключ — хэш содержимого исходника (util_cache, считается один раз на
+файл) плюс целевой формат, так что один и тот же стем в переиздании,
+альтернативной версии или при повторе Шага 2 не перекодируется заново:
+результат берётся из кэша копией (reflink, где ФС умеет).
+
+Кэш лежит на локальном диске (не в Dropbox) и ограничен по размеру:
+при переполнении удаляются давно не использованные файлы (LRU по mtime —
+при каждом попадании mtime файла обновляется).
+
+config.json:  "CONVERT CACHE DIR" — папка кэша (по умолчанию в кэше
+пользователя),  "CONVERT CACHE GB" — предел размера (0 — кэш выключен).
+"""
+import os, hashlib, threading
+from typing import Callable
+
+from util_cache import audio_cache
+from util_convert import clone_or_copy
+from util_json import load_json_safe
+from util_path import rsrc, user_cache_dir
+
+CONFIG_FILE   = "config.json"
+CACHE_DIR_KEY = "CONVERT CACHE DIR"
+CACHE_GB_KEY  = "CONVERT CACHE GB"
+DEFAULT_GB    = 20
+PART_SUFFIX   = ".part"             # файл ещё пишется — не считается и не вытесняется
+
+
+class ConversionCache:
+    """Файлы-результаты по ключу «содержимое исходника + формат»."""
+
+    def __init__(self, folder: str, limit_bytes: int):
+        self.folder = folder
+        self.limit  = max(0, int(limit_bytes))
+        self._lock  = threading.Lock()
+        self._size: int | None = None           # считается при первой записи
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    # ───── ключи ─────
+    def key(self, src: str, fmt: str) -> str | None:
+        """Ключ для src в формате fmt (None — исходник не прочитать)."""
+        digest = audio_cache().content_hash(src)
+        if not digest:
+            return None
+        return hashlib.blake2b(f"{digest}|{fmt}".encode(), digest_size=20).hexdigest()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.folder, key[:2], key + ext)
+
+    # ───── чтение / запись ─────
+    def fetch(self, key: str, dst: str) -> bool:
+        """Копирует результат из кэша в dst.  False — промах."""
+        path = self._path(key, os.path.splitext(dst)[1])
+        if not os.path.isfile(path):
+            return False
+        try:
+            os.utime(path)                          # отметка «недавно нужен»
+        except OSError:
+            pass
+        return clone_or_copy(path, dst)
+
+    def store(self, key: str, src_file: str):
+        """Кладёт готовый результат в кэш (ошибки диска не мешают шагу)."""
+        path = self._path(key, os.path.splitext(src_file)[1])
+        tmp  = f"{path}.{threading.get_ident()}{PART_SUFFIX}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not clone_or_copy(src_file, tmp):
+                return
+            os.replace(tmp, path)
+            added = os.path.getsize(path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(sz for _, sz, _ in self._files())
+            else:
+                self._size += added
+            if self._size > self.limit:
+                self._evict()
+
+    # ───── вытеснение ─────
+    def _files(self) -> list[tuple[float, int, str]]:
+        """[(mtime, размер, путь)] готовых файлов кэша (без чужих .part в записи)."""
+        out = []
+        for root, _, files in os.walk(self.folder):
+            for fn in files:
+                if fn.endswith(PART_SUFFIX):
+                    continue
+                p = os.path.join(root, fn)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def _evict(self):
+        """Удаляет самые давние файлы, пока кэш не станет ≤ 90 % предела."""
+        files = sorted(self._files())
+        total = sum(sz for _, sz, _ in files)
+        target = self.limit * 9 // 10
+        for _, sz, p in files:
+            if total <= target:
+                break
+            try:
+                os.remove(p); total -= sz
+            except OSError:
+                pass
+        self._size = total
+
+    def clear(self) -> int:
+        """Очищает кэш.  Возвращает освобождённый объём в байтах."""
+        with self._lock:
+            freed = 0
+            for _, sz, p in self._files():
+                try:
+                    os.remove(p); freed += sz
+                except OSError:
+                    pass
+            self._size = 0
+            return freed
+
+
+def cached_convert(src: str, dst: str, fmt: str,
+                   convert: Callable[[str, str], bool], key_src: str | None = None) -> str:
+    """
+    convert(src, dst) с кэшем: "cache" — результат взят из кэша,
+    "ffmpeg" — сконвертирован (и положен в кэш), "" — ошибка.
+    key_src — исходный файл для ключа, если src — его копия в черновой
+    папке (её путь каждый раз новый, и хэш считался бы заново).
+    """
+    cache = conversion_cache()
+    key   = cache.key(key_src or src, fmt) if cache.enabled else None
+    if key and cache.fetch(key, dst):
+        return "cache"
+    if not convert(src, dst):
+        return ""
+    if key:
+        cache.store(key, dst)
+    return "ffmpeg"
+
+
+# ───── общий экземпляр ─────
+_cache: ConversionCache | None = None
+_cache_lock = threading.Lock()
+
+def cache_settings(cfg: dict) -> tuple[str, float]:
+    """(папка, предел в ГБ) из config.json."""
+    folder = cfg.get(CACHE_DIR_KEY) or user_cache_dir("conversions")
+    try:
+        gb = float(cfg.get(CACHE_GB_KEY, DEFAULT_GB))
+    except (TypeError, ValueError):
+        gb = DEFAULT_GB
+    return folder, max(0.0, gb)
+
+
+def conversion_cache(cfg: dict | None = None) -> ConversionCache:
+    """
+    Общий кэш.  cfg (по умолчанию config.json приложения) задаёт папку и
+    предел; экземпляр пересоздаётся, только если они изменились.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None or cfg is not None:
+            folder, gb = cache_settings(cfg if cfg is not None
+                                        else load_json_safe(rsrc(CONFIG_FILE), {}))
+            limit = int(gb * (1 << 30))
+            if _cache is None or (_cache.folder, _cache.limit) != (folder, limit):
+                _cache = ConversionCache(folder, limit)
+        return _cache
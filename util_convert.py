@@ -0,0 +1,138 @@
+# util_convert.py
+"""
+Конвертация аудио через ffmpeg и планировщик параллельных задач.
+
+Каждая конвертация — отдельный процесс ffmpeg, поэтому пул потоков здесь
+фактически управляет N одновременно работающими процессами-воркерами.
+Когда альбомы обрабатываются пачкой, conversion_slot() держит общий
+лимит конвертаций на весь процесс, сколько бы альбомов ни шло сразу.
+"""
+import os, sys, shutil, subprocess, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable
+
+WORKERS_KEY     = "CONVERT WORKERS"                 # ключ в config.json
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+MAX_WORKERS     = max(1, os.cpu_count() or 1)
+
+
+def workers_from_config(cfg: dict) -> int:
+    """Число параллельных конвертаций из config.json (1 … MAX_WORKERS)."""
+    try:
+        n = int(cfg.get(WORKERS_KEY, DEFAULT_WORKERS))
+    except (TypeError, ValueError):
+        n = DEFAULT_WORKERS
+    return max(1, min(n, MAX_WORKERS))
+
+
+# ───── общий лимит конвертаций (пакетная очередь) ─────
+_slots: threading.BoundedSemaphore | None = None
+
+def set_global_workers(n: int | None):
+    """Лимит одновременных конвертаций на весь процесс (None — без лимита)."""
+    global _slots
+    _slots = threading.BoundedSemaphore(max(1, n)) if n else None
+
+
+@contextmanager
+def conversion_slot():
+    """Занимает место в общем лимите на время одной конвертации."""
+    slots = _slots
+    if slots is None:
+        yield; return
+    with slots:
+        yield
+
+
+def ffmpeg_convert(src: str, dst: str, codec: str, rate: int = 48000) -> bool:
+    """ffmpeg src → dst с нужным PCM-кодеком и частотой. True при успехе."""
+    try:
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-i", src,
+             "-c:a", codec, "-ar", str(rate), dst],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ); return True
+    except Exception as e:
+        print(f"FFmpeg error: {e}"); return False
+
+
+def run_parallel(jobs: list[tuple], fn: Callable[..., Any], workers: int,
+                 on_done: Callable[[int, tuple, Any], None] | None = None,
+                 should_stop: Callable[[], bool] | None = None) -> list:
+    """
+    Выполняет fn(*job) для каждого job на пуле из `workers` потоков.
+    • on_done(index, job, result) вызывается в вызывающем потоке сразу
+      по завершении очередной задачи — удобно для лога «в реальном времени».
+    • should_stop() == True → ещё не начатые задачи снимаются (результат None).
+    • Возвращает результаты в исходном порядке jobs.
+    • Исключение внутри fn превращается в результат False.
+    """
+    results: list = [None] * len(jobs)
+    if not jobs:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fn, *job): i for i, job in enumerate(jobs)}
+        for fut in as_completed(futures):
+            if should_stop and should_stop():
+                for f in futures: f.cancel()
+            if fut.cancelled():
+                continue
+            i = futures[fut]
+            try:
+                results[i] = fut.result()
+            except Exception as e:
+                print(f"Worker error: {e}"); results[i] = False
+            if on_done:
+                on_done(i, jobs[i], results[i])
+    return results
+
+
+_FICLONE = 0x40049409                               # ioctl Linux (btrfs, xfs)
+
+def _reflink(src: str, dst: str) -> bool:
+    """Копия без копирования данных (clonefile на APFS, FICLONE на Linux)."""
+    try:
+        if sys.platform == "darwin":
+            import ctypes
+            libc = ctypes.CDLL("libc.dylib", use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+        if sys.platform.startswith("linux"):
+            import fcntl
+            with open(src, "rb") as fi, open(dst, "wb") as fo:
+                fcntl.ioctl(fo.fileno(), _FICLONE, fi.fileno())
+            return True
+    except (OSError, AttributeError):
+        if os.path.exists(dst):
+            os.remove(dst)
+    return False
+
+
+def clone_or_copy(src: str, dst: str) -> bool:
+    """
+    Независимая копия src → dst: reflink, если ФС умеет, иначе обычная.
+    В отличие от link_or_copy правка одного файла не задевает другой.
+    """
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if not _reflink(src, dst):
+            shutil.copyfile(src, dst)
+        return True
+    except OSError as e:
+        print(f"Copy error: {e}"); return False
+
+
+def link_or_copy(src: str, dst: str) -> bool:
+    """Жёсткая ссылка src → dst, а если ФС не позволяет — обычная копия."""
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+        return True
+    except OSError as e:
+        print(f"Copy error: {e}"); return False
@@ -1,5 +1,5 @@
 # util_json.py
-import json, os
+import json, os, tempfile
 from typing import Any
 
 def load_json_safe(path: str, default: Any = None) -> Any:
@@ -19,15 +19,37 @@ def load_json_safe(path: str, default: Any = None) -> Any:
         return default
 
 
+def write_json_atomic(obj: Any, path: str, indent: int | None = 4) -> str:
+    """
+    Атомарная запись JSON: временный файл рядом → fsync → os.replace.
+    При сбое на диске остаётся либо старый файл, либо новый целиком.
+    Возвращает записанный текст; ошибки диска (OSError) не гасит.
+    """
+    text = json.dumps(obj, indent=indent, ensure_ascii=False)
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush(); os.fsync(f.fileno())
+        # mkstemp создаёт файл 0600 — оставляем права прежнего файла
+        os.chmod(tmp, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    return text
+
+
 def dump_json_safe(obj: Any, path: str) -> bool:
     """
-    Записывает obj в JSON.  Возвращает True, если удалось сохранить, иначе False.
-    Ошибка гасится, чтобы приложение не падало при проблемах с диском.
+    Записывает obj в JSON (атомарно).  Возвращает True, если удалось сохранить,
+    иначе False.  Ошибка гасится, чтобы приложение не падало при проблемах с диском.
     """
     try:
-        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(obj, f, indent=4, ensure_ascii=False)
+        write_json_atomic(obj, path)
         return True
     except OSError:
         return False
@@ -0,0 +1,102 @@
+# util_manifest.py
+"""
+Манифесты шагов: что уже сделано и из чего.
+
+Для каждого выходного файла шага хранится отпечаток исходника
+(размер + mtime), отпечаток результата и статус.  Повторный запуск
+после сбоя (ошибка ffmpeg, блокировка Dropbox, кончилось место)
+пропускает файлы, которые готовы и не устарели, и переделывает только
+недостающие: пропал результат, сменился исходник, запись осталась
+«pending» — значит, файл мог быть дописан не до конца.
+
+Файлы: _DATABASES/manifests/<IMG123 Альбом> step<N>.json.
+"""
+import os, time, threading
+
+from util_json import load_json_safe, write_json_atomic
+
+DATABASES_FOLDER = "_DATABASES"
+MANIFEST_FOLDER  = os.path.join(DATABASES_FOLDER, "manifests")
+SAVE_INTERVAL    = 1.0          # сек. — промежуточные сохранения не чаще
+
+
+def fingerprint(path: str) -> list[int] | None:
+    """[размер, mtime_ns] файла или None, если его нет."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def manifest_path(session: dict, step: int) -> str:
+    album = f"{session.get('album_code', 'IMG000')} {session.get('album_name', 'Unknown')}"
+    return os.path.join(MANIFEST_FOLDER, f"{album} step{step}.json")
+
+
+class Manifest:
+    """Потокобезопасный журнал выходных файлов одного шага."""
+
+    def __init__(self, path: str):
+        self.path    = path
+        self.entries: dict[str, dict] = load_json_safe(path, {}).get("files", {})
+        self._lock   = threading.Lock()
+        self._saved  = 0.0
+
+    @staticmethod
+    def _key(dst: str) -> str:
+        return os.path.abspath(dst)
+
+    # ───── проверка ─────
+    def is_done(self, dst: str, src: str | None = None) -> bool:
+        """dst готов: статус done, исходник и сам файл не менялись с тех пор."""
+        with self._lock:
+            e = self.entries.get(self._key(dst))
+        if not e or e.get("status") != "done":
+            return False
+        if src is not None and (e.get("src") != os.path.abspath(src)
+                                or e.get("src_fp") != fingerprint(src)):
+            return False
+        return e.get("dst_fp") == fingerprint(dst)
+
+    def done_files(self) -> set[str]:
+        with self._lock:
+            return {k for k, e in self.entries.items() if e.get("status") == "done"}
+
+    # ───── отметки ─────
+    def start(self, dst: str, src: str | None = None):
+        """Файл начали делать — до done() он считается недоделанным."""
+        self._set(dst, {"status": "pending", "src": src and os.path.abspath(src)})
+
+    def done(self, dst: str, src: str | None = None, **extra):
+        self._set(dst, {"status": "done", "src": src and os.path.abspath(src),
+                        "src_fp": fingerprint(src) if src else None,
+                        "dst_fp": fingerprint(dst), **extra})
+
+    def failed(self, dst: str, error: str = ""):
+        self._set(dst, {"status": "failed", "error": error})
+
+    def forget(self, keep: set[str]):
+        """Оставляет записи только для файлов из keep."""
+        keep = {self._key(p) for p in keep}
+        with self._lock:
+            self.entries = {k: e for k, e in self.entries.items() if k in keep}
+
+    def _set(self, dst: str, entry: dict):
+        with self._lock:
+            self.entries[self._key(dst)] = entry
+            due = time.monotonic() - self._saved >= SAVE_INTERVAL
+        if due:
+            self.save()
+
+    # ───── запись ─────
+    def save(self) -> bool:
+        """Атомарно сохраняет манифест.  False — ошибка диска."""
+        with self._lock:
+            data = {"saved": time.strftime("%Y-%m-%d %H:%M:%S"), "files": dict(self.entries)}
+            self._saved = time.monotonic()
+            try:
+                write_json_atomic(data, self.path, indent=1)
+                return True
+            except OSError:
+                return False
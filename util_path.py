@@ -8,3 +8,16 @@ def rsrc(rel_path: str) -> str:
     else:
         base = os.path.abspath(os.path.dirname(__file__))
     return os.path.join(base, rel_path)
+
+
+def user_cache_dir(*parts: str) -> str:
+    """Локальная папка кэша пользователя (не в Dropbox):
+    ~/Library/Caches/ImagineMusic на macOS, %LOCALAPPDATA% на Windows,
+    $XDG_CACHE_HOME или ~/.cache в остальных системах."""
+    if sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    elif os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "ImagineMusic", *parts)
@@ -0,0 +1,66 @@
+# util_scan.py
+"""
+Один проход по дереву папок через os.scandir.
+
+На CloudStorage (Dropbox/File Provider) каждый листинг каталога дорогой,
+поэтому дерево альбома читается один раз, а дальше сопоставление идёт
+по индексу в памяти.
+"""
+import os
+from typing import Callable
+
+
+def walk_files(root: str, skip_dirs: tuple[str, ...] = (),
+               keep: Callable[[str], bool] | None = None) -> list[tuple[str, str]]:
+    """
+    Все файлы под root как [(папка, имя)] в порядке os.walk (top-down).
+    skip_dirs — имена подпапок, которые не обходим; keep(имя) — фильтр файлов.
+    """
+    out: list[tuple[str, str]] = []
+    stack = [root]
+    while stack:
+        cur = stack.pop()
+        try:
+            with os.scandir(cur) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        subdirs = []
+        for e in entries:
+            try:
+                if e.is_dir():                       # как os.walk: по ссылкам не ходим
+                    if e.name not in skip_dirs and not e.is_symlink():
+                        subdirs.append(e.path)
+                elif keep is None or keep(e.name):
+                    out.append((cur, e.name))
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+    return out
+
+
+def index_top_folders(root: str, skip_dirs: tuple[str, ...] = (),
+                      keep: Callable[[str], bool] | None = None,
+                      want: Callable[[str], bool] | None = None) -> dict[str, list[tuple[str, str]]]:
+    """
+    {имя верхнего элемента root: [(папка, файл), …]} за один обход.
+    Файлы в самом root попадают под своё имя с пустым списком —
+    так же, как os.walk по файлу не даёт ничего.
+    want(имя) — какие верхние элементы нужны: остальные (_MASTERED,
+    обложки, видео) не попадают в индекс и не обходятся вовсе.
+    """
+    index: dict[str, list[tuple[str, str]]] = {}
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return index
+    for e in entries:
+        if want is not None and not want(e.name):
+            continue
+        try:
+            is_dir = e.is_dir()
+        except OSError:
+            is_dir = False
+        index[e.name] = walk_files(e.path, skip_dirs, keep) if is_dir else []
+    return index
@@ -0,0 +1,127 @@
+# util_scratch.py
+"""
+Локальная «черновая» папка для конвертаций (режим staging).
+
+Рабочие папки живут в синхронизируемом CloudStorage (Dropbox через File
+Provider): каждое чтение ffmpeg подкачивает файл по требованию, каждая
+запись тут же уходит на выгрузку.  В режиме staging исходники пачкой
+копируются в локальную папку, конвертация идёт там, а готовые файлы
+одним заходом переносятся в синхронизируемые папки.
+
+Пачки ограничены размером черновой папки: исходник + результат
+оцениваются как STAGE_FACTOR × размер исходника.
+
+config.json:  "SCRATCH STAGING" — включено,  "SCRATCH DIR" — корень
+(по умолчанию в кэше пользователя),  "SCRATCH GB" — предел размера.
+"""
+import os, shutil, tempfile
+from typing import Any, Callable, Iterator
+
+from util_cache import audio_cache
+from util_convert import run_parallel
+from util_path import user_cache_dir
+
+STAGING_KEY  = "SCRATCH STAGING"
+DIR_KEY      = "SCRATCH DIR"
+GB_KEY       = "SCRATCH GB"
+DEFAULT_GB   = 20
+STAGE_FACTOR = 3        # исходник + результат (16/44.1 → 24/48 — примерно ×1.6)
+
+
+def scratch_settings(cfg: dict) -> tuple[bool, str, float]:
+    """(включено, корень, предел в ГБ) из config.json."""
+    root = cfg.get(DIR_KEY) or user_cache_dir("scratch")
+    try:
+        gb = float(cfg.get(GB_KEY, DEFAULT_GB))
+    except (TypeError, ValueError):
+        gb = DEFAULT_GB
+    return bool(cfg.get(STAGING_KEY, False)), root, max(0.0, gb)
+
+
+class Scratch:
+    """Черновая папка с пределом размера."""
+
+    def __init__(self, root: str, limit_bytes: int):
+        self.root  = root
+        self.limit = max(1, int(limit_bytes))
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "Scratch | None":
+        """Scratch из настроек или None, если режим выключен."""
+        on, root, gb = scratch_settings(cfg)
+        return cls(root, int(gb * (1 << 30))) if on and gb > 0 else None
+
+    def batches(self, jobs: list[tuple[str, str]]) -> Iterator[list[int]]:
+        """
+        Индексы заданий (dst, src) пачками, которые помещаются в предел.
+        Задание больше предела идёт отдельной пачкой.
+        """
+        batch, used = [], 0
+        for i, (_, src) in enumerate(jobs):
+            try:
+                need = os.path.getsize(src) * STAGE_FACTOR
+            except OSError:
+                need = 0
+            if batch and used + need > self.limit:
+                yield batch; batch, used = [], 0
+            batch.append(i); used += need
+        if batch:
+            yield batch
+
+    def run(self, ctx, jobs: list[tuple[str, str]], fn: Callable[[str, str], Any],
+            workers: int, on_done: Callable[[int, tuple, Any], None] | None = None,
+            should_stop: Callable[[], bool] | None = None) -> list:
+        """
+        То же, что run_parallel(jobs, fn, …) для заданий (dst, src), но через
+        черновую папку: исходники пачки копируются сюда, fn(local_dst,
+        local_src, src) работает локально, удачные результаты переносятся
+        в dst.  Третий аргумент — исходный путь: по нему, а не по копии,
+        считаются ключ кэша конвертаций и probe.  Хэш исходника для ключа
+        считается при копировании, так что облачный файл читается один раз.
+        on_done(index, job, result) вызывается, когда файл уже на месте.
+        """
+        results: list = [None] * len(jobs)
+        os.makedirs(self.root, exist_ok=True)
+        for batch in self.batches(jobs):
+            if should_stop and should_stop():
+                break
+            ws = tempfile.mkdtemp(prefix="stage-", dir=self.root)
+            try:
+                # 1) исходники пачки — одним последовательным чтением
+                staged: list[int] = []
+                local:  list[tuple[str, str]] = []
+                for n, i in enumerate(batch):
+                    dst, src = jobs[i]
+                    l_src = os.path.join(ws, f"{n}-in{os.path.splitext(src)[1]}")
+                    l_dst = os.path.join(ws, f"{n}-out{os.path.splitext(dst)[1]}")
+                    try:
+                        audio_cache().copy_hashed(src, l_src)
+                    except OSError as e:
+                        ctx.log(f"❌ Не удалось прочитать {os.path.basename(src)}: {e}")
+                        results[i] = False
+                        if on_done: on_done(i, jobs[i], False)
+                        continue
+                    staged.append(i); local.append((l_dst, l_src, src))
+                ctx.log(f"📥 В черновую папку скопировано файлов: {len(local)}")
+
+                # 2) конвертация на локальном диске
+                res = run_parallel(local, fn, workers, should_stop=should_stop)
+
+                # 3) готовое — в синхронизируемые папки одним заходом
+                for i, (l_dst, *_), ok in zip(staged, local, res):
+                    if ok:
+                        dst = jobs[i][0]
+                        try:
+                            os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+                            if os.path.lexists(dst):
+                                os.remove(dst)
+                            shutil.move(l_dst, dst)
+                        except OSError as e:
+                            ctx.log(f"❌ Не удалось перенести {os.path.basename(dst)}: {e}")
+                            ok = False
+                    results[i] = ok
+                    if on_done and ok is not None:
+                        on_done(i, jobs[i], ok)
+            finally:
+                shutil.rmtree(ws, ignore_errors=True)
+        return results
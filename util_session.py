@@ -0,0 +1,182 @@
+# util_session.py
+"""
+Хранилище сессии альбома (session.json).
+
+Шаги больше не открывают и не переписывают файл каждый сам по себе:
+сессия читается один раз, правится в памяти (через типизированные
+поля или напрямую в .data — core-функции по-прежнему получают словарь)
+и сохраняется одним flush() в конце шага.  flush() пишет только если
+что-то изменилось, и всегда атомарно — временный файл + os.replace,
+так что сбой посреди записи не оставит обрезанный JSON.
+
+session_store(path) отдаёт общий экземпляр на файл; если файл сменился
+на диске (например, пакетная очередь сделала альбом текущим), он
+перечитывается.  .data при этом остаётся тем же словарём (меняется
+содержимое): шаги держат ссылку на него, и их правки не должны уйти
+в словарь, который flush() уже не пишет.
+"""
+import os, json, threading
+
+from util_json import load_json_safe, write_json_atomic
+
+SESSION_FILE = "session.json"
+
+
+class SessionStore:
+    """Сессия альбома в памяти + отложенная атомарная запись."""
+
+    def __init__(self, path: str = SESSION_FILE, data: dict | None = None):
+        self.path  = path
+        self._lock = threading.RLock()
+        self.data: dict = {}
+        if data is None:
+            self.reload()
+        else:
+            self.data, self._saved, self._stamp = data, None, None
+
+    # ───── файл ─────
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _dumps(data: dict) -> str:
+        return json.dumps(data, indent=4, ensure_ascii=False)
+
+    def reload(self):
+        """Перечитывает файл (битый или отсутствующий → пустая сессия)."""
+        with self._lock:
+            self._stamp = self._file_stamp()
+            self._assign(load_json_safe(self.path, {}))
+            self._saved = self._dumps(self.data)
+
+    def stale(self) -> bool:
+        """Файл на диске изменён не через это хранилище."""
+        return self._file_stamp() != self._stamp
+
+    @property
+    def exists(self) -> bool:
+        """Сессия есть (на диске или уже заполнена в памяти)."""
+        return bool(self.data) or self._stamp is not None
+
+    @property
+    def dirty(self) -> bool:
+        """Есть несохранённые изменения."""
+        with self._lock:
+            return self._dumps(self.data) != self._saved
+
+    def flush(self) -> bool:
+        """
+        Сохраняет сессию, если она изменилась.  Возвращает False при
+        ошибке диска — прежний файл при этом остаётся целым.
+        """
+        with self._lock:
+            text = self._dumps(self.data)
+            if text == self._saved:
+                return True
+            try:
+                write_json_atomic(self.data, self.path)
+            except OSError:
+                return False
+            self._saved, self._stamp = text, self._file_stamp()
+            return True
+
+    def replace(self, data: dict):
+        """Новая сессия целиком (Шаг 1) — запишется при flush()."""
+        with self._lock:
+            self._assign(data)
+
+    def _assign(self, data: dict):
+        """Новое содержимое в тот же словарь .data."""
+        if data is not self.data:
+            self.data.clear()
+            self.data.update(data)
+
+    def update(self, **fields):
+        with self._lock:
+            self.data.update(fields)
+
+    def get(self, key: str, default=None):
+        return self.data.get(key, default)
+
+    # ───── альбом ─────
+    @property
+    def album_code(self) -> str:
+        return str(self.data.get("album_code", ""))
+
+    @property
+    def album_name(self) -> str:
+        return str(self.data.get("album_name", ""))
+
+    @property
+    def album_path_negotovoe(self) -> str:
+        return str(self.data.get("album_path_negotovoe", ""))
+
+    @property
+    def album_path_aiff(self) -> str:
+        return str(self.data.get("album_path_aiff", ""))
+
+    @property
+    def album_path_mp3(self) -> str:
+        return str(self.data.get("album_path_mp3", ""))
+
+    @property
+    def stems_path(self) -> str:
+        return str(self.data.get("stems_path", ""))
+
+    @property
+    def album_description(self) -> str:
+        return str(self.data.get("album_description", ""))
+
+    @album_description.setter
+    def album_description(self, text: str):
+        self.data["album_description"] = text
+
+    @property
+    def cover_file(self) -> str:
+        return str(self.data.get("cover_file", ""))
+
+    @cover_file.setter
+    def cover_file(self, path: str):
+        self.data["cover_file"] = path
+
+    @property
+    def steps_done(self) -> list[int]:
+        return list(self.data.get("steps_done", []))
+
+    def mark_step(self, n: int):
+        """Отмечает шаг выполненным (session["steps_done"])."""
+        self.data["steps_done"] = sorted(set(self.steps_done) | {n})
+
+    # ───── треки ─────
+    @property
+    def tracks(self) -> list[dict]:
+        """Треки альбома — живой список, правки попадут в flush()."""
+        return self.data.setdefault("tracks", [])
+
+    def track(self, number: str) -> dict | None:
+        """Трек по номеру («01»; 1 тоже подойдёт)."""
+        number = str(number).zfill(2)
+        return next((t for t in self.tracks if t.get("track_number") == number), None)
+
+
+# ───── общий экземпляр на файл ─────
+_stores: dict[str, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+def session_store(path: str = SESSION_FILE) -> SessionStore:
+    """
+    Общий SessionStore для path.  Если файл изменили снаружи (не через
+    хранилище), сессия перечитывается — версия на диске главнее.
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SessionStore(path)
+        elif store.stale():
+            store.reload()
+        return store
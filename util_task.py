@@ -0,0 +1,54 @@
+# util_task.py
+"""
+Фоновые задачи шагов — без привязки к Qt.
+
+Функция-задача получает первым аргументом TaskContext: пишет через него
+в лог, сообщает прогресс и периодически вызывает ctx.check(), чтобы
+остановиться по кнопке «Отмена».  Ожидаемые ошибки шага поднимаются
+как TaskError — их текст показывается пользователю как есть.
+"""
+import threading
+from typing import Callable
+
+
+class TaskError(Exception):
+    """Ожидаемая ошибка шага (нет папки, файла и т. п.)."""
+
+
+class TaskCancelled(Exception):
+    """Задача остановлена пользователем."""
+
+
+class TaskContext:
+    """Канал связи задачи с внешним миром: лог, прогресс, отмена."""
+
+    def __init__(self, log: Callable[[str], None] | None = None,
+                 progress: Callable[[int, int], None] | None = None):
+        self._log, self._progress = log, progress
+        self._stop = threading.Event()
+
+    def log(self, msg: str):
+        if self._log: self._log(msg)
+        else:         print(msg + "\n", end="", flush=True)   # одной записью — без перемешивания потоков
+
+    def progress(self, done: int, total: int):
+        if self._progress: self._progress(done, total)
+
+    def child(self, log: Callable[[str], None] | None = None,
+              progress: Callable[[int, int], None] | None = None) -> "TaskContext":
+        """Контекст подзадачи: свой лог и прогресс, общая «Отмена»."""
+        sub = TaskContext(log, progress)
+        sub._stop = self._stop
+        return sub
+
+    def cancel(self):
+        self._stop.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._stop.is_set()
+
+    def check(self):
+        """Бросает TaskCancelled, если пользователь нажал «Отмена»."""
+        if self._stop.is_set():
+            raise TaskCancelled()
@@ -0,0 +1,63 @@
+# util_timing.py
+"""
+Замеры времени запуска приложения.
+
+Страницы окна собираются при первом переходе, а pandas/openpyxl
+грузятся только на шагах, где нужны.  Такую экономию легко потерять
+незаметно (тяжёлый импорт на уровне модуля, чтение диска в конструкторе
+страницы), поэтому main.py отмечает этапы запуска и печатает отчёт:
+
+    ⏱ Запуск 0.42 с: импорт модулей 0.21 · главное окно 0.08 · первый показ 0.13
+
+Страницы, собранные позже, печатаются отдельной строкой при первом переходе.
+"""
+import sys, time
+from contextlib import contextmanager
+
+# модули, которых при старте быть не должно — иначе отчёт предупредит
+HEAVY_MODULES = ("pandas", "openpyxl", "deep_translator")
+
+
+class Timings:
+    """Этапы: [(название, секунды)] — подряд или замерами measure()."""
+
+    def __init__(self):
+        self.start    = time.perf_counter()
+        self._last    = self.start
+        self.marks: list[tuple[str, float]] = []
+        self.reported = False
+
+    def mark(self, label: str) -> float:
+        """Закрывает этап, начатый предыдущей отметкой.  Возвращает его длительность."""
+        now = time.perf_counter()
+        dt, self._last = now - self._last, now
+        self.marks.append((label, dt))
+        return dt
+
+    @contextmanager
+    def measure(self, label: str):
+        """Отдельный замер; после отчёта о запуске сразу печатается."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t
+            self.marks.append((label, dt))
+            if self.reported:
+                print(f"⏱ {label}: {dt:.2f} с")
+
+    def report(self, title: str = "Запуск") -> str:
+        total = self._last - self.start
+        parts = " · ".join(f"{label} {dt:.2f}" for label, dt in self.marks)
+        text  = f"⏱ {title} {total:.2f} с: {parts}"
+        heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+        if heavy:
+            text += f"\n⚠️ При старте уже загружены: {', '.join(heavy)}"
+        return text
+
+    def print_report(self, title: str = "Запуск"):
+        print(self.report(title))
+        self.reported = True
+
+
+startup = Timings()         # отсчёт — с первого импорта (main.py импортирует первым)
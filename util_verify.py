@@ -0,0 +1,119 @@
+# util_verify.py
+"""
+Проверка финальных AIFF/MP3 альбома перед Harvest (Шаг 6).
+
+Не только «файл есть»: недокачанный или не до конца синхронизированный
+файл с DISCO должен отсеяться здесь, а не упасть позже в ffmpeg.
+  • каждая папка читается одним scandir;
+  • AIFF — число фреймов из COMM сходится с размером PCM в SSND;
+  • MP3 — обход всех заголовков фреймов до конца файла;
+  • длительность обоих сравнивается с duration трека из Шага 1.
+Треки проверяются параллельно; результат — отчёт по каждому файлу.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from util_audio import read_aiff_header, walk_mp3_frames
+
+DURATION_TOLERANCE = 1.0        # сек — расхождение с длительностью из Шага 1
+AIFF_EXTENSIONS    = (".aiff", ".aif")
+
+
+def scan_folder(folder: str) -> dict[str, str]:
+    """{имя в нижнем регистре: путь} — один scandir на папку."""
+    try:
+        with os.scandir(folder) as it:
+            return {e.name.lower(): e.path for e in it if e.is_file()}
+    except OSError:
+        return {}
+
+
+def _entry(track: str, kind: str, path: str | None) -> dict:
+    return {"track": track, "kind": kind, "file": os.path.basename(path) if path else "",
+            "path": path or "", "ok": False, "duration": None, "message": ""}
+
+
+def _check_duration(rep: dict, expected) -> dict:
+    try:
+        expected = float(expected or 0)
+    except (TypeError, ValueError):
+        expected = 0
+    if expected and rep["duration"] is not None \
+            and abs(rep["duration"] - expected) > DURATION_TOLERANCE:
+        rep["message"] = (f"длительность {rep['duration']:.2f} с, "
+                          f"а в Шаге 1 — {expected:.2f} с")
+    else:
+        rep["ok"] = True
+    return rep
+
+
+def check_aiff(track: str, path: str | None, expected=None) -> dict:
+    """COMM ↔ SSND: заявленное число фреймов целиком лежит в файле."""
+    rep = _entry(track, "AIFF", path)
+    if not path:
+        rep["message"] = "файл не найден"; return rep
+    info = read_aiff_header(path)
+    if not info or "data_size" not in info:
+        rep["message"] = "не AIFF или повреждён заголовок"; return rep
+    frame = info["channels"] * ((info["bit_depth"] + 7) // 8)
+    need  = info["frames"] * frame
+    if info.get("compression", "NONE") == "NONE" and info["data_size"] < need:
+        rep["message"] = (f"файл обрезан: {info['data_size'] // max(frame, 1)} "
+                          f"фреймов из {info['frames']}")
+        return rep
+    if info.get("sample_rate"):
+        rep["duration"] = info["frames"] / info["sample_rate"]
+    return _check_duration(rep, expected)
+
+
+def check_mp3(track: str, path: str | None, expected=None) -> dict:
+    """Все MPEG-фреймы на месте до конца файла."""
+    rep = _entry(track, "MP3", path)
+    if not path:
+        rep["message"] = "файл не найден"; return rep
+    info = walk_mp3_frames(path)
+    if not info or not info["frames"]:
+        rep["message"] = "не MP3 или нет аудиофреймов"; return rep
+    rep["duration"] = info["duration"]
+    if info["truncated"]:
+        rep["message"] = f"файл обрезан: последний фрейм неполный ({info['frames']} фреймов)"
+        return rep
+    if not info["complete"]:
+        rep["message"] = f"поток обрывается на байте {info['end']} ({info['frames']} фреймов)"
+        return rep
+    return _check_duration(rep, expected)
+
+
+def verify_album(session: dict, workers: int = 4) -> list[dict]:
+    """
+    Отчёт по финальным файлам альбома: для каждого трека запись AIFF и MP3
+    {track, kind, file, path, ok, duration, message} — в порядке треков.
+    """
+    code = session.get("album_code", "IMG000")
+    name = session.get("album_name", "Unknown")
+    aiff = scan_folder(session.get("album_path_aiff", ""))
+    mp3  = scan_folder(session.get("album_path_mp3", ""))
+
+    def _track(trk: dict) -> list[dict]:
+        num, title = trk.get("track_number", ""), trk.get("track_name", "")
+        base = f"{code} - {name} - {num} {title}".lower()
+        a = next((aiff[base + ext] for ext in AIFF_EXTENSIONS if base + ext in aiff), None)
+        m = mp3.get(base + ".mp3")
+        label = f"{num} {title}"
+        return [check_aiff(label, a, trk.get("duration")),
+                check_mp3(label, m, trk.get("duration"))]
+
+    tracks = session.get("tracks", [])
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tracks) or 1))) as pool:
+        return [rep for reps in pool.map(_track, tracks) for rep in reps]
+
+
+def format_report(report: list[dict]) -> str:
+    """Отчёт для лога: строка на файл."""
+    lines = []
+    for r in report:
+        mark = "✅" if r["ok"] else "❌"
+        dur  = f" ({r['duration']:.2f} с)" if r["duration"] is not None else ""
+        what = r["file"] or r["track"]
+        lines.append(f"{mark} {r['kind']} {what}{dur}" + (f" — {r['message']}" if r["message"] else ""))
+    return "\n".join(lines)
@@ -0,0 +1,302 @@
+# util_xlsx.py
+"""
+Дозапись и выборочное чтение строк листа .xlsx без openpyxl.
+
+.xlsx — zip с XML-файлами.  Чтобы дописать альбом в TOTAL METADATA,
+не нужно разбирать и пересохранять всю книгу: достаточно найти XML
+нужного листа, с конца отыскать последнюю заполненную строку и вставить
+новые <row> перед </sheetData>.  Строки пишутся inline-строками, так что
+sharedStrings.xml не меняется; остальные части книги копируются как есть.
+
+SheetReader читает так же напрямую только нужный диапазон строк
+(например, последние строки листа для отпечатка или строки, добавленные
+с прошлого импорта), не разбирая весь лист в DataFrame.
+
+Если лист устроен непривычно (префиксы пространств имён, строки без
+номера r=…), append_rows() бросает XlsxLayoutError — тогда вызывающий
+код идёт медленным путём через openpyxl.
+"""
+import re, zipfile, datetime
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, unescape
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL  = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG  = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_ROW_OPEN   = re.compile(rb'<row\b[^>]*?\br="(\d+)"[^>]*?(/?)>')
+_ROW_ANY    = re.compile(rb'<row[\s/>]')
+_CELL       = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_CELL_TYPE  = re.compile(rb'\bt="(\w+)"')
+_CELL_VALUE = re.compile(rb'<v>([^<]*)</v>|<t\b[^>]*>([^<]*)</t>')
+_DIMENSION  = re.compile(rb'<dimension ref="[A-Z]*\d*(?::([A-Z]+)\d+)?"\s*/>')
+_ILLEGAL    = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")   # openpyxl их тоже не пишет
+_CELL_REF   = re.compile(rb'\br="([A-Z]+)\d+"')
+_CELL_STYLE = re.compile(rb'\bs="(\d+)"')
+_SI         = re.compile(rb'<si>(.*?)</si>|<si/>', re.S)
+_TEXT       = re.compile(rb'<t\b[^>]*>(.*?)</t>', re.S)
+_PHONETIC   = re.compile(rb'<rPh\b.*?</rPh>', re.S)
+_XF         = re.compile(rb'<xf\b[^>]*?\bnumFmtId="(\d+)"')
+_NUMFMT     = re.compile(rb'<numFmt\b[^>]*?numFmtId="(\d+)"[^>]*?formatCode="([^"]*)"')
+_DATE_FMT_IDS = {14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+_EXCEL_EPOCH  = datetime.datetime(1899, 12, 30)
+
+
+class XlsxLayoutError(Exception):
+    """Лист нельзя дописать потоково — нужен openpyxl."""
+
+
+# ───────────────────── адреса ячеек ─────────────────────
+def col_letter(n: int) -> str:
+    """1 → A, 27 → AA."""
+    s = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+def col_number(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+# ───────────────────── структура книги ─────────────────────
+def sheet_names(path: str) -> list[str]:
+    """Имена листов в порядке книги."""
+    with zipfile.ZipFile(path) as zf:
+        wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    return [s.get("name") for s in wb.iter(NS_MAIN + "sheet")]
+
+
+def sheet_part(zf: zipfile.ZipFile, sheet: str) -> str:
+    """Имя XML-файла листа внутри zip (xl/worksheets/sheetN.xml)."""
+    wb   = ET.fromstring(zf.read("xl/workbook.xml"))
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    rid  = next((s.get(NS_REL + "id") for s in wb.iter(NS_MAIN + "sheet")
+                 if s.get("name") == sheet), None)
+    if rid is None:
+        raise KeyError(sheet)
+    target = next((r.get("Target") for r in rels.iter(NS_PKG + "Relationship")
+                   if r.get("Id") == rid), "")
+    return target.lstrip("/") if target.startswith("/") else "xl/" + target
+
+
+def _shared_strings(zf: zipfile.ZipFile, wanted: set[int]) -> dict[int, str]:
+    """Только нужные элементы sharedStrings.xml (потоково)."""
+    out, i = {}, 0
+    if not wanted or "xl/sharedStrings.xml" not in zf.namelist():
+        return out
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == NS_MAIN + "si":
+                if i in wanted:
+                    out[i] = "".join(t.text or "" for t in el.iter(NS_MAIN + "t"))
+                i += 1; el.clear()
+                if i > max(wanted):
+                    break
+    return out
+
+
+# ───────────────────── последняя строка ─────────────────────
+def _sst_refs(body: bytes) -> set[int]:
+    """Индексы sharedStrings, на которые ссылаются ячейки строки."""
+    refs = set()
+    for attrs, inner in _CELL.findall(body):
+        t = _CELL_TYPE.search(attrs)
+        if t and t.group(1) == b"s" and (v := re.search(rb"<v>(\d+)</v>", inner)):
+            refs.add(int(v.group(1)))
+    return refs
+
+
+def _row_has_value(body: bytes, sst: dict[int, str]) -> bool:
+    for attrs, inner in _CELL.findall(body):
+        if not inner:
+            continue
+        if b"<f" in inner:                              # формула — значит, занято
+            return True
+        m = _CELL_VALUE.search(inner)
+        val = (m.group(1) or m.group(2)) if m else b""
+        t = _CELL_TYPE.search(attrs)
+        if t and t.group(1) == b"s" and val.strip().isdigit():
+            if sst.get(int(val), "x") != "":
+                return True
+        elif val.strip():
+            return True
+    return False
+
+
+def last_used_row(zf: zipfile.ZipFile, xml: bytes) -> tuple[int, int]:
+    """
+    (номер последней непустой строки, смещение в xml, где кончаются
+    значимые строки).  Строки просматриваются с конца — как правило,
+    хватает одной-двух.  Пустой лист → (1, …), как у last_real_row().
+    """
+    end = xml.find(b"</sheetData>")
+    if end < 0:
+        if b"<sheetData/>" in xml:
+            return 1, xml.find(b"<sheetData/>")
+        raise XlsxLayoutError("нет <sheetData> (префикс пространства имён?)")
+
+    rows = list(_ROW_OPEN.finditer(xml, 0, end))
+    if len(rows) != len(_ROW_ANY.findall(xml, 0, end)):
+        raise XlsxLayoutError("строки без номера r=…")
+
+    cut = end
+    for k in range(len(rows) - 1, -1, -1):
+        m = rows[k]
+        if m.group(2):                                   # <row …/>
+            cut = m.start(); continue
+        body_end = rows[k + 1].start() if k + 1 < len(rows) else end
+        body = xml[m.end():body_end]
+        if _row_has_value(body, _shared_strings(zf, _sst_refs(body))):
+            return int(m.group(1)), cut
+        cut = m.start()
+    return 1, cut
+
+
+# ───────────────────── запись ─────────────────────
+def _row_xml(r: int, values: list) -> bytes:
+    cells = []
+    for c, val in enumerate(values, 1):
+        text = _ILLEGAL.sub("", str(val))
+        if text == "":
+            continue
+        cells.append(f'<c r="{col_letter(c)}{r}" t="inlineStr"><is>'
+                     f'<t xml:space="preserve">{escape(text)}</t></is></c>')
+    return f'<row r="{r}">{"".join(cells)}</row>'.encode("utf-8")
+
+
+def append_rows(path: str, sheet: str, rows: list[list], out: str,
+                gap: int = 1) -> int:
+    """
+    Копирует книгу path в out, дописав rows в лист sheet через gap
+    пустых строк после последней заполненной.  Пустые «хвостовые»
+    строки (только форматирование) отбрасываются.  Возвращает номер
+    первой записанной строки.  KeyError — нет листа.
+    """
+    with zipfile.ZipFile(path) as zin:
+        part = sheet_part(zin, sheet)
+        xml  = zin.read(part)
+        last, cut = last_used_row(zin, xml)
+        start = last + gap + 1
+
+        new_rows = b"".join(_row_xml(r, row) for r, row in enumerate(rows, start))
+        if xml.find(b"</sheetData>") < 0:                # пустой <sheetData/>
+            xml = xml[:cut] + b"<sheetData>" + new_rows + b"</sheetData>" + \
+                  xml[cut + len(b"<sheetData/>"):]
+        else:
+            xml = xml[:cut] + new_rows + xml[xml.find(b"</sheetData>"):]
+
+        # <dimension> должен охватывать новые строки
+        last_row = start + len(rows) - 1 if rows else last
+        width    = max((len(r) for r in rows), default=1)
+        def _dim(m):
+            old = col_number(m.group(1).decode()) if m.group(1) else 1
+            return f'<dimension ref="A1:{col_letter(max(old, width))}{last_row}"/>'.encode()
+        xml = _DIMENSION.sub(_dim, xml, count=1)
+
+        with zipfile.ZipFile(out, "w") as zout:
+            for info in zin.infolist():
+                data = xml if info.filename == part else zin.read(info)
+                zout.writestr(info, data)
+    return start
+
+
+# ───────────────────── выборочное чтение ─────────────────────
+def _text(inner: bytes) -> str:
+    """Текст <si>/<is>: все <t> подряд (фонетика <rPh> не в счёт)."""
+    inner = _PHONETIC.sub(b"", inner)
+    return "".join(unescape(m.decode("utf-8")) for m in _TEXT.findall(inner))
+
+
+def _number(v: str, date: bool) -> str:
+    """Число ячейки → строка так же, как read_excel(dtype=str)."""
+    try:
+        f = float(v)
+    except ValueError:
+        return v
+    if date:
+        return str(_EXCEL_EPOCH + datetime.timedelta(days=f))
+    return str(int(f)) if f.is_integer() else str(f)
+
+
+class SheetReader:
+    """
+    Один лист книги: последняя заполненная строка и значения непустых
+    строк диапазона [first, last] — {номер: [значения по столбцам A, B, …]}.
+    Значения — строки, как у pandas.read_excel(dtype=str); пусто — "".
+    """
+
+    def __init__(self, path: str, sheet: str):
+        with zipfile.ZipFile(path) as zf:
+            self.part = sheet_part(zf, sheet)
+            self.xml  = zf.read(self.part)
+            names = zf.namelist()
+            self._sst    = zf.read("xl/sharedStrings.xml") if "xl/sharedStrings.xml" in names else b""
+            self._styles = zf.read("xl/styles.xml") if "xl/styles.xml" in names else b""
+            self.last, _ = last_used_row(zf, self.xml)
+        self._si: list | None = None
+        self._dates: set[int] | None = None
+        self._rows = None
+
+    # ───── внутреннее ─────
+    def _shared(self, i: int) -> str:
+        if self._si is None:
+            self._si = list(_SI.finditer(self._sst))
+        if i >= len(self._si) or self._si[i].group(1) is None:
+            return ""
+        return _text(self._si[i].group(1))
+
+    def _is_date(self, style: int) -> bool:
+        if self._dates is None:
+            xfs_at = self._styles.find(b"<cellXfs")
+            xfs    = self._styles[xfs_at:self._styles.find(b"</cellXfs>", xfs_at)] if xfs_at >= 0 else b""
+            custom = {int(i) for i, code in _NUMFMT.findall(self._styles)
+                      if re.search(rb"[dy]", re.sub(rb'"[^"]*"|\[[^\]]*\]', b"", code.lower()))}
+            self._dates = {n for n, f in enumerate(_XF.findall(xfs))
+                           if int(f) in _DATE_FMT_IDS or int(f) in custom}
+        return style in self._dates
+
+    def _index(self) -> dict[int, tuple[int, int]]:
+        """{номер строки: (начало, конец) в xml} — один проход regex."""
+        if self._rows is None:
+            end  = self.xml.find(b"</sheetData>")
+            opens = list(_ROW_OPEN.finditer(self.xml, 0, max(end, 0)))
+            self._rows = {int(m.group(1)): (m.end(), opens[k+1].start() if k+1 < len(opens) else end)
+                          for k, m in enumerate(opens) if not m.group(2)}
+        return self._rows
+
+    def _cell(self, attrs: bytes, inner: bytes) -> str:
+        t = _CELL_TYPE.search(attrs)
+        t = t.group(1) if t else b"n"
+        if t == b"inlineStr":
+            return _text(inner)
+        m = re.search(rb"<v>([^<]*)</v>", inner)
+        if not m:
+            return ""
+        v = unescape(m.group(1).decode("utf-8"))
+        if t == b"s":
+            return self._shared(int(v))
+        if t == b"b":
+            return "True" if v == "1" else "False"
+        if t in (b"str", b"e"):
+            return v
+        st = _CELL_STYLE.search(attrs)
+        return _number(v, bool(st) and self._is_date(int(st.group(1))))
+
+    # ───── API ─────
+    def rows(self, first: int, last: int | None = None) -> dict[int, list[str]]:
+        last, out = self.last if last is None else last, {}
+        for r, (a, b) in self._index().items():
+            if not first <= r <= last:
+                continue
+            vals: dict[int, str] = {}
+            for attrs, inner in _CELL.findall(self.xml, a, b):
+                ref = _CELL_REF.search(attrs)
+                if ref and inner:
+                    vals[col_number(ref.group(1).decode())] = self._cell(attrs, inner)
+            if any(vals.values()):                      # пустые строки не возвращаются
+                out[r] = [vals.get(c, "") for c in range(1, max(vals) + 1)]
+        return out